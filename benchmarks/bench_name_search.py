@@ -0,0 +1,47 @@
+import gc
+import random
+import time
+
+from indexes import TrigramIndex
+
+# Нечеткий поиск по имени на большом числе пассажиров:
+#   python -m benchmarks.bench_name_search
+# Фамилии собираются из слогов, чтобы словарь был разнообразным,
+# как в реальных данных (в synthetic.py имен и фамилий всего несколько).
+# Ограничение: на 1 млн имен запрос занимает около 0.1 с, а запросы из
+# частых триграмм - до 0.5 с; единицы миллисекунд - только до ~100 тыс. имен
+FIRST = ["иван", "анна", "петр", "мария", "сергей", "ольга", "дмитрий", "елена", "алексей",
+         "татьяна", "андрей", "наталья", "михаил", "ирина", "николай", "светлана", "павел",
+         "юлия", "артем", "екатерина", "максим", "анастасия", "егор", "дарья", "роман"]
+SYLLABLES = ["ив", "ан", "пет", "сид", "кузн", "смир", "поп", "вол", "мор", "леб",
+             "сок", "нов", "ком", "бел", "ор", "зай", "мед", "гус", "ег", "пав",
+             "бур", "тих", "ряб", "жук", "кар", "лоп", "мак", "гром", "чер", "шуб",
+             "фед", "дор", "ков", "лис", "сав", "хол", "якуш", "зуб", "рус", "степ"]
+SUFFIXES = ["ов", "ова", "ев", "ева", "ин", "ина", "ский", "ская", "енко"]
+
+
+def make_name(rnd: random.Random) -> str:
+    surname = ''.join(rnd.choice(SYLLABLES) for _ in range(rnd.randint(1, 3)))
+    return f"{rnd.choice(FIRST)} {surname}{rnd.choice(SUFFIXES)}"
+
+
+def main(count: int = 1000000) -> None:
+    rnd = random.Random(42)
+    index = TrigramIndex()
+    start = time.perf_counter()
+    for i in range(count):
+        index.add(f"{i:010d}", make_name(rnd))
+    print(f"Индекс на {count} имен построен за {time.perf_counter() - start:.1f} с")
+    gc.collect()  # Иначе полная сборка мусора после построения попадет в первый замер
+
+    for query in ["иванов", "иваноф", "мария петрова", "сидорофф", "кузнецова",
+                  "екатерина гусева"]:
+        start = time.perf_counter()
+        matches = index.search(query, limit=10)
+        elapsed = (time.perf_counter() - start) * 1000
+        best = f"{matches[0][1]:.2f}" if matches else "-"
+        print(f"{query:<16}{elapsed:8.1f} мс, найдено {len(matches)}, лучшее сходство {best}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+import os
+import pickle
+import shutil
+import tempfile
+import time
+
+from benchmarks.synthetic import build_system
+from jobwf import JsonReader, JsonWriter
+from parallel_io import SECTIONS, ChunkedJsonWriter, ParallelJsonReader, _load_chunk, \
+    _read_manifest
+
+
+# Загрузка обычного JSON-снимка и снимка по частям с разным числом процессов:
+#   python -m benchmarks.bench_parallel
+# Кроме прямых замеров печатается разбивка по этапам и нижняя граница времени на
+# N ядрах по закону Амдала: разбор и проверка частей и упаковка результатов идут
+# в процессах, а распаковка, создание объектов и связывание - в родителе
+# последовательно.
+def measure(action) -> float:
+    start = time.perf_counter()
+    action()
+    return time.perf_counter() - start
+
+
+def breakdown(chunks_dir: str) -> None:
+    sections = _read_manifest(chunks_dir)['sections']
+    jobs = [(section, os.path.join(chunks_dir, chunk))
+            for section in SECTIONS for chunk in sections.get(section, [])]
+    results = []
+    work = measure(lambda: results.extend(_load_chunk(*job) for job in jobs))
+    blobs = []
+    pack = measure(lambda: blobs.extend(map(pickle.dumps, results)))
+    unpacked = []
+    unpack = measure(lambda: unpacked.extend(map(pickle.loads, blobs)))
+    loaded = {section: [] for section in SECTIONS}
+    for (section, _), objects in zip(jobs, unpacked):
+        loaded[section].extend(objects)
+    link = measure(lambda: ParallelJsonReader._link(loaded))
+
+    print(f"  в процессах: разбор {work:.2f} с, упаковка {pack:.2f} с")
+    print(f"  в родителе:  распаковка {unpack:.2f} с, создание и связывание {link:.2f} с")
+    for cores in (2, 4, 8, 16):
+        print(f"  на {cores:>2} ядрах - не меньше {unpack + link + (work + pack) / cores:.2f} с")
+
+
+def main() -> None:
+    system = build_system(passengers=100000, transports=200, seats_per_transport=100,
+                          trips=400, bookings=15000)
+    folder = tempfile.mkdtemp()
+    json_file = os.path.join(folder, 'snapshot.json')
+    chunks_dir = os.path.join(folder, 'chunks')
+    JsonWriter().write(system, json_file)
+    ChunkedJsonWriter(chunk_size=5000).write(system, chunks_dir)
+
+    print(f"JsonReader:              {measure(lambda: JsonReader().read(json_file)):8.2f} с")
+    for workers in sorted({1, 2, 4, os.cpu_count() or 1}):
+        seconds = measure(lambda: ParallelJsonReader(workers).read(chunks_dir))
+        print(f"ParallelJsonReader({workers:>2}):  {seconds:8.2f} с")
+    print("Этапы загрузки по частям:")
+    breakdown(chunks_dir)
+
+    shutil.rmtree(folder)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+from datetime import datetime, timedelta
+
+from action import Booking, Payment
+from person import Passenger
+from seat import ClassSeat, Seat
+from transports import Bus
+from trip import Route, Trip
+
+# Память на один объект предметной области (по tracemalloc):
+#   python -m benchmarks.bench_slots
+#   python -m benchmarks.bench_slots --baseline <ревизия git>
+# По умолчанию "до" - сохраненные ниже замеры кода без __slots__.
+# С --baseline те же замеры выполняются на коде указанной ревизии
+# (извлекается через git archive во временную папку). Импортируются
+# только модули предметной области, поэтому скрипт можно запускать
+# на любом дереве, где они есть.
+COUNT = 20000
+
+# Замеры на ревизии b7a6dac (до __slots__, родитель коммита user-039), Python 3.11.
+# Размеры зависят от версии Python - на другой версии сравнивайте через --baseline
+BASELINE_REVISION = 'до __slots__'
+BASELINE = {
+    'Seat': 128,
+    'Route': 112,
+    'Trip': 160,
+    'Payment': 176,
+    'Booking': 184,
+    'Passenger': 192,
+}
+
+
+def per_object(make, count: int = COUNT) -> float:
+    # Аргументы готовятся заранее: считаем только сами объекты
+    # и то, что создается в их конструкторах
+    objects = [None] * count
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(count):
+        objects[i] = make(i)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return used / count
+
+
+def measure() -> dict:
+    numbers = [f"{i:05d}" for i in range(COUNT)]
+    ids = [f"ID_{i:07d}" for i in range(COUNT)]
+    names = [f"Иван Иванов{'а' * (i % 5)}" for i in range(COUNT)]
+    emails = [f"user{i}@example.com" for i in range(COUNT)]
+    phones = [f"+7900{i:07d}" for i in range(COUNT)]
+    passports = [f"{4500 + i % 100}{i:06d}" for i in range(COUNT)]
+    start = datetime(2024, 1, 1, 8, 0)
+    times = [start + timedelta(minutes=i) for i in range(COUNT)]
+
+    transport = Bus("T_0001", "Модель", COUNT, True, True)
+    seats = [Seat(number, ClassSeat.ECONOMY, 1000.0) for number in numbers]
+    route = Route("R_0001", "Москва", "Казань", start, start + timedelta(hours=12))
+    trip = Trip("TR_0001", route, transport)
+
+    return {
+        'Seat': per_object(lambda i: Seat(numbers[i], ClassSeat.ECONOMY, 1000.0)),
+        'Route': per_object(lambda i: Route(ids[i], "Москва", "Казань", times[i], times[i])),
+        'Trip': per_object(lambda i: Trip(ids[i], route, transport)),
+        'Payment': per_object(lambda i: Payment(ids[i], 1000.0, "карта")),
+        'Booking': per_object(lambda i: Booking(ids[i], trip, seats[i])),
+        'Passenger': per_object(lambda i: Passenger(names[i], emails[i], phones[i],
+                                                    passports[i])),
+    }
+
+
+def measure_revision(revision: str) -> dict:
+    # Те же замеры на коде ревизии: этот файл запускается в отдельном
+    # процессе, а модули предметной области берутся из извлеченного дерева
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with tempfile.TemporaryDirectory() as folder:
+        archive = subprocess.run(['git', 'archive', revision], cwd=root,
+                                 capture_output=True, check=True).stdout
+        subprocess.run(['tar', '-x', '-C', folder], input=archive, check=True)
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), '--json'],
+                                cwd=folder, env={**os.environ, 'PYTHONPATH': folder},
+                                capture_output=True, text=True, check=True).stdout
+    return json.loads(output)
+
+
+def main(argv) -> None:
+    if '--json' in argv:
+        print(json.dumps(measure()))
+        return
+
+    current = measure()
+    revision, baseline = BASELINE_REVISION, BASELINE
+    if '--baseline' in argv:
+        revision = argv[argv.index('--baseline') + 1]
+        baseline = measure_revision(revision)
+    print(f"{'':<12}{revision:>12}{'сейчас':>12}")
+    for name, size in current.items():
+        before = baseline[name]
+        print(f"{name:<12}{before:10.0f} Б{size:10.0f} Б   {size / before:6.0%}")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
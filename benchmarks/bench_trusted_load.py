@@ -0,0 +1,36 @@
+import os
+import tempfile
+
+from benchmarks.bench_binary import measure
+from benchmarks.synthetic import build_system
+from jobwf import JsonReader, JsonWriter, XMLReader, XMLWriter
+from validation import validate_passengers
+
+
+# Загрузка с валидацией пассажиров и в доверенном режиме:
+#   python -m benchmarks.bench_trusted_load
+def main() -> None:
+    system = build_system(passengers=50000, transports=100, seats_per_transport=50,
+                          trips=200, bookings=5000)
+    folder = tempfile.mkdtemp()
+    json_file = os.path.join(folder, 'snapshot.json')
+    xml_file = os.path.join(folder, 'snapshot.xml')
+    JsonWriter().write(system, json_file)
+    XMLWriter().write(system, xml_file)
+
+    trusted = JsonReader(trusted=True).read(json_file)
+    results = [
+        ('JSON load, validated', measure(lambda: JsonReader().read(json_file))),
+        ('JSON load, trusted', measure(lambda: JsonReader(trusted=True).read(json_file))),
+        ('XML load, validated', measure(lambda: XMLReader().read(xml_file))),
+        ('XML load, trusted', measure(lambda: XMLReader(trusted=True).read(xml_file))),
+        # Отложенная проверка тех же пассажиров отдельным проходом
+        ('deferred validation', measure(
+            lambda: validate_passengers(trusted.passengers.values()))),
+    ]
+    for name, seconds in results:
+        print(f"{name:<24}{seconds * 1000:10.1f} мс")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+import time
+import tracemalloc
+from datetime import datetime
+
+from benchmarks.synthetic import build_system
+from jobwf import JsonWriter, XMLWriter
+from seat import ClassSeat, Seat
+from transports import TransportType
+
+
+# Горячие пути, где геттеры коллекций вызываются в циклах:
+#   python -m benchmarks.bench_views
+def measure(action) -> tuple:
+    # Время и пик выделенной памяти (тот же вызов под tracemalloc)
+    start = time.perf_counter()
+    action()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    action()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def booking_hot_path() -> None:
+    # Один пассажир бронирует все места большого поезда: на каждое
+    # бронирование - поиск места по номеру и обновление списка бронирований
+    system = build_system(passengers=1, transports=0, trips=0, bookings=0)
+    passenger = next(iter(system.passengers.values()))
+    train = system.create_transport(TransportType.TRAIN, model="Ласточка", capacity=2000,
+                                    car_count=20)
+    for number in range(2000):
+        train.add_seat(Seat(f"{number:04d}", ClassSeat.ECONOMY, 1000.0))
+    route = system.create_route("Москва", "Казань", datetime(2024, 1, 1, 8, 0),
+                                datetime(2024, 1, 1, 20, 0))
+    trip = system.create_trip(route, train)
+    for number in range(2000):
+        system.create_booking(passenger, trip, f"{number:04d}")
+        trip.revenue
+
+
+def main() -> None:
+    system = build_system(passengers=50000, transports=200, seats_per_transport=100,
+                          trips=400, bookings=10000)
+    # __repr__ ищет владельца каждого бронирования перебором - берем систему поменьше
+    small = build_system(passengers=2000, bookings=1000)
+    results = [
+        ('JSON serialize', measure(lambda: JsonWriter()._prepare_data(system))),
+        ('XML structure', measure(lambda: XMLWriter()._create_xml_structure(system))),
+        ('repr', measure(lambda: repr(small))),
+        ('booking hot path', measure(booking_hot_path)),
+    ]
+    for name, (seconds, peak) in results:
+        print(f"{name:<20}{seconds * 1000:10.1f} мс   пик памяти {peak / 2 ** 20:8.1f} МБ")
+
+
+if __name__ == '__main__':
+    main()
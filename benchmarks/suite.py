@@ -0,0 +1,193 @@
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from benchmarks.synthetic import build_system
+from jobwf import JsonReader, JsonWriter, XMLReader, XMLWriter
+
+# Набор замеров горячих операций на системах разного размера:
+#   python -m benchmarks.suite --sizes small,medium --output results.json
+#   python -m benchmarks.suite --output new.json --baseline results.json
+# Результаты пишутся в JSON. С --baseline каждый замер сравнивается с тем
+# же замером из прошлого файла по порогам из thresholds.json; при регрессии
+# код возврата 1 - на это можно завязать проверку перед релизом.
+
+SIZES: Dict[str, Dict[str, int]] = {
+    'small': dict(passengers=1000, transports=20, seats_per_transport=50, trains=2,
+                  routes=20, trips=40, bookings=500),
+    'medium': dict(passengers=10000, transports=200, seats_per_transport=50, trains=10,
+                   routes=100, trips=400, bookings=5000),
+    'large': dict(passengers=100000, transports=1000, seats_per_transport=100, trains=50,
+                  routes=500, trips=4000, bookings=50000),
+}
+DEFAULT_SIZES = ('small', 'medium')
+SEED = 42
+CALLS = 1000  # Вызовов на замер для операций над одним объектом
+THRESHOLDS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'thresholds.json')
+
+
+def best_of(action: Callable[[], Any], repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        action()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def free_seat_batches(system, count: int, batches: int) -> List[List[tuple]]:
+    # Несовпадающие свободные места для бронирования: поездки одного
+    # транспорта делят места, поэтому место берется только один раз
+    rnd = random.Random(SEED)
+    passengers = list(system.passengers.values())
+    taken = set()
+    pairs = []
+    for trip in system.trips.values():
+        for seat in trip.get_available_seats():
+            key = (trip.transport.transport_id, seat.number)
+            if key not in taken:
+                taken.add(key)
+                pairs.append((rnd.choice(passengers), trip, seat.number))
+    rnd.shuffle(pairs)
+    count = min(count, len(pairs) // batches)
+    return [pairs[i * count:(i + 1) * count] for i in range(batches)]
+
+
+def run_size(size: str, repeat: int, folder: str) -> List[Dict[str, Any]]:
+    system = build_system(seed=SEED, **SIZES[size])
+    rnd = random.Random(SEED)
+    trips = list(system.trips.values())
+    lookups = [(trip, rnd.choice(trip.transport.seats).number)
+               for trip in rnd.choices(trips, k=CALLS)]
+    json_file = os.path.join(folder, f'{size}.json')
+    xml_file = os.path.join(folder, f'{size}.xml')
+
+    def find_seats():
+        for trip, number in lookups:
+            trip.find_seat_by_number(number)
+
+    def revenue():
+        for trip in trips:
+            trip.revenue
+
+    measurements = [
+        ('find_seat_by_number', len(lookups), best_of(find_seats, repeat)),
+        ('trip_revenue', len(trips), best_of(revenue, repeat)),
+        ('repr', 1, best_of(lambda: repr(system), repeat)),
+        ('json_write', 1, best_of(lambda: JsonWriter().write(system, json_file), repeat)),
+        ('json_read', 1, best_of(lambda: JsonReader().read(json_file), repeat)),
+        ('xml_write', 1, best_of(lambda: XMLWriter().write(system, xml_file), repeat)),
+        ('xml_read', 1, best_of(lambda: XMLReader().read(xml_file), repeat)),
+    ]
+
+    # Бронирование меняет систему - каждый повтор бронирует свою пачку мест
+    batches = free_seat_batches(system, CALLS, repeat)
+    pending = iter(batches)
+
+    def create_bookings():
+        for passenger, trip, number in next(pending):
+            system.create_booking(passenger, trip, number)
+
+    measurements.append(('create_booking', len(batches[0]), best_of(create_bookings, repeat)))
+
+    return [{'operation': operation, 'size': size, 'calls': calls, 'seconds': seconds,
+             'per_call_us': seconds / calls * 1e6 if calls else None}
+            for operation, calls, seconds in measurements]
+
+
+def load_thresholds(filename: str) -> Dict[str, Any]:
+    with open(filename, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def find_regressions(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]],
+                     thresholds: Dict[str, Any]) -> List[Dict[str, Any]]:
+    # Регрессия - замер медленнее прошлого больше чем в ratio раз
+    # (с запасом noise_floor_ms на шум совсем коротких замеров)
+    previous = {(r['operation'], r['size']): r for r in baseline}
+    floor = thresholds.get('noise_floor_ms', 0.0) / 1000
+    regressions = []
+    for result in results:
+        before = previous.get((result['operation'], result['size']))
+        if before is None or before['calls'] != result['calls']:
+            continue  # Нечего сравнивать: новый замер или другое число вызовов
+        ratio = thresholds.get('ratios', {}).get(result['operation'],
+                                                 thresholds.get('default_ratio', 1.3))
+        limit = before['seconds'] * ratio + floor
+        if result['seconds'] > limit:
+            regressions.append({'operation': result['operation'], 'size': result['size'],
+                                'seconds': result['seconds'], 'baseline': before['seconds'],
+                                'limit': limit})
+    return regressions
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.suite')
+    parser.add_argument('--sizes', default=','.join(DEFAULT_SIZES),
+                        help=f"размеры через запятую из: {', '.join(SIZES)}")
+    parser.add_argument('--repeat', type=int, default=3, help="повторов, берется лучший")
+    parser.add_argument('--output', help="куда записать результаты (JSON)")
+    parser.add_argument('--baseline', help="прошлые результаты для сравнения")
+    parser.add_argument('--thresholds', default=THRESHOLDS_FILE, help="пороги регрессии")
+    args = parser.parse_args(argv)
+
+    if args.repeat < 1:
+        parser.error("--repeat должен быть не меньше 1")
+    sizes = [size.strip() for size in args.sizes.split(',') if size.strip()]
+    unknown = [size for size in sizes if size not in SIZES]
+    if unknown:
+        parser.error(f"неизвестные размеры: {', '.join(unknown)}")
+
+    folder = tempfile.mkdtemp()
+    results = []
+    try:
+        for size in sizes:
+            for result in run_size(size, args.repeat, folder):
+                results.append(result)
+                per_call = result['per_call_us']
+                print(f"{size:<8}{result['operation']:<22}{result['seconds'] * 1000:10.2f} мс"
+                      + (f"{per_call:12.2f} мкс/вызов" if result['calls'] > 1 else ''))
+    finally:
+        shutil.rmtree(folder)
+
+    report: Dict[str, Any] = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': SEED,
+        'repeat': args.repeat,
+        'sizes': {size: SIZES[size] for size in sizes},
+        'results': results,
+    }
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        regressions = find_regressions(results, baseline, load_thresholds(args.thresholds))
+        report['baseline'] = args.baseline
+        report['regressions'] = regressions
+        for regression in regressions:
+            print(f"РЕГРЕССИЯ {regression['size']} {regression['operation']}: "
+                  f"{regression['seconds'] * 1000:.2f} мс, было "
+                  f"{regression['baseline'] * 1000:.2f} мс, "
+                  f"порог {regression['limit'] * 1000:.2f} мс")
+        if not regressions:
+            print("Регрессий нет")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,105 @@
+import random
+from datetime import datetime, timedelta
+from typing import Optional
+
+from action import Booking, Payment
+from general_system import BookingSystem
+from my_exceptions import MyException
+from seat import ClassSeat, Seat
+from transports import Bus, Train
+from trip import Route, Trip
+
+CITIES = ["Москва", "Санкт-Петербург", "Казань", "Нижний Новгород", "Екатеринбург",
+          "Новосибирск", "Самара", "Ростов-на-Дону", "Воронеж", "Пермь"]
+FIRST_NAMES = ["Иван", "Анна", "Петр", "Мария", "Сергей", "Ольга", "Дмитрий", "Елена"]
+LAST_NAMES = ["Иванов", "Петрова", "Сидоров", "Смирнова", "Кузнецов", "Попова"]
+
+
+def build_system(passengers: int = 1000, transports: int = 20, seats_per_transport: int = 50,
+                 trips: int = 40, bookings: int = 500, seed: int = 42,
+                 routes: Optional[int] = None, trains: int = 0, seats_per_train: int = 200,
+                 paid_share: float = 0.7) -> BookingSystem:
+    # Детерминированная синтетическая система для замеров: при одинаковых
+    # параметрах и seed получается одна и та же система, вплоть до ID.
+    # transports - автобусы, trains - поезда (по 10 вагонов);
+    # routes=None - у каждой поездки свой маршрут, иначе поездки делят
+    # routes маршрутов. Из бронирований доля paid_share оплачена и подтверждена
+    counts = {'passengers': passengers, 'transports': transports, 'trips': trips,
+              'bookings': bookings, 'trains': trains, 'routes': routes or 0}
+    for name, count in counts.items():
+        if count < 0:
+            raise MyException(f"{name} не может быть отрицательным: {count}")
+    if trips and not transports + trains:
+        raise MyException(f"Для {trips} поездок нужен транспорт: transports и trains равны 0")
+    if bookings and not (trips and passengers):
+        raise MyException(f"Для {bookings} бронирований нужны поездки и пассажиры "
+                          f"(trips={trips}, passengers={passengers})")
+    if not 0 <= paid_share <= 1:
+        raise MyException(f"paid_share должен быть от 0 до 1: {paid_share}")
+
+    rnd = random.Random(seed)
+    system = BookingSystem()
+
+    passenger_list = []
+    for i in range(passengers):
+        name = f"{rnd.choice(FIRST_NAMES)} {rnd.choice(LAST_NAMES)}"
+        passenger_list.append(system.create_passenger(
+            name, f"user{i}@mail.ru", f"+7916{i:07d}", f"{i:010d}"))
+
+    fleet = []
+    for i in range(transports):
+        transport = Bus(f"BUS_{i:06d}", f"Модель {i % 5}", seats_per_transport,
+                        bool(i % 2), True)
+        for number in range(1, seats_per_transport + 1):
+            seat_class = ClassSeat.BUSINESS if number <= seats_per_transport // 5 \
+                else ClassSeat.ECONOMY
+            price = 2000.0 if seat_class == ClassSeat.BUSINESS else 1000.0
+            transport.add_seat(Seat(f"{number:02d}", seat_class, price))
+        system.add_transport(transport)
+        fleet.append(transport)
+
+    for i in range(trains):
+        train = Train(f"TRAIN_{i:06d}", f"Поезд {i % 3}", seats_per_train, 10)
+        for number in range(seats_per_train):
+            seat_class = ClassSeat.BUSINESS if number % 10 == 0 else ClassSeat.ECONOMY
+            price = 5000.0 if seat_class == ClassSeat.BUSINESS else 2500.0
+            train.add_seat(Seat(f"{number // 10 + 1:02d}-{number % 10 + 1}", seat_class,
+                                price))
+        system.add_transport(train)
+        fleet.append(train)
+
+    start = datetime(2024, 1, 1, 6, 0)
+
+    def make_route(index: int) -> Route:
+        departure, destination = rnd.sample(CITIES, 2)
+        departure_time = start + timedelta(hours=rnd.randrange(24 * 60))
+        route = Route(f"ROUTE_{index:06d}", departure, destination, departure_time,
+                      departure_time + timedelta(hours=rnd.randrange(1, 12)))
+        system.add_route(route)
+        return route
+
+    route_list = [make_route(i) for i in range(routes or 0)]
+    trip_list = []
+    for i in range(trips):
+        route = route_list[i % len(route_list)] if route_list else make_route(i)
+        trip = Trip(f"TRIP_{i:06d}", route, fleet[i % len(fleet)])
+        system.add_trip(trip)
+        trip_list.append(trip)
+
+    for i in range(bookings):
+        trip = rnd.choice(trip_list)
+        free = trip.get_available_seats()
+        if not free:
+            continue
+        passenger = rnd.choice(passenger_list)
+        booked = start - timedelta(minutes=i)  # Не datetime.now(): система должна повторяться
+        booking = Booking(f"BK_{i:08d}", trip, rnd.choice(free), booked)
+        system.add_booking(booking)
+        passenger.add_booking(booking)
+        if rnd.random() < paid_share:
+            payment = Payment(f"PAY_{i:07d}", booking.calculate_total_price(), "карта",
+                              booked)
+            payment.process_payment(1e9)
+            system.confirm_booking(booking, payment)
+
+    return system
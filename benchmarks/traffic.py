@@ -0,0 +1,350 @@
+import argparse
+import bisect
+import itertools
+import json
+import math
+import random
+import sys
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, TextIO, Tuple
+
+from action import Booking, Payment
+from benchmarks.suite import SIZES
+from benchmarks.synthetic import build_system
+from general_system import BookingSystem
+from jobwf import atomic_file
+from my_exceptions import MyException
+
+# Симулятор потока бронирований: поиск, бронирование с оплатой,
+# отмены и неудачные платежи. Популярность поездок - по закону Ципфа
+# (немногие рейсы собирают большую часть спроса), запросы приходят
+# пуассоновским потоком, в начале продаж - всплеск.
+#   python -m benchmarks.traffic run --duration 60 --trace trace.jsonl
+#   python -m benchmarks.traffic replay trace.jsonl
+# Каждая операция пишется в трассу (JSON Lines); повтор трассы на той же
+# исходной системе выполняет ровно те же вызовы.
+
+TRACE_VERSION = 1
+OPERATIONS = ('search', 'create_booking', 'process_payment', 'confirm_booking',
+              'cancel_booking')
+PAYMENT_METHODS = ('карта', 'карта', 'СБП', 'наличные')
+
+Record = Dict[str, Any]
+
+
+def percentile(values: List[float], q: float) -> float:
+    # Ранговый перцентиль по отсортированному списку
+    return values[max(0, math.ceil(q * len(values)) - 1)]
+
+
+class TrafficReport:
+    def __init__(self):
+        self.__latencies: Dict[str, List[float]] = {operation: [] for operation in OPERATIONS}
+        self.__errors: Dict[str, int] = dict.fromkeys(OPERATIONS, 0)
+        self.__elapsed = 0.0    # Реальное время прогона, с
+        self.__simulated = 0.0  # Время по трассе, с
+
+    @property
+    def elapsed(self) -> float:
+        return self.__elapsed
+
+    def _add(self, operation: str, seconds: float, ok: bool = True) -> None:
+        self.__latencies[operation].append(seconds)
+        if not ok:
+            self.__errors[operation] += 1
+
+    def _finish(self, elapsed: float, simulated: float) -> None:
+        self.__elapsed = elapsed
+        self.__simulated = simulated
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        # По каждой операции: число вызовов, ошибки, пропускная способность
+        # (вызовов в секунду прогона) и задержки в миллисекундах
+        result = {}
+        for operation, latencies in self.__latencies.items():
+            if not latencies:
+                continue
+            ordered = sorted(latencies)
+            result[operation] = {
+                'count': len(ordered),
+                'errors': self.__errors[operation],
+                'throughput': len(ordered) / self.__elapsed if self.__elapsed else 0.0,
+                'p50_ms': percentile(ordered, 0.50) * 1000,
+                'p95_ms': percentile(ordered, 0.95) * 1000,
+                'p99_ms': percentile(ordered, 0.99) * 1000,
+                'max_ms': ordered[-1] * 1000,
+            }
+        return result
+
+    def get_info(self) -> str:
+        lines = [f"Прогон {self.__elapsed:.2f} с (по трассе {self.__simulated:.1f} с)",
+                 f"{'операция':<18}{'вызовов':>9}{'ошибок':>8}{'в секунду':>11}"
+                 f"{'p50, мс':>9}{'p95, мс':>9}{'p99, мс':>9}{'max, мс':>9}"]
+        for operation, stats in self.summary().items():
+            lines.append(f"{operation:<18}{stats['count']:9}{stats['errors']:8}"
+                         f"{stats['throughput']:11.0f}{stats['p50_ms']:9.3f}"
+                         f"{stats['p95_ms']:9.3f}{stats['p99_ms']:9.3f}{stats['max_ms']:9.3f}")
+        return '\n'.join(lines)
+
+
+# Выполняет записи трассы на системе и замеряет каждый вызов.
+# Общий для прогона и повтора, чтобы замеры были одинаковыми
+class _Executor:
+    def __init__(self, system: BookingSystem, report: TrafficReport):
+        self.__system = system
+        self.__report = report
+        self.__bookings: Dict[int, Booking] = {}  # seq записи book -> бронирование
+
+    def is_active(self, seq: int) -> bool:
+        return seq in self.__bookings
+
+    def apply(self, record: Record) -> None:
+        operation = record['op']
+        if operation == 'search':
+            self.__timed('search', lambda: self.__system.find_trips(record['from'],
+                                                                    record['to']))
+        elif operation == 'book':
+            self.__book(record)
+        elif operation == 'cancel':
+            booking = self.__bookings.pop(record['ref'], None)
+            if booking is not None:
+                self.__timed('cancel_booking', lambda: self.__system.cancel_booking(booking))
+        else:
+            raise MyException(f"Неизвестная операция в трассе: {operation}")
+
+    def __book(self, record: Record) -> None:
+        system = self.__system
+        passenger = system.get_passenger(record['passport'])
+        trip = system.get_trip(record['trip'])
+        if passenger is None or trip is None:
+            raise MyException(f"Трасса не подходит к системе: запись {record['seq']}")
+
+        ok, booking = self.__timed('create_booking',
+                                   lambda: system.create_booking(passenger, trip, record['seat']))
+        if not ok:
+            return
+        self.__bookings[record['seq']] = booking
+        payment = Payment(f"SIM_{record['seq']:08d}", booking.calculate_total_price(),
+                          record['method'])
+        ok, _ = self.__timed('process_payment',
+                             lambda: payment.process_payment(record['balance']))
+        if ok:
+            self.__timed('confirm_booking', lambda: system.confirm_booking(booking, payment))
+
+    def __timed(self, operation: str, action: Callable[[], Any]) -> Tuple[bool, Any]:
+        # Ошибки предметной области (место занято, не хватает денег) - часть
+        # трафика: считаем их и продолжаем
+        start = time.perf_counter()
+        try:
+            result = action()
+        except MyException:
+            self.__report._add(operation, time.perf_counter() - start, ok=False)
+            return False, None
+        self.__report._add(operation, time.perf_counter() - start)
+        return True, result
+
+
+def _run(system: BookingSystem, make_records: Callable[[_Executor], Iterator[Record]],
+         trace: Optional[TextIO] = None, realtime: bool = False) -> TrafficReport:
+    # make_records получает исполнителя: генератору нужно знать, какие брони живы
+    report = TrafficReport()
+    executor = _Executor(system, report)
+    records = make_records(executor)
+    start = time.perf_counter()
+    last = 0.0
+    for record in records:
+        last = record['t']
+        if realtime:
+            # Запросы приходят по расписанию трассы, а не подряд
+            delay = start + last - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        executor.apply(record)
+        if trace is not None:
+            trace.write(json.dumps(record, ensure_ascii=False) + '\n')
+    report._finish(time.perf_counter() - start, last)
+    return report
+
+
+class TrafficSimulator:
+    def __init__(self, system: BookingSystem, seed: int = 42, rate: float = 200.0,
+                 burst_rate: float = 2000.0, sale_opens: Sequence[float] = (0.0,),
+                 burst_seconds: float = 5.0, zipf_exponent: float = 1.1,
+                 search_share: float = 0.5, book_share: float = 0.35,
+                 payment_failure: float = 0.1):
+        self.__system = system
+        self.__seed = seed
+        self.__rate = rate                    # Запросов в секунду в обычное время
+        self.__burst_rate = burst_rate        # ... и в первые burst_seconds после открытия продаж
+        self.__sale_opens = sorted(sale_opens)
+        self.__burst_seconds = burst_seconds
+        self.__zipf_exponent = zipf_exponent  # Чем больше, тем сильнее перекос популярности
+        self.__search_share = search_share    # Доли запросов; остальное - отмены
+        self.__book_share = book_share
+        self.__payment_failure = payment_failure  # Доля платежей, на которые не хватит денег
+
+    def run(self, duration: float, trace_filename: Optional[str] = None,
+            dataset: Optional[Dict[str, Any]] = None, realtime: bool = False) -> TrafficReport:
+        # dataset - параметры build_system исходной системы, пишутся в заголовок
+        # трассы, чтобы ее можно было повторить без этого объекта
+        def make_records(executor: _Executor) -> Iterator[Record]:
+            return self.__records(duration, executor)
+
+        if trace_filename is None:
+            return _run(self.__system, make_records, realtime=realtime)
+        with atomic_file(trace_filename) as f:
+            header = {'trace': TRACE_VERSION, 'seed': self.__seed, 'duration': duration,
+                      'dataset': dataset}
+            f.write(json.dumps(header, ensure_ascii=False) + '\n')
+            return _run(self.__system, make_records, f, realtime)
+
+    def __rate_at(self, t: float) -> Tuple[float, float]:
+        # Интенсивность в момент t и момент, до которого она не меняется
+        for opens in self.__sale_opens:
+            if opens <= t < opens + self.__burst_seconds:
+                return self.__burst_rate, opens + self.__burst_seconds
+            if t < opens:
+                return self.__rate, opens
+        return self.__rate, math.inf
+
+    def __arrivals(self, rnd: random.Random, duration: float) -> Iterator[float]:
+        # Неоднородный пуассоновский поток с кусочно-постоянной интенсивностью:
+        # на границе участка просто начинаем ждать заново (поток без памяти)
+        t = 0.0
+        while True:
+            rate, until = self.__rate_at(t)
+            t_next = t + rnd.expovariate(rate)
+            if t_next >= until:
+                t = until
+                continue
+            t = t_next
+            if t >= duration:
+                return
+            yield t
+
+    def __records(self, duration: float, executor: _Executor) -> Iterator[Record]:
+        rnd = random.Random(self.__seed)
+        system = self.__system
+        trips = sorted(system.trips.values(), key=lambda trip: trip.trip_id)
+        passports = sorted(system.passengers)
+        if not trips or not passports:
+            return
+        rnd.shuffle(trips)  # Место в рейтинге популярности
+        cumulative = list(itertools.accumulate(
+            1 / rank ** self.__zipf_exponent for rank in range(1, len(trips) + 1)))
+
+        def popular_trip():
+            return trips[bisect.bisect(cumulative, rnd.random() * cumulative[-1])]
+
+        booked: List[int] = []  # seq бронирований-кандидатов на отмену
+        seq = itertools.count()
+        for t in self.__arrivals(rnd, duration):
+            kind = rnd.random()
+            trip = popular_trip()
+            if kind < self.__search_share + self.__book_share:
+                free = trip.get_available_seats() if kind >= self.__search_share else None
+                if not free:
+                    # Поиск (в том числе, когда на выбранный рейс мест уже нет)
+                    yield {'seq': next(seq), 't': t, 'op': 'search',
+                           'from': trip.route.departure, 'to': trip.route.destination}
+                    continue
+                seat = rnd.choice(free)
+                failed = rnd.random() < self.__payment_failure
+                record = {'seq': next(seq), 't': t, 'op': 'book', 'trip': trip.trip_id,
+                          'seat': seat.number, 'passport': rnd.choice(passports),
+                          'method': rnd.choice(PAYMENT_METHODS),
+                          'balance': seat.price * (rnd.uniform(0.1, 0.9) if failed
+                                                   else rnd.uniform(1.0, 3.0))}
+                yield record
+                if failed:
+                    # Оплата не прошла - клиент бросает бронирование, место освобождается
+                    yield {'seq': next(seq), 't': t, 'op': 'cancel', 'ref': record['seq']}
+                elif executor.is_active(record['seq']):
+                    booked.append(record['seq'])
+            else:
+                # Отмена случайного действующего бронирования
+                while booked:
+                    index = rnd.randrange(len(booked))
+                    booked[index], booked[-1] = booked[-1], booked[index]
+                    ref = booked.pop()
+                    if executor.is_active(ref):
+                        yield {'seq': next(seq), 't': t, 'op': 'cancel', 'ref': ref}
+                        break
+
+
+def read_trace(filename: str) -> Tuple[Dict[str, Any], Iterator[Record]]:
+    # Заголовок трассы и ее записи (читаются по одной)
+    try:
+        f = open(filename, 'r', encoding='utf-8')
+    except FileNotFoundError:
+        raise MyException(f"Файл трассы не найден: {filename}")
+    try:
+        header = json.loads(f.readline())
+    except json.JSONDecodeError as e:
+        f.close()
+        raise MyException(f"Ошибка чтения трассы {filename}: {e}")
+    if header.get('trace') != TRACE_VERSION:
+        f.close()
+        raise MyException(f"Неподдерживаемая версия трассы в {filename}")
+
+    def records() -> Iterator[Record]:
+        with f:
+            for number, line in enumerate(f, start=2):
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise MyException(f"Ошибка в строке {number} трассы {filename}: {e}")
+
+    return header, records()
+
+
+def replay(system: BookingSystem, records: Iterator[Record],
+           realtime: bool = False) -> TrafficReport:
+    # Записи из read_trace; system должна совпадать с исходной системой прогона
+    return _run(system, lambda executor: records, realtime=realtime)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.traffic')
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run', help="прогнать поток запросов")
+    run_parser.add_argument('--size', default='medium', choices=list(SIZES))
+    run_parser.add_argument('--duration', type=float, default=30.0, help="секунд по трассе")
+    run_parser.add_argument('--rate', type=float, default=200.0)
+    run_parser.add_argument('--burst-rate', type=float, default=2000.0)
+    run_parser.add_argument('--burst-seconds', type=float, default=5.0)
+    run_parser.add_argument('--zipf', type=float, default=1.1)
+    run_parser.add_argument('--payment-failure', type=float, default=0.1)
+    run_parser.add_argument('--seed', type=int, default=42)
+    run_parser.add_argument('--trace', help="куда записать трассу")
+    replay_parser = commands.add_parser('replay', help="повторить трассу")
+    replay_parser.add_argument('trace')
+    for command in (run_parser, replay_parser):
+        command.add_argument('--realtime', action='store_true',
+                             help="выдерживать интервалы трассы, а не выполнять подряд")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == 'run':
+            dataset = SIZES[args.size]
+            simulator = TrafficSimulator(build_system(**dataset), seed=args.seed,
+                                         rate=args.rate, burst_rate=args.burst_rate,
+                                         burst_seconds=args.burst_seconds,
+                                         zipf_exponent=args.zipf,
+                                         payment_failure=args.payment_failure)
+            report = simulator.run(args.duration, args.trace, dataset, args.realtime)
+        else:
+            header, records = read_trace(args.trace)
+            if not header.get('dataset'):
+                print("В трассе нет параметров исходной системы")
+                return 1
+            report = replay(build_system(**header['dataset']), records, args.realtime)
+    except MyException as e:
+        print(e)
+        return 1
+    print(report.get_info())
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
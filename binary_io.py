@@ -0,0 +1,352 @@
+import gc
+import struct
+import sys
+from contextlib import contextmanager
+from array import array
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Tuple
+
+from action import Booking, BookingStatus, Payment
+from general_system import BookingSystem
+from jobwf import DataReader, DataWriter, atomic_file, count_records
+from my_exceptions import MyException
+from person import Passenger
+from seat import ClassSeat, Seat
+from transports import Bus, Train, Transport
+from trip import Route, Trip
+from tracing import span
+
+# Бинарный формат снимка: вместо текста храним колонки упакованных массивов.
+# Все строки лежат один раз в таблице строк, в колонках - только их номера,
+# даты - int64 микросекунд от эпохи, перечисления - номера в байт.
+# Строки в таблице разделены нулевым символом.
+# Цель "в 10 раз быстрее JSON" выполнена только для разбора формата
+# (read_columns). Запись и полная загрузка упираются в обход и создание
+# объектов Python, одинаковые для обоих форматов, и быстрее JSON в 2-5 раз
+# (см. benchmarks/bench_binary.py).
+MAGIC = b'BKSB'
+VERSION = 1
+HEADER_SIZE = len(MAGIC) + 1  # Сигнатура и байт версии
+SEPARATOR = '\0'
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+NO_STRING = 0xFFFFFFFF  # Номер строки для отсутствующего значения
+
+TRANSPORT_TYPES = [Transport, Bus, Train]
+SEAT_CLASSES = list(ClassSeat)
+BOOKING_STATUSES = list(BookingStatus)
+
+_COUNT = struct.Struct('<I')
+_STRINGS_HEADER = struct.Struct('<II')  # Число строк и размер блока в байтах
+_BIG_ENDIAN = sys.byteorder == 'big'  # Массивы в файле всегда little-endian
+
+
+def _to_epoch(value: datetime) -> int:
+    return (value - EPOCH) // MICROSECOND
+
+
+def _from_epoch(value: int) -> datetime:
+    return EPOCH + timedelta(microseconds=value)
+
+
+# Таблица строк без повторов: одинаковые города, модели и т.п. хранятся один раз.
+# Строка -> номер; известная строка ищется обычным обращением к словарю (на C),
+# и только новая доходит до __missing__
+class _StringTable(dict):
+    def __init__(self):
+        super().__init__()
+        self[None] = NO_STRING
+        self.strings: List[str] = []
+
+    def __missing__(self, value: str) -> int:
+        if SEPARATOR in value:
+            raise MyException(f"Строка с нулевым символом не записывается: {value!r}")
+        code = self[value] = len(self.strings)
+        self.strings.append(value)
+        return code
+
+
+class BinaryWriter(DataWriter):
+    def write(self, system: BookingSystem, filename: str) -> None:
+        with span('binary_write', file=filename) as trace:
+            if trace:
+                trace.set(records=count_records(system))
+            self.__write(system, filename)
+
+    def __write(self, system: BookingSystem, filename: str) -> None:
+        strings = _StringTable()
+        with span('build_columns'):
+            columns = self._build_columns(system, strings)
+
+        try:
+            with span('write_file') as trace, atomic_file(filename, 'wb') as f:
+                f.write(MAGIC + bytes([VERSION]))
+                self._write_strings(f, strings.strings)
+                for typecode, values in columns:
+                    self._write_array(f, typecode, values)
+                if trace:
+                    trace.set(bytes=f.tell())
+        except IOError as e:
+            raise MyException(f"Ошибка записи бинарного файла: {e}")
+        system.mark_saved()  # Полный снимок - новая база для дельт
+
+    def _build_columns(self, system: BookingSystem, strings: _StringTable) -> list:
+        # Раскладываем систему по колонкам; порядок колонок фиксирован и совпадает с читателем
+        s = strings.__getitem__
+
+        passengers = list(system.passengers.values())
+        transports = list(system.transports.values())
+        routes = list(system.routes.values())
+        trips = list(system.trips.values())
+        bookings = list(system.bookings.values())
+        seats = [transport.seats for transport in transports]
+        payments = [booking.payment for booking in bookings]
+
+        def flat(column):
+            return [value for transport_seats in seats for value in map(column, transport_seats)]
+
+        return [
+            # Пассажиры
+            ('I', [s(p.name) for p in passengers]),
+            ('I', [s(p.email) for p in passengers]),
+            ('I', [s(p.phone) for p in passengers]),
+            ('I', [s(p.passport) for p in passengers]),
+            # Транспорт
+            ('I', [s(t.transport_id) for t in transports]),
+            ('I', [s(t.model) for t in transports]),
+            ('q', [t.capacity for t in transports]),
+            ('B', [TRANSPORT_TYPES.index(type(t)) for t in transports]),
+            ('B', [isinstance(t, Bus) and t.has_wifi for t in transports]),
+            ('B', [isinstance(t, Bus) and t.has_usb_charging for t in transports]),
+            ('q', [t.car_count if isinstance(t, Train) else 0 for t in transports]),
+            ('I', [len(transport_seats) for transport_seats in seats]),
+            # Места всех транспортов подряд
+            ('I', flat(lambda seat: s(seat.number))),
+            ('B', flat(lambda seat: SEAT_CLASSES.index(seat.seat_class))),
+            ('d', flat(lambda seat: seat.price)),
+            ('B', flat(lambda seat: seat.is_available)),
+            # Маршруты
+            ('I', [s(r.route_id) for r in routes]),
+            ('I', [s(r.departure) for r in routes]),
+            ('I', [s(r.destination) for r in routes]),
+            ('q', [_to_epoch(r.departure_time) for r in routes]),
+            ('q', [_to_epoch(r.arrival_time) for r in routes]),
+            # Поездки
+            ('I', [s(t.trip_id) for t in trips]),
+            ('I', [s(t.route.route_id) for t in trips]),
+            ('I', [s(t.transport.transport_id) for t in trips]),
+            # Бронирования
+            ('I', [s(b.booking_id) for b in bookings]),
+            ('I', [s(b.trip.trip_id) for b in bookings]),
+            ('I', [s(b.seat.number) for b in bookings]),
+            ('q', [_to_epoch(b.booking_date) for b in bookings]),
+            ('B', [BOOKING_STATUSES.index(b.status) for b in bookings]),
+            ('I', [s(system.get_booking_owner(b.booking_id)) for b in bookings]),
+            # Платежи (по одному на бронирование, NO_STRING - платежа нет)
+            ('I', [s(p.payment_id) if p else NO_STRING for p in payments]),
+            ('d', [p.amount if p else 0.0 for p in payments]),
+            ('I', [s(p.payment_method) if p else NO_STRING for p in payments]),
+            ('q', [_to_epoch(p.payment_date) if p else 0 for p in payments]),
+            ('B', [p.is_paid if p else False for p in payments]),
+        ]
+
+    @staticmethod
+    def _write_array(f, typecode: str, values) -> None:
+        data = array(typecode, values)
+        if _BIG_ENDIAN:
+            data.byteswap()
+        f.write(typecode.encode('ascii'))
+        f.write(_COUNT.pack(len(data)))
+        f.write(data.tobytes())
+
+    @staticmethod
+    def _write_strings(f, strings: List[str]) -> None:
+        # Число строк и один блок через разделитель: при чтении весь блок
+        # декодируется и делится на строки двумя вызовами
+        blob = SEPARATOR.join(strings).encode('utf-8')
+        f.write(_COUNT.pack(len(strings)))
+        f.write(_COUNT.pack(len(blob)))
+        f.write(blob)
+
+
+@contextmanager
+def _gc_paused():
+    # Загрузка создает сотни тысяч объектов подряд, и сборщик мусора
+    # раз за разом обходит их, хотя мусора среди них нет. На время сборки
+    # системы он выключается (если его не выключили до нас)
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+class BinaryReader(DataReader):
+    def read(self, filename: str) -> BookingSystem:
+        with span('binary_read', file=filename) as trace:
+            strings, columns = self.read_columns(filename)
+            try:
+                with span('restore_system'), _gc_paused():
+                    system = self._restore_system(strings, iter(columns))
+            except (StopIteration, IndexError) as e:
+                raise MyException(f"Поврежденный бинарный файл {filename}: {e}")
+            if trace:
+                trace.set(records=count_records(system))
+        system.mark_saved()  # Только что загруженная система ничего не меняла
+        return system
+
+    @staticmethod
+    def read_columns(filename: str) -> Tuple[List[str], List[array]]:
+        # Только разбор формата: таблица строк и колонки, без создания объектов
+        try:
+            with span('read_file') as trace, open(filename, 'rb') as f:
+                data = f.read()
+                trace.set(bytes=len(data))
+        except FileNotFoundError:
+            raise MyException(f"Бинарный файл не найден: {filename}")
+
+        if len(data) < HEADER_SIZE or data[:4] != MAGIC or data[4] != VERSION:
+            raise MyException(f"Некорректный бинарный формат в файле {filename}")
+
+        try:
+            with span('parse'):
+                stream = _ArrayStream(data, HEADER_SIZE)
+                strings = stream.read_strings()
+                columns = []
+                while not stream.at_end():
+                    columns.append(stream.read())
+        except (struct.error, ValueError, UnicodeDecodeError) as e:
+            raise MyException(f"Поврежденный бинарный файл {filename}: {e}")
+        return strings, columns
+
+    @staticmethod
+    def _restore_system(strings: List[str], columns: Iterator[array]) -> BookingSystem:
+        system = BookingSystem()
+        column = columns.__next__
+
+        def text(index: int):
+            return None if index == NO_STRING else strings[index]
+
+        # Пассажиры (в снимок попадают только проверенные данные - не валидируем заново)
+        names, emails, phones, passports = column(), column(), column(), column()
+        passenger_map = {}
+        for name, email, phone, passport in zip(names, emails, phones, passports):
+            passenger = Passenger.restore(strings[name], strings[email], strings[phone],
+                                          strings[passport])
+            passenger_map[passenger.passport] = passenger
+        system.set_passengers(passenger_map)
+
+        # Транспорт и места
+        transport_ids, models, capacities, types = column(), column(), column(), column()
+        wifi, usb, car_counts, seat_counts = column(), column(), column(), column()
+        numbers, classes, prices, available = column(), column(), column(), column()
+
+        transport_map = {}
+        seat_index = {}  # (ID транспорта, номер места) -> место, чтобы не искать перебором
+        position = 0
+        for i, transport_id in enumerate(map(strings.__getitem__, transport_ids)):
+            transport_type = TRANSPORT_TYPES[types[i]]
+            if transport_type is Bus:
+                transport = Bus(transport_id, strings[models[i]], capacities[i],
+                                bool(wifi[i]), bool(usb[i]))
+            elif transport_type is Train:
+                transport = Train(transport_id, strings[models[i]], capacities[i], car_counts[i])
+            else:
+                transport = Transport(transport_id, strings[models[i]], capacities[i])
+
+            for j in range(position, position + seat_counts[i]):
+                seat = Seat(strings[numbers[j]], SEAT_CLASSES[classes[j]], prices[j],
+                            bool(available[j]))
+                transport.add_seat(seat)
+                seat_index[transport_id, seat.number] = seat
+            position += seat_counts[i]
+            transport_map[transport_id] = transport
+        system.set_transports(transport_map)
+
+        # Маршруты
+        route_ids, departures, destinations = column(), column(), column()
+        departure_times, arrival_times = column(), column()
+        route_map = {}
+        for i, route_id in enumerate(map(strings.__getitem__, route_ids)):
+            route_map[route_id] = Route(route_id, strings[departures[i]],
+                                        strings[destinations[i]],
+                                        _from_epoch(departure_times[i]),
+                                        _from_epoch(arrival_times[i]))
+        system.set_routes(route_map)
+
+        # Поездки
+        trip_ids, trip_routes, trip_transports = column(), column(), column()
+        trip_map = {}
+        for trip_id, route_id, transport_id in zip(trip_ids, trip_routes, trip_transports):
+            route = route_map.get(strings[route_id])
+            transport = transport_map.get(strings[transport_id])
+            if route and transport:
+                trip_map[strings[trip_id]] = Trip(strings[trip_id], route, transport)
+        system.set_trips(trip_map)
+
+        # Бронирования и платежи
+        booking_ids, booking_trips, seat_numbers = column(), column(), column()
+        booking_dates, statuses, owners = column(), column(), column()
+        payment_ids, amounts, methods, payment_dates, paid = (column(), column(), column(),
+                                                              column(), column())
+
+        for i, booking_id in enumerate(map(strings.__getitem__, booking_ids)):
+            trip = trip_map.get(strings[booking_trips[i]])
+            if not trip:
+                continue
+            seat = seat_index.get((trip.transport.transport_id, strings[seat_numbers[i]]))
+            if not seat:
+                continue
+
+            booking = Booking(booking_id, trip, seat, _from_epoch(booking_dates[i]),
+                              BOOKING_STATUSES[statuses[i]])
+            if booking.status == BookingStatus.CONFIRMED:
+                seat._restore_availability(False)
+
+            if payment_ids[i] != NO_STRING:
+                booking.add_payment(Payment(strings[payment_ids[i]], amounts[i],
+                                            text(methods[i]), _from_epoch(payment_dates[i]),
+                                            bool(paid[i])))
+
+            system.add_booking(booking)
+            passenger = passenger_map.get(text(owners[i]))
+            if passenger:
+                passenger.add_booking(booking)
+
+        return system
+
+
+# Последовательное чтение массивов из буфера файла.
+# Каждый массив: код типа (1 байт), количество элементов (uint32), данные
+class _ArrayStream:
+    def __init__(self, data: bytes, offset: int):
+        self.__data = memoryview(data)
+        self.__offset = offset
+
+    def at_end(self) -> bool:
+        return self.__offset >= len(self.__data)
+
+    def read(self) -> array:
+        typecode = chr(self.__data[self.__offset])
+        (count,) = _COUNT.unpack_from(self.__data, self.__offset + 1)
+        self.__offset += 1 + _COUNT.size
+        result = array(typecode)
+        size = count * result.itemsize
+        result.frombytes(self.__data[self.__offset:self.__offset + size])
+        if _BIG_ENDIAN:
+            result.byteswap()
+        self.__offset += size
+        return result
+
+    def read_strings(self) -> List[str]:
+        (count, size) = _STRINGS_HEADER.unpack_from(self.__data, self.__offset)
+        self.__offset += _STRINGS_HEADER.size
+        text = str(self.__data[self.__offset:self.__offset + size], 'utf-8')
+        self.__offset += size
+        strings = text.split(SEPARATOR) if count else []
+        if len(strings) != count:
+            raise ValueError(f"в таблице {len(strings)} строк вместо {count}")
+        return strings
@@ -0,0 +1,173 @@
+import csv
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from general_system import BookingSystem
+from my_exceptions import MyException
+from person import Passenger
+
+# Массовый импорт пассажиров из списков партнеров. Строки проверяются
+# пачками (при желании - в пуле процессов) теми же правилами, что и в
+# Passenger, но ошибка не прерывает импорт: по каждой строке собираются
+# все ошибки сразу, а корректные пассажиры добавляются в систему одним проходом.
+
+FIELDS = ('name', 'email', 'phone', 'passport')
+
+# Проверки Passenger для каждого поля (в порядке FIELDS)
+CHECKS = (Passenger._validate_name, Passenger._validate_email,
+          Passenger._validate_phone, Passenger._validate_passport)
+
+# Результат проверки строки: (номер, паспорт из строки,
+# проверенный пассажир или None, ошибки)
+RowResult = Tuple[int, str, Optional[Passenger], List[str]]
+
+
+class RowError:
+    def __init__(self, row: int, passport: str, messages: List[str]):
+        self.__row = row              # Номер строки данных (с 1, без заголовка)
+        self.__passport = passport    # Как указан в строке (может быть пустым)
+        self.__messages = messages
+
+    @property
+    def row(self) -> int:
+        return self.__row
+
+    @property
+    def passport(self) -> str:
+        return self.__passport
+
+    @property
+    def messages(self) -> List[str]:
+        return self.__messages.copy()
+
+    def __repr__(self) -> str:
+        return f"Строка {self.__row} ({self.__passport}): {'; '.join(self.__messages)}"
+
+
+class ImportReport:
+    def __init__(self):
+        self.__total = 0
+        self.__imported = 0
+        self.__errors: List[RowError] = []
+
+    @property
+    def total(self) -> int:
+        return self.__total
+
+    @property
+    def imported(self) -> int:
+        return self.__imported
+
+    @property
+    def errors(self) -> List[RowError]:
+        return self.__errors.copy()
+
+    def is_ok(self) -> bool:
+        return not self.__errors
+
+    def _add_row(self) -> None:
+        self.__total += 1
+
+    def _add_error(self, error: RowError) -> None:
+        self.__errors.append(error)
+
+    def _set_imported(self, count: int) -> None:
+        self.__imported = count
+
+    def get_info(self) -> str:
+        return (f"Импорт пассажиров: строк {self.__total}, добавлено {self.__imported}, "
+                f"с ошибками {len(self.__errors)}")
+
+
+def read_csv_rows(filename: str, delimiter: str = ',') -> Iterator[Dict[str, str]]:
+    # Строки CSV с заголовком name,email,phone,passport - читаются по одной
+    try:
+        with open(filename, 'r', encoding='utf-8-sig', newline='') as f:
+            reader = csv.DictReader(f, delimiter=delimiter)
+            missing = [field for field in FIELDS if field not in (reader.fieldnames or [])]
+            if missing:
+                raise MyException(f"В файле {filename} нет колонок: {', '.join(missing)}")
+            yield from reader
+    except FileNotFoundError:
+        raise MyException(f"CSV файл не найден: {filename}")
+    except (csv.Error, UnicodeDecodeError) as e:
+        raise MyException(f"Ошибка чтения CSV {filename}: {e}")
+
+
+def validate_batch(batch: List[Tuple[int, Dict[str, Any]]]) -> List[RowResult]:
+    # Проверяет пачку строк (выполняется и в дочерних процессах).
+    # Правила берем у самого Passenger, вызывая проверки по одной,
+    # чтобы собрать ошибки всех полей, а не только первого
+    results = []
+    for number, row in batch:
+        values = [str(row.get(field) or '').strip() for field in FIELDS]
+        passenger = Passenger.restore(*values)
+        messages = []
+        for field, value, check in zip(FIELDS, values, CHECKS):
+            if not value:
+                messages.append(f"Не заполнено поле {field}")
+                continue
+            try:
+                check(passenger)  # Телефон и паспорт заодно нормализуются
+            except ValueError as e:
+                messages.append(str(e))
+        results.append((number, values[3], None if messages else passenger, messages))
+    return results
+
+
+class PassengerImporter:
+    def __init__(self, system: BookingSystem, batch_size: int = 5000, workers: int = 1):
+        self.__system = system
+        self.__batch_size = batch_size
+        self.__workers = workers  # > 1 - проверка пачек в пуле процессов
+
+    def import_csv(self, filename: str, delimiter: str = ',') -> ImportReport:
+        return self.import_rows(read_csv_rows(filename, delimiter))
+
+    def import_rows(self, rows: Iterable[Dict[str, Any]]) -> ImportReport:
+        report = ImportReport()
+        passengers: List[Passenger] = []
+        seen = set()  # Паспорта, уже принятые в этом импорте
+
+        for number, raw_passport, passenger, messages in self.__validated(self.__batches(rows)):
+            report._add_row()
+            if passenger is not None:
+                passport = passenger.passport
+                if self.__system.get_passenger(passport) is not None or passport in seen:
+                    messages = [f"Пассажир с паспортом {passport} уже существует"]
+                else:
+                    seen.add(passport)
+                    passengers.append(passenger)
+                    continue
+            report._add_error(RowError(number, raw_passport, messages))
+
+        # Все проверки пройдены до вставки - добавляем одним проходом
+        report._set_imported(self.__system.add_passengers(passengers))
+        return report
+
+    def __batches(self, rows: Iterable[Dict[str, Any]]) -> Iterator[List[Tuple[int, Dict]]]:
+        numbered = enumerate(rows, start=1)
+        while True:
+            batch = list(islice(numbered, self.__batch_size))
+            if not batch:
+                return
+            yield batch
+
+    def __validated(self, batches: Iterator[List[Tuple[int, Dict]]]) -> Iterator[RowResult]:
+        if self.__workers <= 1:
+            for batch in batches:
+                yield from validate_batch(batch)
+            return
+
+        # В работе держим не больше двух пачек на процесс, чтобы
+        # не читать весь файл в память раньше, чем он проверен
+        with ProcessPoolExecutor(max_workers=self.__workers) as executor:
+            pending = deque()
+            for batch in batches:
+                pending.append(executor.submit(validate_batch, batch))
+                if len(pending) >= self.__workers * 2:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
@@ -0,0 +1,170 @@
+import calendar
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from seat import ClassSeat, Seat
+from transports import Transport
+from trip import Trip
+
+# Календарь самых дешевых билетов: для каждой пары городов и дня - минимальная
+# цена свободного места по каждому классу. Строится один раз по всем поездкам
+# (BookingSystem.set_fare_calendar), а дальше обновляется по уведомлениям
+# мест. Вместе с минимумом хранится, сколько свободных мест продается по этой
+# цене: продажа одного из них только уменьшает счетчик, и лишь когда проданы
+# все, заново пересчитывается один день одной пары городов.
+
+FareKey = Tuple[str, str, date]  # (откуда, куда, день отправления)
+Fares = Dict[ClassSeat, List]    # Класс -> [минимальная цена, свободных мест по ней]
+
+
+def _min_fares(transport: Transport) -> Fares:
+    # Минимальные цены свободных мест по классам (один проход по местам)
+    fares: Fares = {}
+    for seat in transport.seats:
+        if seat.is_available:
+            current = fares.get(seat.seat_class)
+            if current is None or seat.price < current[0]:
+                fares[seat.seat_class] = [seat.price, 1]
+            elif seat.price == current[0]:
+                current[1] += 1
+    return fares
+
+
+def _merge(fares: Fares, other: Fares) -> None:
+    for seat_class, (price, count) in other.items():
+        current = fares.get(seat_class)
+        if current is None or price < current[0]:
+            fares[seat_class] = [price, count]
+        elif price == current[0]:
+            current[1] += count
+
+
+class FareCalendar:
+    def __init__(self):
+        self.__fares: Dict[FareKey, Fares] = {}
+        self.__trips: Dict[str, Tuple[FareKey, Trip]] = {}  # ID поездки -> ее день
+        # Места принадлежат транспорту, а не поездке: один транспорт может
+        # ездить в разные дни, и изменение места касается их всех.
+        # День -> ID транспорта -> сколько поездок этого дня на нем
+        self.__key_transports: Dict[FareKey, Dict[str, int]] = {}
+        self.__transports: Dict[str, Transport] = {}
+        self.__transport_keys: Dict[str, Set[FareKey]] = {}
+        self.__recomputed = 0  # Сколько раз день пересчитывался целиком
+
+    @property
+    def recomputed(self) -> int:
+        return self.__recomputed
+
+    def __len__(self) -> int:
+        return len(self.__fares)
+
+    def clear(self) -> None:
+        self.__fares.clear()
+        self.__trips.clear()
+        self.__key_transports.clear()
+        self.__transports.clear()
+        self.__transport_keys.clear()
+
+    def build(self, trips: Iterable[Trip]) -> None:
+        # Полное построение: минимумы каждого транспорта считаются один раз
+        self.clear()
+        for trip in trips:
+            self.__index(trip)
+        transport_fares: Dict[str, Fares] = {}
+        for key, transport_ids in self.__key_transports.items():
+            fares = self.__fares[key] = {}
+            for transport_id in transport_ids:
+                if transport_id not in transport_fares:
+                    transport_fares[transport_id] = _min_fares(self.__transports[transport_id])
+                _merge(fares, transport_fares[transport_id])
+
+    def add_trip(self, trip: Trip) -> None:
+        if trip.trip_id in self.__trips:
+            self.remove_trip(trip.trip_id)
+        key, is_new = self.__index(trip)
+        if is_new:  # Места транспорта, уже учтенного в этом дне, второй раз не считаем
+            _merge(self.__fares.setdefault(key, {}), _min_fares(trip.transport))
+
+    def remove_trip(self, trip_id: str) -> None:
+        entry = self.__trips.pop(trip_id, None)
+        if entry is None:
+            return
+        key, trip = entry
+        transport_id = trip.transport.transport_id
+        transport_ids = self.__key_transports[key]
+        transport_ids[transport_id] -= 1
+        if transport_ids[transport_id]:
+            return
+        del transport_ids[transport_id]
+        keys = self.__transport_keys[transport_id]
+        keys.discard(key)
+        if not keys:
+            del self.__transport_keys[transport_id]
+            del self.__transports[transport_id]
+        if transport_ids:
+            self.__recompute(key)
+        else:
+            del self.__key_transports[key]
+            del self.__fares[key]
+
+    def __index(self, trip: Trip) -> Tuple[FareKey, bool]:
+        route = trip.route
+        transport = trip.transport
+        key = (route.departure, route.destination, route.departure_time.date())
+        self.__trips[trip.trip_id] = (key, trip)
+        transport_ids = self.__key_transports.setdefault(key, {})
+        is_new = transport.transport_id not in transport_ids
+        transport_ids[transport.transport_id] = transport_ids.get(transport.transport_id, 0) + 1
+        self.__transports[transport.transport_id] = transport
+        self.__transport_keys.setdefault(transport.transport_id, set()).add(key)
+        return key, is_new
+
+    def on_seat_changed(self, transport: Transport, seat: Seat) -> None:
+        # Место забронировано, освобождено или добавлено в транспорт
+        # (Seat уведомляет только о настоящей смене состояния)
+        keys = self.__transport_keys.get(transport.transport_id)
+        if not keys:
+            return
+        seat_class = seat.seat_class
+        price = seat.price
+        available = seat.is_available
+        for key in keys:
+            fares = self.__fares[key]
+            current = fares.get(seat_class)
+            if available:
+                if current is None or price < current[0]:
+                    fares[seat_class] = [price, 1]
+                elif price == current[0]:
+                    current[1] += 1
+            elif current is not None and price == current[0]:
+                current[1] -= 1
+                if not current[1]:  # Продано последнее место по минимальной цене
+                    self.__recompute(key)
+
+    def __recompute(self, key: FareKey) -> None:
+        fares: Fares = {}
+        for transport_id in self.__key_transports[key]:
+            _merge(fares, _min_fares(self.__transports[transport_id]))
+        self.__fares[key] = fares
+        self.__recomputed += 1
+
+    def cheapest(self, departure: str, destination: str,
+                 day: date) -> Dict[ClassSeat, float]:
+        # Пустой словарь - в этот день поездок нет или все места проданы
+        fares = self.__fares.get((departure, destination, day), {})
+        return {seat_class: price for seat_class, (price, _) in fares.items()}
+
+    def cheapest_for_class(self, departure: str, destination: str, day: date,
+                           seat_class: ClassSeat) -> Optional[float]:
+        fare = self.__fares.get((departure, destination, day), {}).get(seat_class)
+        return fare[0] if fare is not None else None
+
+    def month(self, departure: str, destination: str,
+              year: int, month: int) -> Dict[date, Dict[ClassSeat, float]]:
+        # Календарь на месяц: только дни, в которые есть поездки
+        result = {}
+        for number in range(1, calendar.monthrange(year, month)[1] + 1):
+            day = date(year, month, number)
+            if (departure, destination, day) in self.__fares:
+                result[day] = self.cheapest(departure, destination, day)
+        return result
@@ -1,12 +1,20 @@
 import uuid
 from datetime import datetime
-from typing import Dict, List
+from types import MappingProxyType
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
 
-from action import Booking
+from action import Booking, BookingStatus, Payment
 from my_exceptions import SeatNotAvailableException, BookingNotFoundException
 from person import Passenger
+from seat import Seat
+from fare_calendar import FareCalendar
+from indexes import BookingIndex, PassengerIndex
+from ledger import Ledger
+from memory_report import DEFAULT_SAMPLE_SIZE, MemoryReport, build_memory_report
+from tracking import ChangeSet
 from transports import Transport, TransportType, Bus, Train
 from trip import Route, Trip
+from waitlist import Waitlist, WaitlistEntry
 
 
 class BookingSystem:
@@ -17,6 +25,15 @@ class BookingSystem:
         self.__routes: Dict[str, Route] = {}          # Маршруты по ID
         self.__trips: Dict[str, Trip] = {}            # Поездки по ID
         self.__bookings: Dict[str, Booking] = {}      # Бронирования по ID
+        self.__journal = None                         # Журнал событий (если подключен)
+        self.__metrics = None                         # Реестр метрик (если подключен)
+        self.__fare_calendar: Optional[FareCalendar] = None  # Самые дешевые билеты по дням
+        self.__waitlist: Optional[Waitlist] = None    # Лист ожидания на распроданные поездки
+        self.__ledger: Optional[Ledger] = None        # Журнал списаний и возвратов
+        self.__changes = ChangeSet()                  # Что изменилось с прошлого сохранения
+        self.__booking_owners: Dict[str, str] = {}    # ID бронирования -> паспорт владельца
+        self.__passenger_index = PassengerIndex()     # Поиск по email, телефону и имени
+        self.__booking_index = BookingIndex()         # Бронирования по поездкам и местам
 
     def __repr__(self) -> str:
         """Красивое строковое представление системы"""
@@ -86,10 +103,9 @@ class BookingSystem:
         for booking_id, booking in self.__bookings.items():
             # Находим пассажира для этого бронирования
             passenger_name = "Неизвестно"
-            for passenger in self.__passengers.values():
-                if booking in passenger.bookings:
-                    passenger_name = passenger.name
-                    break
+            owner = self.__passengers.get(self.__booking_owners.get(booking_id))
+            if owner is not None:
+                passenger_name = owner.name
 
             status = status_translation.get(booking.status.value, booking.status.value.upper())
 
@@ -128,63 +144,284 @@ class BookingSystem:
         lines.append("=" * 80)
         return "\n".join(lines)
 
-    # геттеры
+    # геттеры: живые представления "только для чтения" вместо копий.
+    # Изменять систему во время обхода нельзя (словарь изменится во время
+    # итерации) - для этого обходите копию: list(system.bookings.values())
     @property
-    def passengers(self) -> Dict[str, Passenger]:
-        return self.__passengers.copy()
+    def passengers(self) -> Mapping[str, Passenger]:
+        return MappingProxyType(self.__passengers)
 
     @property
-    def transports(self) -> Dict[str, Transport]:
-        return self.__transports.copy()
+    def transports(self) -> Mapping[str, Transport]:
+        return MappingProxyType(self.__transports)
 
     @property
-    def routes(self) -> Dict[str, Route]:
-        return self.__routes.copy()
+    def routes(self) -> Mapping[str, Route]:
+        return MappingProxyType(self.__routes)
 
     @property
-    def trips(self) -> Dict[str, Trip]:
-        return self.__trips.copy()
+    def trips(self) -> Mapping[str, Trip]:
+        return MappingProxyType(self.__trips)
 
     @property
-    def bookings(self) -> Dict[str, Booking]:
-        return self.__bookings.copy()
+    def bookings(self) -> Mapping[str, Booking]:
+        return MappingProxyType(self.__bookings)
+
+    # Поиск отдельных объектов по ключу (без копирования словарей)
+    def get_passenger(self, passport: str) -> Optional[Passenger]:
+        return self.__passengers.get(passport)
+
+    def get_transport(self, transport_id: str) -> Optional[Transport]:
+        return self.__transports.get(transport_id)
+
+    def get_route(self, route_id: str) -> Optional[Route]:
+        return self.__routes.get(route_id)
+
+    def get_trip(self, trip_id: str) -> Optional[Trip]:
+        return self.__trips.get(trip_id)
+
+    def get_booking(self, booking_id: str) -> Optional[Booking]:
+        return self.__bookings.get(booking_id)
 
     # Сеттеры для восстановления системы
     def set_passengers(self, passengers: Dict[str, Passenger]) -> None:
         self.__passengers = passengers
+        self.__passenger_index.clear()
+        for passenger in passengers.values():
+            self.__track_passenger(passenger)
 
     def set_transports(self, transports: Dict[str, Transport]) -> None:
         self.__transports = transports
+        for transport in transports.values():
+            self.__track_transport(transport)
 
     def set_routes(self, routes: Dict[str, Route]) -> None:
         self.__routes = routes
+        self.__changes.routes.update(routes)
 
     def set_trips(self, trips: Dict[str, Trip]) -> None:
         self.__trips = trips
+        self.__changes.trips.update(trips)
+        if self.__fare_calendar is not None:
+            self.__fare_calendar.build(trips.values())
 
     def set_bookings(self, bookings: Dict[str, Booking]) -> None:
         self.__bookings = bookings
+        self.__booking_index.clear()
+        for booking in bookings.values():
+            self.__track_booking(booking)
+
+    # Отслеживание изменений: объекты сами сообщают системе, что поменялись
+    def __track_passenger(self, passenger: Passenger) -> None:
+        passenger.set_observer(self._on_passenger_changed)
+        for booking in passenger.bookings:
+            if booking.status != BookingStatus.CANCELLED:  # Отмененные уже не в системе
+                self.__booking_owners[booking.booking_id] = passenger.passport
+        self.__passenger_index.add(passenger)
+        self.__changes.passengers.add(passenger.passport)
+
+    def _on_passenger_changed(self, passenger: Passenger) -> None:
+        # Новое бронирование всегда добавляется в конец списка пассажира
+        bookings = passenger.bookings
+        if bookings and bookings[-1].status != BookingStatus.CANCELLED:
+            self.__booking_owners[bookings[-1].booking_id] = passenger.passport
+        self.__passenger_index.add(passenger)  # Контакты могли измениться через сеттеры
+        self.__changes.passengers.add(passenger.passport)
+
+    def __track_transport(self, transport: Transport) -> None:
+        transport.set_seat_observer(self._on_seat_changed)
+        self.__changes.transports.add(transport.transport_id)
+
+    def _on_seat_changed(self, transport: Transport, seat: Seat) -> None:
+        self.__changes.add_seat(transport.transport_id, seat.number)
+        if self.__fare_calendar is not None:
+            self.__fare_calendar.on_seat_changed(transport, seat)
+        # Лист ожидания здесь не трогаем: бронирование из уведомления попало бы
+        # в журнал раньше вызвавшего его действия. Места ожидающим отдают
+        # cancel_booking и add_seat - после записи своего события
+
+    def __track_booking(self, booking: Booking) -> None:
+        booking.set_observer(self._on_booking_changed)
+        self.__booking_index.add(booking)
+        self.__changes.add_booking(booking.booking_id)
+
+    def _on_booking_changed(self, booking: Booking) -> None:
+        self.__booking_index.update(booking)  # Подтверждение или отмена меняют держателя места
+        self.__changes.add_booking(booking.booking_id)
+        if self.__ledger is not None:
+            # Оплата и возврат доходят сюда через наблюдателя платежа
+            self.__ledger.post(booking, self.__booking_owners.get(booking.booking_id))
+
+    @property
+    def changes(self) -> ChangeSet:
+        # Изменения с момента последнего сохранения
+        return self.__changes
+
+    def mark_saved(self) -> None:
+        # Все изменения записаны - сбрасываем флаги только у измененных объектов
+        changes = self.__changes
+        for passport in changes.passengers:
+            if passport in self.__passengers:
+                self.__passengers[passport].mark_saved()
+        for transport_id, numbers in changes.seats.items():
+            transport = self.__transports.get(transport_id)
+            if transport is None:
+                continue
+            for seat in transport.seats:
+                if seat.number in numbers:
+                    seat.mark_saved()
+        for booking_id in changes.bookings:
+            booking = self.__bookings.get(booking_id)
+            if booking is None:
+                continue
+            booking.mark_saved()
+            if booking.payment:
+                booking.payment.mark_saved()
+        self.__changes = ChangeSet()
+
+    def get_booking_owner(self, booking_id: str) -> Optional[str]:
+        # Паспорт пассажира, которому принадлежит бронирование
+        return self.__booking_owners.get(booking_id)
+
+    # Журнал событий: каждое изменяющее действие дописывается в него
+    def set_journal(self, journal) -> None:
+        self.__journal = journal
+
+    @property
+    def journal(self):
+        return self.__journal
+
+    def _record(self, operation: str, *objects) -> None:
+        if self.__journal is not None:
+            self.__journal.record(operation, *objects)
+
+    # Календарь цен строится по всем поездкам при подключении, а дальше
+    # обновляется по уведомлениям мест и при добавлении поездок
+    def set_fare_calendar(self, fare_calendar: Optional[FareCalendar]) -> None:
+        self.__fare_calendar = fare_calendar
+        if fare_calendar is not None:
+            fare_calendar.build(self.__trips.values())
+
+    @property
+    def fare_calendar(self) -> Optional[FareCalendar]:
+        return self.__fare_calendar
+
+    # Денежный журнал: при подключении в него записываются уже оплаченные
+    # бронирования, дальше - каждая оплата и каждый возврат
+    def set_ledger(self, ledger: Optional[Ledger]) -> None:
+        self.__ledger = ledger
+        if ledger is not None:
+            for booking in self.__bookings.values():
+                ledger.post(booking, self.__booking_owners.get(booking.booking_id))
+
+    @property
+    def ledger(self) -> Optional[Ledger]:
+        return self.__ledger
+
+    # Лист ожидания: освободившееся место сразу становится бронированием
+    # первого подходящего ожидающего (см. waitlist.py)
+    def set_waitlist(self, waitlist: Optional[Waitlist]) -> None:
+        self.__waitlist = waitlist
+
+    @property
+    def waitlist(self) -> Optional[Waitlist]:
+        return self.__waitlist
+
+    def __promote(self, entry: Optional[WaitlistEntry], seat: Seat) -> None:
+        if entry is not None:
+            booking = self.create_booking(entry.passenger, entry.trip, seat.number)
+            self.__waitlist._promote(entry, booking)
+
+    # Метрики (metrics.MetricsRegistry): без реестра операции не измеряются
+    def set_metrics(self, metrics) -> None:
+        if self.__metrics is not None:
+            for gauge in self.__gauges(self.__metrics):
+                gauge.set_function(None)
+        self.__metrics = metrics
+        if metrics is not None:
+            sold, holds = self.__gauges(metrics)
+            sold.set_function(self._count_sold_seats)
+            holds.set_function(self._count_holds)
+
+    @property
+    def metrics(self):
+        return self.__metrics
+
+    @staticmethod
+    def __gauges(metrics) -> tuple:
+        return (metrics.gauge('booking_seats_sold', "Занятые (оплаченные) места"),
+                metrics.gauge('booking_holds', "Бронирования, ожидающие оплаты"))
+
+    # Показатели считаются только при выгрузке метрик, а не на каждом бронировании
+    def _count_sold_seats(self) -> int:
+        return sum(1 for transport in self.__transports.values()
+                   for seat in transport.seats if not seat.is_available)
+
+    def _count_holds(self) -> int:
+        return sum(1 for booking in self.__bookings.values()
+                   if booking.status == BookingStatus.PENDING)
+
+    # Память по типам объектов (по выборке - можно вызывать на живой системе);
+    # рост между двумя моментами времени - memory_report.take_snapshot/compare_snapshots
+    def memory_report(self, sample_size: int = DEFAULT_SAMPLE_SIZE) -> MemoryReport:
+        return build_memory_report(self, sample_size)
+
+    def __getstate__(self) -> dict:
+        # Копия системы (снимок в фоне) не должна писать в журнал оригинала,
+        # в его метрики и переводить ожидающих в бронирования
+        state = self.__dict__.copy()
+        state['_BookingSystem__journal'] = None
+        state['_BookingSystem__metrics'] = None
+        state['_BookingSystem__waitlist'] = None
+        return state
 
     # Методы для добавления отдельных объектов
     def add_passenger(self, passenger: Passenger) -> None:
         self.__passengers[passenger.passport] = passenger
+        self.__track_passenger(passenger)
 
     def add_transport(self, transport: Transport) -> None:
         self.__transports[transport.transport_id] = transport
+        self.__track_transport(transport)
 
     def add_route(self, route: Route) -> None:
         self.__routes[route.route_id] = route
+        self.__changes.routes.add(route.route_id)
 
     def add_trip(self, trip: Trip) -> None:
         self.__trips[trip.trip_id] = trip
+        self.__changes.trips.add(trip.trip_id)
+        if self.__fare_calendar is not None:
+            self.__fare_calendar.add_trip(trip)
 
     def add_booking(self, booking: Booking) -> None:
         self.__bookings[booking.booking_id] = booking
+        self.__track_booking(booking)
+
+    def remove_booking(self, booking: Booking) -> None:
+        # Для загрузчиков дельт: бронирование убирается из системы без отмены.
+        # Место не освобождается - его состояние уже пришло из той же дельты,
+        # и за время между сохранениями его мог занять другой пассажир
+        booking._restore_status(BookingStatus.CANCELLED)
+        self.__bookings.pop(booking.booking_id, None)
+        self.__booking_index.remove(booking)
+        self.__booking_owners.pop(booking.booking_id, None)
+        self.__changes.remove_booking(booking.booking_id)
+
+    def add_passengers(self, passengers: Iterable[Passenger]) -> int:
+        # Массовое добавление уже проверенных пассажиров (каждый пишется в журнал)
+        count = 0
+        for passenger in passengers:
+            self.add_passenger(passenger)
+            self._record('create_passenger', passenger)
+            count += 1
+        return count
 
     # Методы создания новых объектов
     def create_passenger(self, name: str, email: str, phone: str, passport: str) -> Passenger:
         passenger = Passenger(name, email, phone, passport)
-        self.__passengers[passport] = passenger
+        self.add_passenger(passenger)
+        self._record('create_passenger', passenger)
         return passenger
 
     def create_transport(self, transport_type: TransportType, **kwargs) -> Transport:
@@ -198,37 +435,120 @@ class BookingSystem:
         else:
             transport = Transport(transport_id, kwargs['model'], kwargs['capacity'])
 
-        self.__transports[transport_id] = transport
+        self.add_transport(transport)
+        self._record('create_transport', transport)
         return transport
 
+    def add_seat(self, transport: Transport, seat: Seat) -> None:
+        # Добавляем место через систему, чтобы оно попало в журнал
+        transport.add_seat(seat)
+        self._record('add_seat', transport, seat)
+        if self.__waitlist is not None and seat.is_available:
+            # Новое место - лучшему из ожидающих любой поездки этого транспорта
+            self.__promote(self.__waitlist.peek_transport(transport.transport_id,
+                                                          seat.seat_class), seat)
+
     def create_route(self, departure: str, destination: str,
                      departure_time: datetime, arrival_time: datetime) -> Route:
         route_id = str(uuid.uuid4())[:8]
         route = Route(route_id, departure, destination, departure_time, arrival_time)
-        self.__routes[route_id] = route
+        self.add_route(route)
+        self._record('create_route', route)
         return route
 
     def create_trip(self, route: Route, transport: Transport) -> Trip:
         trip_id = str(uuid.uuid4())[:8]
         trip = Trip(trip_id, route, transport)
-        self.__trips[trip_id] = trip
+        self.add_trip(trip)
+        self._record('create_trip', trip)
         return trip
 
+    # Измеряемые операции: с реестром метрик вызов идет через metrics.call
     def create_booking(self, passenger: Passenger, trip: Trip, seat_number: str) -> Booking:
+        if self.__metrics is not None:
+            return self.__metrics.call('create_booking', self.__create_booking,
+                                       passenger, trip, seat_number)
+        return self.__create_booking(passenger, trip, seat_number)
+
+    def __create_booking(self, passenger: Passenger, trip: Trip, seat_number: str) -> Booking:
         seat = trip.find_seat_by_number(seat_number)
         if not seat:
             raise SeatNotAvailableException(f"Место {seat_number} недоступно")
 
         booking_id = str(uuid.uuid4())[:8]
         booking = Booking(booking_id, trip, seat)
+        self.add_booking(booking)
         passenger.add_booking(booking)
-        self.__bookings[booking_id] = booking
+        self._record('create_booking', booking, passenger)
         return booking
 
-    def cancel_booking(self, booking: Booking):
+    def confirm_booking(self, booking: Booking, payment: Optional[Payment] = None) -> None:
+        if self.__metrics is not None:
+            self.__metrics.call('confirm_booking', self.__confirm_booking, booking, payment)
+        else:
+            self.__confirm_booking(booking, payment)
+
+    def __confirm_booking(self, booking: Booking, payment: Optional[Payment]) -> None:
+        # Привязываем платеж (если передан) и подтверждаем бронирование
+        if payment is not None:
+            booking.add_payment(payment)
+        booking.confirm_booking()
+        self._record('confirm_booking', booking)
+
+    def pay_booking(self, booking: Booking, payment: Payment, balance: float) -> None:
+        # Оплата и подтверждение одним вызовом (NoMoneyException, если денег мало)
+        if self.__metrics is not None:
+            self.__metrics.call('pay_booking', self.__pay_booking, booking, payment, balance)
+        else:
+            self.__pay_booking(booking, payment, balance)
+
+    def __pay_booking(self, booking: Booking, payment: Payment, balance: float) -> None:
+        payment.process_payment(balance)
+        self.confirm_booking(booking, payment)
+
+    def cancel_booking(self, booking: Booking) -> None:
+        if self.__metrics is not None:
+            self.__metrics.call('cancel_booking', self.__cancel_booking, booking)
+        else:
+            self.__cancel_booking(booking)
+
+    def __cancel_booking(self, booking: Booking) -> None:
         # Отменяем бронирование и удаляем из системы
-        booking.cancel_booking()
+        freed = booking.status == BookingStatus.CONFIRMED  # Место держит только подтвержденное
+        booking.cancel_booking()  # Возврат попадает в денежный журнал, пока владелец известен
         del self.__bookings[booking.booking_id]
+        self.__booking_index.remove(booking)
+        self.__booking_owners.pop(booking.booking_id, None)
+        self.__changes.remove_booking(booking.booking_id)
+        self._record('cancel_booking', booking)
+        seat = booking.seat
+        if self.__waitlist is not None and freed and seat.is_available:
+            # Место - ожидающим этой поездки, а если их нет - других поездок
+            # того же транспорта. Бронирование создается после записи отмены
+            # в журнал, чтобы при воспроизведении место уже было свободно
+            self.__promote(self.__waitlist.peek(booking.trip.trip_id, seat.seat_class)
+                           or self.__waitlist.peek_transport(
+                               booking.trip.transport.transport_id, seat.seat_class), seat)
+
+    def cancel_trip(self, trip: Trip) -> List[Booking]:
+        # Отмена поездки целиком (например, сломался транспорт): отменяются все
+        # ее бронирования, места подтвержденных освобождаются (места транспорта,
+        # занятые бронированиями других поездок, не трогаются). Время
+        # пропорционально числу бронирований поездки, а не всей системы.
+        # Возвращает отмененные бронирования
+        if self.__metrics is not None:
+            return self.__metrics.call('cancel_trip', self.__cancel_trip, trip)
+        return self.__cancel_trip(trip)
+
+    def __cancel_trip(self, trip: Trip) -> List[Booking]:
+        if self.__waitlist is not None:
+            # Ожидающие отмененной поездки мест уже не получат, а освободившиеся
+            # места уходят ожидающим других поездок этого транспорта
+            self.__waitlist.remove_trip(trip.trip_id)
+        bookings = self.__booking_index.trip_bookings(trip.trip_id)  # Копия: отмена меняет индекс
+        for booking in bookings:
+            self.cancel_booking(booking)  # Каждая отмена попадает в журнал и метрики
+        return bookings
 
     def find_booking_by_id(self, booking_id: str) -> Booking:
         # Ищем бронирование по ID
@@ -236,16 +556,74 @@ class BookingSystem:
             raise BookingNotFoundException(f"Бронирование с ID {booking_id} не найдено")
         return self.__bookings[booking_id]
 
-    def get_passenger_bookings(self, passport: str) -> List[Booking]:
+    def get_trip_bookings(self, trip_id: str) -> List[Booking]:
+        # Бронирования поездки по индексу, без просмотра всех бронирований
+        return self.__booking_index.trip_bookings(trip_id)
+
+    def get_seat_booking(self, trip_id: str, seat_number: str) -> Optional[Booking]:
+        # Бронирование, которое держит место поездки (None - место никем не занято)
+        return self.__booking_index.seat_booking(trip_id, seat_number)
+
+    def get_passenger_bookings(self, passport: str) -> Sequence[Booking]:
         # Получаем все бронирования пассажира
         if passport not in self.__passengers:
-            return []
+            return ()
         return self.__passengers[passport].bookings
 
+    def find_trips(self, departure: str, destination: str,
+                   date_from: Optional[datetime] = None,
+                   date_to: Optional[datetime] = None) -> List[Trip]:
+        if self.__metrics is not None:
+            return self.__metrics.call('find_trips', self.__find_trips,
+                                       departure, destination, date_from, date_to)
+        return self.__find_trips(departure, destination, date_from, date_to)
+
+    def __find_trips(self, departure: str, destination: str, date_from: Optional[datetime],
+                     date_to: Optional[datetime]) -> List[Trip]:
+        # Поездки по направлению (как SQLiteRepository.find_trips), по времени отправления
+        trips = [trip for trip in self.__trips.values()
+                 if trip.route.departure == departure and trip.route.destination == destination
+                 and (date_from is None or trip.route.departure_time >= date_from)
+                 and (date_to is None or trip.route.departure_time < date_to)]
+        trips.sort(key=lambda trip: trip.route.departure_time)
+        return trips
+
+    # Поиск пассажиров по вторичным индексам (без перебора всех пассажиров)
+    def find_passengers_by_email(self, email: str) -> List[Passenger]:
+        return [self.__passengers[p] for p in self.__passenger_index.find_by_email(email)]
+
+    def find_passengers_by_phone(self, phone: str) -> List[Passenger]:
+        return [self.__passengers[p] for p in self.__passenger_index.find_by_phone(phone)]
+
+    def find_passengers_by_name(self, name: str) -> List[Passenger]:
+        return [self.__passengers[p] for p in self.__passenger_index.find_by_name(name)]
+
+    def search_passengers_by_name(self, name: str, limit: int = 10,
+                                  min_score: float = 0.4) -> List[Tuple[Passenger, float]]:
+        # Нечеткий поиск: пассажиры и сходство их имени с запросом (от 0 до 1).
+        # Первый вызов строит индекс триграмм по всем пассажирам
+        return [(self.__passengers[passport], score) for passport, score
+                in self.__passenger_index.search_by_name(name, limit, min_score)]
+
+    def find_duplicate_passengers(self) -> List[List[Passenger]]:
+        # Вероятные дубли клиентов: разные паспорта с общим email или телефоном
+        return [[self.__passengers[p] for p in group]
+                for group in self.__passenger_index.duplicate_groups()]
+
     def clear_all_data(self) -> None:
-        # Очищаем все данные системы (для тестирования)
+        # Очищаем все данные системы (для тестирования). Лист ожидания
+        # очищается вместе с ней; журнал событий и денежный журнал - нет:
+        # это дописываемая история, ее сбрасывают, подключив новые
         self.__passengers.clear()
         self.__transports.clear()
         self.__routes.clear()
         self.__trips.clear()
         self.__bookings.clear()
+        self.__changes = ChangeSet()
+        self.__booking_owners.clear()
+        self.__passenger_index.clear()
+        self.__booking_index.clear()
+        if self.__fare_calendar is not None:
+            self.__fare_calendar.clear()
+        if self.__waitlist is not None:
+            self.__waitlist.clear()
@@ -0,0 +1,289 @@
+import heapq
+import math
+from collections import Counter
+from typing import Dict, List, Optional, Set, Tuple
+
+from action import Booking, BookingStatus
+from person import Passenger
+
+# Вторичные индексы пассажиров: email (без учета регистра), телефон
+# (нормализованный) и имя. Значения - паспорта, сами пассажиры хранятся
+# в BookingSystem. Индекс обновляется системой через наблюдателей Person.
+# Бронирования индексируются по поездке и по месту поездки (BookingIndex).
+
+
+# Сколько кандидатов (на одно место в выдаче) берется для оценки порога
+ESTIMATE_FACTOR = 100
+
+
+def trigrams(text: str) -> Set[str]:
+    # Триграммы каждого слова с отступами по краям: "  и", " ив", ..., "ов "
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+# Инвертированный индекс триграмм для нечеткого поиска по имени:
+# "Иваноф" находит "Иванов", "иванов" - "Иван Иванов"
+class TrigramIndex:
+    def __init__(self):
+        self.__postings: Dict[str, Set[str]] = {}  # Триграмма -> ключи записей
+        self.__sizes: Dict[str, int] = {}          # Ключ -> число его триграмм
+
+    def add(self, key: str, text: str) -> None:
+        grams = trigrams(text)
+        self.__sizes[key] = len(grams)
+        for gram in grams:
+            self.__postings.setdefault(gram, set()).add(key)
+
+    def remove(self, key: str, text: str) -> None:
+        self.__sizes.pop(key, None)
+        for gram in trigrams(text):
+            keys = self.__postings.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.__postings[gram]
+
+    def clear(self) -> None:
+        self.__postings.clear()
+        self.__sizes.clear()
+
+    def search(self, text: str, limit: int = 10,
+               min_score: float = 0.4) -> List[Tuple[str, float]]:
+        # limit ключей с наибольшим сходством (коэффициент Дайса по триграммам)
+        grams = trigrams(text)
+        if not grams:
+            return []
+        # Списки от редких триграмм к частым: частые (вроде "  и") почти
+        # никогда не приходится просматривать целиком
+        postings = sorted((self.__postings.get(gram, set()) for gram in grams), key=len)
+        size = len(postings)
+
+        # Сначала оцениваем порог по самым редким спискам: limit-е лучшее
+        # сходство среди их записей. Итог может быть только не хуже
+        candidates = set()
+        for keys in postings:
+            candidates |= keys
+            if len(candidates) >= limit * ESTIMATE_FACTOR:
+                break
+        best = heapq.nlargest(limit, self.__scored(postings, candidates, min_score))
+        threshold = best[-1][0] if len(best) == limit else min_score
+
+        # Чтобы набрать threshold, у записи должно быть хотя бы needed общих
+        # триграмм с запросом - значит, она есть хотя бы в одном из
+        # size - needed + 1 самых редких списков. Остальные только пересекаем
+        needed = max(1, math.ceil(threshold * size / (2 - threshold) - 1e-9))
+        candidates = set().union(*postings[:size - needed + 1])
+        best = heapq.nlargest(limit, self.__scored(postings, candidates, threshold, needed))
+        return [(key, score) for score, key in best]
+
+    def __scored(self, postings: List[Set[str]], candidates: Set[str],
+                 min_score: float, needed: int = 1) -> List[Tuple[float, str]]:
+        size = len(postings)
+        common = Counter()
+        for keys in postings:
+            common.update(candidates & keys)  # Пересечение множеств - без цикла на Python
+
+        sizes = self.__sizes
+        scored = []
+        for key, count in common.items():
+            if count >= needed:
+                score = 2 * count / (size + sizes[key])
+                if score >= min_score:
+                    scored.append((score, key))
+        return scored
+
+
+class PassengerIndex:
+    def __init__(self):
+        self.__by_email: Dict[str, Set[str]] = {}
+        self.__by_phone: Dict[str, Set[str]] = {}
+        self.__by_name: Dict[str, Set[str]] = {}
+        # Паспорт -> ключи, под которыми пассажир сейчас лежит в индексах
+        self.__keys: Dict[str, Tuple[str, str, str]] = {}
+        # Пассажиры, еще не разложенные по индексам. Загрузчик добавляет всех
+        # пассажиров снимка разом, а нормализация ключей - заметная часть
+        # загрузки, поэтому индексы строятся при первом поиске, а дальше
+        # ведутся на ходу (None - индексы уже построены)
+        self.__pending: Optional[Dict[str, Passenger]] = {}
+        # Нечеткий поиск по имени - самая дорогая часть индекса, ее строим
+        # по self.__keys еще позже: при первом нечетком поиске
+        self.__names: Optional[TrigramIndex] = None
+
+    @staticmethod
+    def keys_of(passenger: Passenger) -> Tuple[str, str, str]:
+        return (Passenger.email_key(passenger.email), Passenger.phone_key(passenger.phone),
+                Passenger.name_key(passenger.name))
+
+    def add(self, passenger: Passenger) -> None:
+        # Повторное добавление переиндексирует пассажира (если контакты изменились)
+        passport = passenger.passport
+        if self.__pending is not None:
+            self.__pending[passport] = passenger  # Ключи посчитаем при построении
+            return
+        keys = self.keys_of(passenger)
+        old_keys = self.__keys.get(passport)
+        if old_keys == keys:
+            return
+        if old_keys is not None:
+            self.__unlink(passport, old_keys)
+        self.__keys[passport] = keys
+        for index, key in zip(self.__indexes(), keys):
+            index.setdefault(key, set()).add(passport)
+        if self.__names is not None:
+            self.__names.add(passport, keys[2])
+
+    def remove(self, passport: str) -> None:
+        if self.__pending is not None:
+            self.__pending.pop(passport, None)
+            return
+        keys = self.__keys.pop(passport, None)
+        if keys is not None:
+            self.__unlink(passport, keys)
+
+    def clear(self) -> None:
+        for index in self.__indexes():
+            index.clear()
+        self.__keys.clear()
+        self.__pending = {}
+        self.__names = None
+
+    def __build(self) -> None:
+        # Раскладываем по индексам всех пассажиров, добавленных до первого поиска
+        pending = self.__pending
+        if pending is not None:
+            self.__pending = None
+            for passenger in pending.values():
+                self.add(passenger)
+
+    def __indexes(self) -> Tuple[Dict[str, Set[str]], ...]:
+        return self.__by_email, self.__by_phone, self.__by_name
+
+    def __unlink(self, passport: str, keys: Tuple[str, str, str]) -> None:
+        for index, key in zip(self.__indexes(), keys):
+            passports = index.get(key)
+            if passports is not None:
+                passports.discard(passport)
+                if not passports:
+                    del index[key]
+        if self.__names is not None:
+            self.__names.remove(passport, keys[2])
+
+    # Поиск: паспорта в порядке сортировки
+    def find_by_email(self, email: str) -> List[str]:
+        self.__build()
+        return sorted(self.__by_email.get(Passenger.email_key(email), ()))
+
+    def find_by_phone(self, phone: str) -> List[str]:
+        self.__build()
+        return sorted(self.__by_phone.get(Passenger.phone_key(phone), ()))
+
+    def find_by_name(self, name: str) -> List[str]:
+        self.__build()
+        return sorted(self.__by_name.get(Passenger.name_key(name), ()))
+
+    def search_by_name(self, name: str, limit: int = 10,
+                       min_score: float = 0.4) -> List[Tuple[str, float]]:
+        self.__build()
+        if self.__names is None:
+            self.__names = TrigramIndex()
+            for passport, keys in self.__keys.items():
+                self.__names.add(passport, keys[2])
+        return self.__names.search(Passenger.name_key(name), limit, min_score)
+
+    def duplicate_groups(self) -> List[List[str]]:
+        # Группы паспортов, связанных общим email или телефоном (в т.ч. цепочкой:
+        # A и B с одним email, B и C с одним телефоном - одна группа)
+        self.__build()
+        parent: Dict[str, str] = {}
+        members: Set[str] = set()
+
+        def find(passport: str) -> str:
+            root = passport
+            while parent.get(root, root) != root:
+                root = parent[root]
+            while passport != root:
+                parent[passport], passport = root, parent[passport]
+            return root
+
+        for index in (self.__by_email, self.__by_phone):
+            for passports in index.values():
+                if len(passports) < 2:
+                    continue
+                members.update(passports)
+                first, *others = passports
+                for other in others:
+                    parent[find(other)] = find(first)
+
+        groups: Dict[str, List[str]] = {}
+        for passport in members:
+            groups.setdefault(find(passport), []).append(passport)
+        return sorted(sorted(group) for group in groups.values())
+
+
+# Бронирования по поездкам: все бронирования поездки и действующее
+# бронирование каждого места. Обновляется системой при добавлении,
+# изменении (наблюдатель Booking) и удалении бронирования
+class BookingIndex:
+    def __init__(self):
+        # ID поездки -> ID бронирования -> бронирование (в порядке создания)
+        self.__by_trip: Dict[str, Dict[str, Booking]] = {}
+        # (ID поездки, номер места) -> бронирование, которое держит место
+        self.__by_seat: Dict[Tuple[str, str], Booking] = {}
+
+    def add(self, booking: Booking) -> None:
+        self.__by_trip.setdefault(booking.trip.trip_id, {})[booking.booking_id] = booking
+        self.update(booking)
+
+    def update(self, booking: Booking) -> None:
+        # Место держит подтвержденное бронирование, а пока его нет - последнее
+        # ожидающее оплаты; отмененное бронирование место освобождает
+        key = (booking.trip.trip_id, booking.seat.number)
+        current = self.__by_seat.get(key)
+        if booking.status == BookingStatus.CANCELLED:
+            if current is booking:
+                self.__reselect(key)
+        elif (current is None or booking.status == BookingStatus.CONFIRMED
+              or current.status != BookingStatus.CONFIRMED):
+            self.__by_seat[key] = booking
+
+    def remove(self, booking: Booking) -> None:
+        trip_id = booking.trip.trip_id
+        bookings = self.__by_trip.get(trip_id)
+        if bookings is not None:
+            bookings.pop(booking.booking_id, None)
+            if not bookings:
+                del self.__by_trip[trip_id]
+        key = (trip_id, booking.seat.number)
+        if self.__by_seat.get(key) is booking:
+            self.__reselect(key)
+
+    def __reselect(self, key: Tuple[str, str]) -> None:
+        # Держатель места ушел: место переходит к подтвержденному бронированию
+        # этого места, а если его нет - к последнему ожидающему оплаты
+        trip_id, seat_number = key
+        holder = None
+        for booking in self.__by_trip.get(trip_id, {}).values():
+            if booking.seat.number != seat_number or booking.status == BookingStatus.CANCELLED:
+                continue
+            if booking.status == BookingStatus.CONFIRMED:
+                holder = booking
+                break
+            holder = booking
+        if holder is None:
+            self.__by_seat.pop(key, None)
+        else:
+            self.__by_seat[key] = holder
+
+    def clear(self) -> None:
+        self.__by_trip.clear()
+        self.__by_seat.clear()
+
+    def trip_bookings(self, trip_id: str) -> List[Booking]:
+        return list(self.__by_trip.get(trip_id, {}).values())
+
+    def seat_booking(self, trip_id: str, seat_number: str) -> Optional[Booking]:
+        return self.__by_seat.get((trip_id, seat_number))
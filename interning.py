@@ -0,0 +1,30 @@
+import sys
+from typing import Any, Dict
+
+# Общие экземпляры повторяющихся значений (flyweight). После загрузки из
+# файла каждое значение - новый объект, хотя города, модели транспорта,
+# способы оплаты, номера мест и цены повторяются в миллионах объектов.
+# Конструкторы предметной области пропускают такие поля через эти функции,
+# поэтому одинаковые значения от любого читателя хранятся в одном экземпляре.
+
+# Разных цен немного; если их вдруг больше - новые просто не кэшируем
+MAX_SHARED_NUMBERS = 10000
+
+_numbers: Dict[float, float] = {}
+
+
+def shared_str(value: Any) -> Any:
+    # sys.intern принимает только str (не подклассы и не None)
+    return sys.intern(value) if type(value) is str else value
+
+
+def shared_number(value: Any) -> Any:
+    # Для int и подобных не нужно: 1000 == 1000.0, но тип менять нельзя
+    if type(value) is not float:
+        return value
+    shared = _numbers.get(value)
+    if shared is not None:
+        return shared
+    if len(_numbers) < MAX_SHARED_NUMBERS:
+        _numbers[value] = value
+    return value
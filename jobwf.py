@@ -1,6 +1,9 @@
 import json
+import os
+import tempfile
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Callable, Dict, List, Any, Optional
 from abc import ABC, abstractmethod
 import xml.etree.ElementTree as ET
 from xml.dom import minidom
@@ -11,6 +14,7 @@ from trip import Trip, Route
 from seat import ClassSeat, Seat
 from person import Passenger
 from action import Payment, Booking, BookingStatus
+from tracing import span
 
 
 # Абстрактные классы
@@ -26,16 +30,100 @@ class DataWriter(ABC):
         pass
 
 
+@contextmanager
+def atomic_file(filename: str, mode: str = 'w', encoding: Optional[str] = 'utf-8'):
+    # Пишем во временный файл рядом с целевым, делаем fsync и атомарно
+    # подменяем старый файл: при сбое посередине записи прежняя копия остается целой
+    folder = os.path.dirname(os.path.abspath(filename))
+    fd, temp_filename = tempfile.mkstemp(prefix='.' + os.path.basename(filename) + '.',
+                                         suffix='.tmp', dir=folder)
+    try:
+        with os.fdopen(fd, mode, encoding=None if 'b' in mode else encoding) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_filename, filename)
+    except BaseException:
+        if os.path.exists(temp_filename):
+            os.remove(temp_filename)
+        raise
+
+
+def _measured(metrics, operation: str, function: Callable, *args) -> Any:
+    # С реестром метрик (metrics.MetricsRegistry) вызов замеряется, без него - прямой
+    if metrics is None:
+        return function(*args)
+    return metrics.call(operation, function, *args)
+
+
+def count_records(system: BookingSystem) -> int:
+    # Число записей верхнего уровня - атрибут records в интервалах трассировки
+    return (len(system.passengers) + len(system.transports) + len(system.routes)
+            + len(system.trips) + len(system.bookings))
+
+
+def collect_changes(system: BookingSystem) -> Dict[str, list]:
+    # Объекты, изменившиеся с прошлого сохранения (для дельта-файлов).
+    # Работаем только с ключами из system.changes - полные словари не копируем
+    changes = system.changes
+
+    def existing(getter, keys):
+        return [obj for obj in map(getter, sorted(keys)) if obj is not None]
+
+    seats = []
+    for transport_id, numbers in changes.seats.items():
+        transport = system.get_transport(transport_id)
+        # Новый транспорт и так пишется целиком вместе с местами
+        if transport is None or transport_id in changes.transports:
+            continue
+        seats.extend((transport_id, seat) for seat in transport.seats if seat.number in numbers)
+
+    return {
+        'passengers': existing(system.get_passenger, changes.passengers),
+        'transports': existing(system.get_transport, changes.transports),
+        'seats': seats,
+        'routes': existing(system.get_route, changes.routes),
+        'trips': existing(system.get_trip, changes.trips),
+        'bookings': existing(system.get_booking, changes.bookings),
+        'removed_bookings': sorted(changes.removed_bookings)
+    }
+
+
 # Класс для записи в XML формат
 class XMLWriter(DataWriter):
     def write(self, system: BookingSystem, filename: str) -> None:
+        with span('xml_write', file=filename) as trace:
+            _measured(system.metrics, 'xml_write', self.__write, system, filename)
+            if trace:
+                trace.set(records=count_records(system))
+
+    def __write(self, system: BookingSystem, filename: str) -> None:
         # Создаем структуру XML и сохраняем в файл
-        root = self._create_xml_structure(system)
-        xml_str = self._format_xml(root)  # перевод в читаемый формат
+        with span('create_xml_structure'):
+            root = self._create_xml_structure(system)
+        self._write_root(root, filename)
+        system.mark_saved()  # Полный снимок - новая база для дельт
+
+    def write_delta(self, system: BookingSystem, filename: str) -> None:
+        with span('xml_write_delta', file=filename):
+            _measured(system.metrics, 'xml_write_delta', self.__write_delta, system, filename)
+
+    def __write_delta(self, system: BookingSystem, filename: str) -> None:
+        # Пишем только объекты, изменившиеся с прошлого сохранения
+        with span('create_delta_structure'):
+            root = self._create_delta_structure(system)
+        self._write_root(root, filename)
+        system.mark_saved()
+
+    def _write_root(self, root: ET.Element, filename: str) -> None:
+        with span('format_xml'):
+            xml_str = self._format_xml(root)  # перевод в читаемый формат
 
         try:
-            with open(filename, 'w', encoding='utf-8') as f:
+            with span('write_file') as trace, atomic_file(filename) as f:
                 f.write(xml_str)
+                if trace:
+                    trace.set(bytes=f.tell())
         except (IOError, ET.ParseError) as e:
             raise MyException(f"Ошибка записи XML: {e}")
 
@@ -65,7 +153,45 @@ class XMLWriter(DataWriter):
         # Бронирования
         bookings_elem = ET.SubElement(root, 'Bookings')
         for booking in system.bookings.values():
-            self._add_booking_element(bookings_elem, booking)
+            self._add_booking_element(bookings_elem, booking,
+                                      system.get_booking_owner(booking.booking_id))
+
+        return root
+
+    def _create_delta_structure(self, system: BookingSystem) -> ET.Element:
+        changed = collect_changes(system)
+        root = ET.Element('BookingSystemDelta')
+
+        passengers_elem = ET.SubElement(root, 'Passengers')
+        for passenger in changed['passengers']:
+            self._add_passenger_element(passengers_elem, passenger)
+
+        transports_elem = ET.SubElement(root, 'Transports')
+        for transport in changed['transports']:
+            self._add_transport_element(transports_elem, transport)
+
+        # Отдельные места уже существующего транспорта
+        seats_elem = ET.SubElement(root, 'Seats')
+        for transport_id, seat in changed['seats']:
+            seat_elem = self._add_seat_element(seats_elem, seat)
+            ET.SubElement(seat_elem, 'TransportID').text = transport_id
+
+        routes_elem = ET.SubElement(root, 'Routes')
+        for route in changed['routes']:
+            self._add_route_element(routes_elem, route)
+
+        trips_elem = ET.SubElement(root, 'Trips')
+        for trip in changed['trips']:
+            self._add_trip_element(trips_elem, trip)
+
+        bookings_elem = ET.SubElement(root, 'Bookings')
+        for booking in changed['bookings']:
+            self._add_booking_element(bookings_elem, booking,
+                                      system.get_booking_owner(booking.booking_id))
+
+        removed_elem = ET.SubElement(root, 'RemovedBookings')
+        for booking_id in changed['removed_bookings']:
+            ET.SubElement(removed_elem, 'BookingID').text = booking_id
 
         return root
 
@@ -96,11 +222,16 @@ class XMLWriter(DataWriter):
         # Места
         seats_elem = ET.SubElement(transport_elem, 'Seats')
         for seat in transport.seats:
-            seat_elem = ET.SubElement(seats_elem, 'Seat')
-            ET.SubElement(seat_elem, 'Number').text = seat.number
-            ET.SubElement(seat_elem, 'Class').text = seat.seat_class.value
-            ET.SubElement(seat_elem, 'Price').text = str(seat.price)
-            ET.SubElement(seat_elem, 'IsAvailable').text = str(seat.is_available)
+            XMLWriter._add_seat_element(seats_elem, seat)
+
+    @staticmethod
+    def _add_seat_element(parent: ET.Element, seat: Seat) -> ET.Element:
+        seat_elem = ET.SubElement(parent, 'Seat')
+        ET.SubElement(seat_elem, 'Number').text = seat.number
+        ET.SubElement(seat_elem, 'Class').text = seat.seat_class.value
+        ET.SubElement(seat_elem, 'Price').text = str(seat.price)
+        ET.SubElement(seat_elem, 'IsAvailable').text = str(seat.is_available)
+        return seat_elem
 
     @staticmethod
     def _add_route_element(parent: ET.Element, route: Route) -> None:
@@ -120,13 +251,16 @@ class XMLWriter(DataWriter):
         ET.SubElement(trip_elem, 'Revenue').text = str(trip.revenue)
 
     @staticmethod
-    def _add_booking_element(parent: ET.Element, booking: Booking) -> None:
+    def _add_booking_element(parent: ET.Element, booking: Booking,
+                             passport: Optional[str] = None) -> None:
         booking_elem = ET.SubElement(parent, 'Booking')
         ET.SubElement(booking_elem, 'BookingID').text = booking.booking_id
         ET.SubElement(booking_elem, 'TripID').text = booking.trip.trip_id
         ET.SubElement(booking_elem, 'SeatNumber').text = booking.seat.number
         ET.SubElement(booking_elem, 'BookingDate').text = booking.booking_date.isoformat()
         ET.SubElement(booking_elem, 'Status').text = booking.status.value
+        if passport is not None:
+            ET.SubElement(booking_elem, 'Passport').text = passport
 
         if booking.payment:
             payment_elem = ET.SubElement(booking_elem, 'Payment')
@@ -148,12 +282,36 @@ class XMLWriter(DataWriter):
 # Класс для записи в JSON формат
 class JsonWriter(DataWriter):
     def write(self, system: BookingSystem, filename: str) -> None:
-        # Подготавливаем данные и сохраняем в JSON
-        data = self._prepare_data(system)
+        with span('json_write', file=filename) as trace:
+            _measured(system.metrics, 'json_write', self.__write, system, filename)
+            if trace:
+                trace.set(records=count_records(system))
 
+    def __write(self, system: BookingSystem, filename: str) -> None:
+        # Подготавливаем данные и сохраняем в JSON
+        with span('prepare_data'):
+            data = self._prepare_data(system)
+        self._dump(data, filename)
+        system.mark_saved()  # Полный снимок - новая база для дельт
+
+    def write_delta(self, system: BookingSystem, filename: str) -> None:
+        with span('json_write_delta', file=filename):
+            _measured(system.metrics, 'json_write_delta', self.__write_delta, system, filename)
+
+    def __write_delta(self, system: BookingSystem, filename: str) -> None:
+        # Пишем только объекты, изменившиеся с прошлого сохранения
+        with span('prepare_delta'):
+            data = self._prepare_delta(system)
+        self._dump(data, filename)
+        system.mark_saved()
+
+    def _dump(self, data: Dict[str, Any], filename: str) -> None:
         try:
-            with open(filename, 'w', encoding='utf-8') as f:
+            # Сериализация и запись идут потоком, поэтому это один этап
+            with span('dump') as trace, atomic_file(filename) as f:
                 json.dump(data, f, indent=2, ensure_ascii=False, default=self._json_serializer)
+                if trace:
+                    trace.set(bytes=f.tell())
         except (IOError, TypeError) as e:
             raise MyException(f"Ошибка записи JSON: {e}")
 
@@ -167,92 +325,125 @@ class JsonWriter(DataWriter):
             'bookings': self._serialize_bookings(system)           # Бронирования
         }
 
+    def _prepare_delta(self, system: BookingSystem) -> Dict[str, Any]:
+        changed = collect_changes(system)
+        return {
+            'delta': True,
+            'passengers': [self._serialize_passenger(p) for p in changed['passengers']],
+            'transports': [self._serialize_transport(t) for t in changed['transports']],
+            'seats': [dict(self._serialize_seat(seat), transport_id=transport_id)
+                      for transport_id, seat in changed['seats']],
+            'routes': [self._serialize_route(r) for r in changed['routes']],
+            'trips': [self._serialize_trip(t) for t in changed['trips']],
+            'bookings': [self._serialize_booking(b, system.get_booking_owner(b.booking_id))
+                         for b in changed['bookings']],
+            'removed_bookings': changed['removed_bookings']
+        }
+
     # Далее преобразования в словари
     def _serialize_passengers(self, system: BookingSystem) -> List[Dict[str, str]]:
-        return [
-            {
-                'name': p.name,
-                'email': p.email,
-                'phone': p.phone,
-                'passport': p.passport
-            } for p in system.passengers.values()
-        ]
+        return [self._serialize_passenger(p) for p in system.passengers.values()]
 
     def _serialize_transports(self, system: BookingSystem) -> List[Dict[str, Any]]:
-        transports_data = []
-        for transport in system.transports.values():
-            transport_data = {
-                'transport_id': transport.transport_id,
-                'model': transport.model,
-                'capacity': transport.capacity,
-                'type': type(transport).__name__,
-                'seats': [
-                    {
-                        'number': seat.number,
-                        'seat_class': seat.seat_class.value,
-                        'price': seat.price,
-                        'is_available': seat.is_available
-                    } for seat in transport.seats
-                ]
-            }
-
-            # Добавляем специфичные поля для разных типов транспорта
-            if isinstance(transport, Bus):
-                transport_data.update({
-                    'has_wifi': transport.has_wifi,
-                    'has_usb_charging': transport.has_usb_charging
-                })
-            elif isinstance(transport, Train):
-                transport_data.update({
-                    'car_count': transport.car_count
-                })
-
-            transports_data.append(transport_data)
-        return transports_data
+        return [self._serialize_transport(t) for t in system.transports.values()]
 
     def _serialize_routes(self, system: BookingSystem) -> List[Dict[str, Any]]:
-        return [
-            {
-                'route_id': r.route_id,
-                'departure': r.departure,
-                'destination': r.destination,
-                'departure_time': r.departure_time.isoformat(),
-                'arrival_time': r.arrival_time.isoformat()
-            } for r in system.routes.values()
-        ]
+        return [self._serialize_route(r) for r in system.routes.values()]
 
     def _serialize_trips(self, system: BookingSystem) -> List[Dict[str, Any]]:
-        return [
-            {
-                'trip_id': t.trip_id,
-                'route_id': t.route.route_id,
-                'transport_id': t.transport.transport_id,
-                'revenue': t.revenue
-            } for t in system.trips.values()
-        ]
+        return [self._serialize_trip(t) for t in system.trips.values()]
 
     def _serialize_bookings(self, system: BookingSystem) -> List[Dict[str, Any]]:
-        bookings_data = []
-        for booking in system.bookings.values():
-            booking_data = {
-                'booking_id': booking.booking_id,
-                'trip_id': booking.trip.trip_id,
-                'seat_number': booking.seat.number,
-                'booking_date': booking.booking_date.isoformat(),
-                'status': booking.status.value
-            }
-
-            if booking.payment:
-                booking_data['payment'] = {
-                    'payment_id': booking.payment.payment_id,
-                    'amount': booking.payment.amount,
-                    'payment_method': booking.payment.payment_method,
-                    'payment_date': booking.payment.payment_date.isoformat(),
-                    'is_paid': booking.payment.is_paid
-                }
-
-            bookings_data.append(booking_data)
-        return bookings_data
+        return [self._serialize_booking(b, system.get_booking_owner(b.booking_id))
+                for b in system.bookings.values()]
+
+    # Преобразования отдельных объектов (используются и журналом событий)
+    @staticmethod
+    def _serialize_passenger(passenger: Passenger) -> Dict[str, str]:
+        return {
+            'name': passenger.name,
+            'email': passenger.email,
+            'phone': passenger.phone,
+            'passport': passenger.passport
+        }
+
+    @staticmethod
+    def _serialize_seat(seat: Seat) -> Dict[str, Any]:
+        return {
+            'number': seat.number,
+            'seat_class': seat.seat_class.value,
+            'price': seat.price,
+            'is_available': seat.is_available
+        }
+
+    @staticmethod
+    def _serialize_transport(transport: Transport) -> Dict[str, Any]:
+        transport_data = {
+            'transport_id': transport.transport_id,
+            'model': transport.model,
+            'capacity': transport.capacity,
+            'type': type(transport).__name__,
+            'seats': [JsonWriter._serialize_seat(seat) for seat in transport.seats]
+        }
+
+        # Добавляем специфичные поля для разных типов транспорта
+        if isinstance(transport, Bus):
+            transport_data.update({
+                'has_wifi': transport.has_wifi,
+                'has_usb_charging': transport.has_usb_charging
+            })
+        elif isinstance(transport, Train):
+            transport_data.update({
+                'car_count': transport.car_count
+            })
+        return transport_data
+
+    @staticmethod
+    def _serialize_route(route: Route) -> Dict[str, Any]:
+        return {
+            'route_id': route.route_id,
+            'departure': route.departure,
+            'destination': route.destination,
+            'departure_time': route.departure_time.isoformat(),
+            'arrival_time': route.arrival_time.isoformat()
+        }
+
+    @staticmethod
+    def _serialize_trip(trip: Trip) -> Dict[str, Any]:
+        return {
+            'trip_id': trip.trip_id,
+            'route_id': trip.route.route_id,
+            'transport_id': trip.transport.transport_id,
+            'revenue': trip.revenue
+        }
+
+    @staticmethod
+    def _serialize_payment(payment: Payment) -> Dict[str, Any]:
+        return {
+            'payment_id': payment.payment_id,
+            'amount': payment.amount,
+            'payment_method': payment.payment_method,
+            'payment_date': payment.payment_date.isoformat(),
+            'is_paid': payment.is_paid
+        }
+
+    @staticmethod
+    def _serialize_booking(booking: Booking, passport: Optional[str] = None) -> Dict[str, Any]:
+        booking_data = {
+            'booking_id': booking.booking_id,
+            'trip_id': booking.trip.trip_id,
+            'seat_number': booking.seat.number,
+            'booking_date': booking.booking_date.isoformat(),
+            'status': booking.status.value
+        }
+        # Паспорт владельца - чтобы при загрузке связать бронирование с пассажиром
+        if passport is not None:
+            booking_data['passport'] = passport
+
+        if booking.payment:
+            booking_data['payment'] = JsonWriter._serialize_payment(booking.payment)
+
+        return booking_data
 
     @staticmethod
     def _json_serializer(obj):
@@ -262,14 +453,92 @@ class JsonWriter(DataWriter):
         raise TypeError(f"Object of type {type(obj)} is not JSON serializable")
 
 
+# Применение дельты к загруженной системе (общая часть для JSON и XML)
+def _upsert_passenger(system: BookingSystem, passenger: Passenger) -> None:
+    existing = system.get_passenger(passenger.passport)
+    if existing is None:
+        system.add_passenger(passenger)
+        return
+    existing.name = passenger.name
+    existing.email = passenger.email
+    existing.phone = passenger.phone
+
+
+def _update_seat(system: BookingSystem, transport_id: str, seat: Seat) -> None:
+    transport = system.get_transport(transport_id)
+    if transport is None:
+        return
+    for existing in transport.seats:
+        if existing.number == seat.number:
+            if seat.is_available:
+                existing.release()
+            elif existing.is_available:
+                existing.reserve()
+            return
+    transport.add_seat(seat)
+
+
+def _update_booking(booking: Booking, status: BookingStatus,
+                    payment: Optional[Payment]) -> None:
+    booking._restore_status(status)
+    if payment is not None:
+        booking.add_payment(payment)
+
+
+def _remove_bookings(system: BookingSystem, booking_ids: List[str]) -> None:
+    for booking_id in booking_ids:
+        booking = system.get_booking(booking_id)
+        if booking is not None:
+            system.remove_booking(booking)  # Не cancel_booking: место уже пришло из дельты
+
+
 # Класс для чтения из JSON
 class JsonReader(DataReader):
+    def __init__(self, trusted: bool = False, metrics=None):
+        # trusted - файл записан самой системой: пассажиры создаются без
+        # повторной валидации (проверить их можно позже, см. validation.py).
+        # metrics - реестр метрик: чтение замеряется, и он же подключается к системе
+        self.__trusted = trusted
+        self.__metrics = metrics
+
     def read(self, filename: str) -> BookingSystem:
+        with span('json_read', file=filename) as trace:
+            system = _measured(self.__metrics, 'json_read', self.__read, filename)
+            if trace:
+                trace.set(records=count_records(system))
+        if self.__metrics is not None:
+            system.set_metrics(self.__metrics)
+        return system
+
+    def __read(self, filename: str) -> BookingSystem:
         # Читаем JSON и восстанавливаем систему
+        data = self._load(filename)
+        with span('restore_system') as trace:
+            system = self._restore_system_from_data(data)
+            if trace:
+                trace.set(records=count_records(system))
+        system.mark_saved()  # Только что загруженная система ничего не меняла
+        return system
+
+    def read_with_deltas(self, base_filename: str, delta_filenames: List[str]) -> BookingSystem:
+        # Базовый снимок + цепочка дельт, применяемых по порядку
+        system = self._restore_system_from_data(self._load(base_filename))
+        for delta_filename in delta_filenames:
+            data = self._load(delta_filename)
+            with span('apply_delta', file=delta_filename):
+                self._apply_delta_data(system, data)
+        system.mark_saved()
+        if self.__metrics is not None:
+            system.set_metrics(self.__metrics)
+        return system
+
+    @staticmethod
+    def _load(filename: str) -> Dict[str, Any]:
         try:
-            with open(filename, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return self._restore_system_from_data(data)
+            with span('parse') as trace, open(filename, 'r', encoding='utf-8') as f:
+                if trace:
+                    trace.set(bytes=os.fstat(f.fileno()).st_size)
+                return json.load(f)
         except FileNotFoundError:
             raise MyException(f"JSON файл не найден: {filename}")
         except json.JSONDecodeError as e:
@@ -311,12 +580,7 @@ class JsonReader(DataReader):
         # Восстановление пассажиров
         passenger_map = {}
         for passenger_data in data.get('passengers', []):
-            passenger = Passenger(
-                passenger_data['name'],
-                passenger_data['email'],
-                passenger_data['phone'],
-                passenger_data['passport']
-            )
+            passenger = self._create_passenger_from_data(passenger_data)
             passenger_map[passenger_data['passport']] = passenger
 
         system.set_passengers(passenger_map)
@@ -327,6 +591,52 @@ class JsonReader(DataReader):
 
         return system
 
+    def _apply_delta_data(self, system: BookingSystem, data: Dict[str, Any]) -> None:
+        # Применяет к системе одну дельту из JSON
+        for passenger_data in data.get('passengers', []):
+            _upsert_passenger(system, self._create_passenger_from_data(passenger_data))
+
+        for transport_data in data.get('transports', []):
+            system.add_transport(self._create_transport_from_data(transport_data))
+
+        for seat_data in data.get('seats', []):
+            _update_seat(system, seat_data['transport_id'], self._create_seat_from_data(seat_data))
+
+        for route_data in data.get('routes', []):
+            system.add_route(self._create_route_from_data(route_data))
+
+        for trip_data in data.get('trips', []):
+            route = system.get_route(trip_data['route_id'])
+            transport = system.get_transport(trip_data['transport_id'])
+            if route and transport:
+                system.add_trip(Trip(trip_data['trip_id'], route, transport))
+
+        for booking_data in data.get('bookings', []):
+            booking = system.get_booking(booking_data['booking_id'])
+            if booking is not None:
+                payment = booking_data.get('payment')
+                _update_booking(booking, BookingStatus(booking_data['status']),
+                                self._create_payment_from_data(payment) if payment else None)
+                continue
+            # Новое бронирование: передаем только нужную поездку и владельца
+            trip_id, passport = booking_data['trip_id'], booking_data.get('passport')
+            self._create_booking_from_data(system, booking_data,
+                                           {trip_id: system.get_trip(trip_id)},
+                                           {passport: system.get_passenger(passport)}
+                                           if passport else {})
+
+        _remove_bookings(system, data.get('removed_bookings', []))
+
+    def _create_passenger_from_data(self, passenger_data: Dict[str, str]) -> Passenger:
+        # Создает пассажира из данных
+        create = Passenger.restore if self.__trusted else Passenger
+        return create(
+            passenger_data['name'],
+            passenger_data['email'],
+            passenger_data['phone'],
+            passenger_data['passport']
+        )
+
     def _create_transport_from_data(self, transport_data: Dict[str, Any]) -> Transport:
         # Создает транспорт из данных
         transport_type = transport_data['type']
@@ -355,14 +665,17 @@ class JsonReader(DataReader):
 
         # Восстанавливаем места
         for seat_data in transport_data.get('seats', []):
-            seat_class = ClassSeat(seat_data['seat_class'])
-            seat = Seat(seat_data['number'], seat_class, seat_data['price'])
-            if not seat_data['is_available']:
-                seat._Seat__is_available = False
-            transport.add_seat(seat)
+            transport.add_seat(self._create_seat_from_data(seat_data))
 
         return transport
 
+    @staticmethod
+    def _create_seat_from_data(seat_data: Dict[str, Any]) -> Seat:
+        # Создает место из данных
+        seat_class = ClassSeat(seat_data['seat_class'])
+        return Seat(seat_data['number'], seat_class, seat_data['price'],
+                    seat_data['is_available'])
+
     def _create_route_from_data(self, route_data: Dict[str, Any]) -> Route:
         # Создает маршрут из данных
         departure_time = datetime.fromisoformat(route_data['departure_time'])
@@ -395,29 +708,27 @@ class JsonReader(DataReader):
             return
 
         # Создаем бронирование
-        booking = Booking(booking_data['booking_id'], trip, seat)
-        booking._Booking__booking_date = datetime.fromisoformat(booking_data['booking_date'])
-        booking._Booking__status = BookingStatus(booking_data['status'])
+        booking = Booking(booking_data['booking_id'], trip, seat,
+                          datetime.fromisoformat(booking_data['booking_date']),
+                          BookingStatus(booking_data['status']))
 
         # Восстанавливаем статус места
-        if booking_data['status'] == BookingStatus.CONFIRMED.value:
-            seat._Seat__is_available = False
+        if booking.status == BookingStatus.CONFIRMED:
+            seat._restore_availability(False)
 
         # Восстанавливаем платеж
         if 'payment' in booking_data:
-            payment_data = booking_data['payment']
-            payment = Payment(
-                payment_data['payment_id'],
-                payment_data['amount'],
-                payment_data['payment_method']
-            )
-            payment._Payment__payment_date = datetime.fromisoformat(payment_data['payment_date'])
-            payment._Payment__is_paid = payment_data['is_paid']
-            booking.add_payment(payment)
+            booking.add_payment(self._create_payment_from_data(booking_data['payment']))
 
         system.add_booking(booking)
 
-        # Добавляем бронирование пассажиру
+        # Добавляем бронирование пассажиру (новые файлы хранят его паспорт)
+        if 'passport' in booking_data:
+            passenger = passenger_map.get(booking_data['passport'])
+            if passenger:
+                passenger.add_booking(booking)
+            return
+
         for passenger in passenger_map.values():
             for passenger_booking in passenger.bookings:
                 if passenger_booking.booking_id == booking_data['booking_id']:
@@ -429,19 +740,110 @@ class JsonReader(DataReader):
                 passenger.add_booking(booking)
                 break
 
+    @staticmethod
+    def _create_payment_from_data(payment_data: Dict[str, Any]) -> Payment:
+        # Создает платеж из данных
+        return Payment(
+            payment_data['payment_id'],
+            payment_data['amount'],
+            payment_data['payment_method'],
+            datetime.fromisoformat(payment_data['payment_date']),
+            payment_data['is_paid']
+        )
+
 
 # Класс для чтения из XML
 class XMLReader(DataReader):
+    def __init__(self, trusted: bool = False, metrics=None):
+        # См. JsonReader: пассажиры из доверенного файла не проверяются заново
+        self.__trusted = trusted
+        self.__metrics = metrics
+
     def read(self, filename: str) -> BookingSystem:
+        with span('xml_read', file=filename) as trace:
+            system = _measured(self.__metrics, 'xml_read', self.__read, filename)
+            if trace:
+                trace.set(records=count_records(system))
+        if self.__metrics is not None:
+            system.set_metrics(self.__metrics)
+        return system
+
+    def __read(self, filename: str) -> BookingSystem:
         try:
             # Читаем XML и восстанавливаем систему
-            tree = ET.parse(filename)  # Парсим XML файл
+            with span('parse') as trace:
+                if trace:
+                    trace.set(bytes=os.path.getsize(filename))
+                tree = ET.parse(filename)  # Парсим XML файл
             root = tree.getroot()  # Получаем корневой элемент
-            return self._restore_system_from_xml_root(root)
         except FileNotFoundError:
             raise MyException(f"XML файл не найден: {filename}")
         except ET.ParseError as e:
             raise MyException(f"Некорректный XML формат в файле {filename}: {e}")
+        with span('restore_system') as trace:
+            system = self._restore_system_from_xml_root(root)
+            if trace:
+                trace.set(records=count_records(system))
+        system.mark_saved()  # Только что загруженная система ничего не меняла
+        return system
+
+    def read_with_deltas(self, base_filename: str, delta_filenames: List[str]) -> BookingSystem:
+        # Базовый снимок + цепочка дельт, применяемых по порядку. Реестр метрик
+        # подключается только после дельт: их применение - не рабочие операции
+        system = self.__read(base_filename)
+        for delta_filename in delta_filenames:
+            try:
+                root = ET.parse(delta_filename).getroot()
+            except FileNotFoundError:
+                raise MyException(f"XML файл не найден: {delta_filename}")
+            except ET.ParseError as e:
+                raise MyException(f"Некорректный XML формат в файле {delta_filename}: {e}")
+            with span('apply_delta', file=delta_filename):
+                self._apply_delta_xml(system, root)
+        system.mark_saved()
+        if self.__metrics is not None:
+            system.set_metrics(self.__metrics)
+        return system
+
+    def _apply_delta_xml(self, system: BookingSystem, root: ET.Element) -> None:
+        # Применяет к системе одну дельту из XML
+        for passenger_elem in root.iterfind('Passengers/Passenger'):
+            _upsert_passenger(system, self._create_passenger_from_xml(passenger_elem))
+
+        for transport_elem in root.iterfind('Transports/Transport'):
+            system.add_transport(self._create_transport_from_xml(transport_elem))
+
+        for seat_elem in root.iterfind('Seats/Seat'):
+            _update_seat(system, seat_elem.find('TransportID').text,
+                         self._create_seat_from_xml(seat_elem))
+
+        for route_elem in root.iterfind('Routes/Route'):
+            system.add_route(self._create_route_from_xml(route_elem))
+
+        for trip_elem in root.iterfind('Trips/Trip'):
+            route = system.get_route(trip_elem.find('RouteID').text)
+            transport = system.get_transport(trip_elem.find('TransportID').text)
+            if route and transport:
+                system.add_trip(Trip(trip_elem.find('TripID').text, route, transport))
+
+        for booking_elem in root.iterfind('Bookings/Booking'):
+            booking = system.get_booking(booking_elem.find('BookingID').text)
+            if booking is not None:
+                payment_elem = booking_elem.find('Payment')
+                _update_booking(booking, BookingStatus(booking_elem.find('Status').text),
+                                self._create_payment_from_xml(payment_elem)
+                                if payment_elem is not None else None)
+                continue
+            # Новое бронирование: передаем только нужную поездку и владельца
+            trip_id = booking_elem.find('TripID').text
+            passport_elem = booking_elem.find('Passport')
+            passport = passport_elem.text if passport_elem is not None else None
+            self._create_booking_from_xml(system, booking_elem,
+                                          {trip_id: system.get_trip(trip_id)},
+                                          {passport: system.get_passenger(passport)}
+                                          if passport else {})
+
+        _remove_bookings(system, [elem.text for elem in root.iterfind('RemovedBookings/BookingID')])
 
     def _restore_system_from_xml_root(self, root: ET.Element) -> BookingSystem:
         # Восстанавливает систему из XML
@@ -489,13 +891,8 @@ class XMLReader(DataReader):
         passengers_elem = root.find('Passengers')
         if passengers_elem is not None:
             for passenger_elem in passengers_elem.findall('Passenger'):
-                name = passenger_elem.find('Name').text
-                email = passenger_elem.find('Email').text
-                phone = passenger_elem.find('Phone').text
-                passport = passenger_elem.find('Passport').text
-
-                passenger = Passenger(name, email, phone, passport)
-                passenger_map[passport] = passenger
+                passenger = self._create_passenger_from_xml(passenger_elem)
+                passenger_map[passenger_elem.find('Passport').text] = passenger
 
         system.set_passengers(passenger_map)
 
@@ -507,6 +904,16 @@ class XMLReader(DataReader):
 
         return system
 
+    def _create_passenger_from_xml(self, passenger_elem: ET.Element) -> Passenger:
+        # Создает пассажира из XML элемента
+        name = passenger_elem.find('Name').text
+        email = passenger_elem.find('Email').text
+        phone = passenger_elem.find('Phone').text
+        passport = passenger_elem.find('Passport').text
+        if self.__trusted:
+            return Passenger.restore(name, email, phone, passport)
+        return Passenger(name, email, phone, passport)
+
     def _create_transport_from_xml(self, transport_elem: ET.Element) -> Transport:
         # Создает транспорт из XML элемента
         transport_id = transport_elem.find('TransportID').text
@@ -528,18 +935,20 @@ class XMLReader(DataReader):
         seats_elem = transport_elem.find('Seats')
         if seats_elem is not None:
             for seat_elem in seats_elem.findall('Seat'):
-                number = seat_elem.find('Number').text
-                seat_class = ClassSeat(seat_elem.find('Class').text)
-                price = float(seat_elem.find('Price').text)
-                is_available = seat_elem.find('IsAvailable').text.lower() == 'true'
-
-                seat = Seat(number, seat_class, price)
-                if not is_available:
-                    seat._Seat__is_available = False
-                transport.add_seat(seat)
+                transport.add_seat(self._create_seat_from_xml(seat_elem))
 
         return transport
 
+    @staticmethod
+    def _create_seat_from_xml(seat_elem: ET.Element) -> Seat:
+        # Создает место из XML элемента
+        number = seat_elem.find('Number').text
+        seat_class = ClassSeat(seat_elem.find('Class').text)
+        price = float(seat_elem.find('Price').text)
+        is_available = seat_elem.find('IsAvailable').text.lower() == 'true'
+
+        return Seat(number, seat_class, price, is_available)
+
     def _create_route_from_xml(self, route_elem: ET.Element) -> Route:
         # Создает маршрут из XML элемента
         route_id = route_elem.find('RouteID').text
@@ -575,36 +984,44 @@ class XMLReader(DataReader):
             return
 
         # Создаем бронирование
-        booking = Booking(booking_id, trip, seat)
-        booking._Booking__booking_date = booking_date
-        booking._Booking__status = status
+        booking = Booking(booking_id, trip, seat, booking_date, status)
 
         # Восстанавливаем статус места
         if status == BookingStatus.CONFIRMED:
-            seat._Seat__is_available = False
+            seat._restore_availability(False)
 
         # Восстанавливаем платеж
         payment_elem = booking_elem.find('Payment')
         if payment_elem is not None:
-            payment_id = payment_elem.find('PaymentID').text
-            amount = float(payment_elem.find('Amount').text)
-            payment_method = payment_elem.find('PaymentMethod').text
-            payment_date = datetime.fromisoformat(payment_elem.find('PaymentDate').text)
-            is_paid = payment_elem.find('IsPaid').text.lower() == 'true'
-
-            payment = Payment(payment_id, amount, payment_method)
-            payment._Payment__payment_date = payment_date
-            payment._Payment__is_paid = is_paid
-            booking.add_payment(payment)
+            booking.add_payment(self._create_payment_from_xml(payment_elem))
 
         # Добавляем бронирование в систему
         system.add_booking(booking)
 
-        # Связываем с пассажиром (упрощенно - с первым подходящим)
+        # Связываем с пассажиром по паспорту, если он сохранен в файле
+        passport_elem = booking_elem.find('Passport')
+        if passport_elem is not None:
+            passenger = passenger_map.get(passport_elem.text)
+            if passenger:
+                passenger.add_booking(booking)
+            return
+
+        # Старые файлы: связываем упрощенно - с первым подходящим
         for passenger in passenger_map.values():
             passenger.add_booking(booking)
             break  # В реальной системе нужно правильное связывание
 
+    @staticmethod
+    def _create_payment_from_xml(payment_elem: ET.Element) -> Payment:
+        # Создает платеж из XML элемента
+        payment_id = payment_elem.find('PaymentID').text
+        amount = float(payment_elem.find('Amount').text)
+        payment_method = payment_elem.find('PaymentMethod').text
+        payment_date = datetime.fromisoformat(payment_elem.find('PaymentDate').text)
+        is_paid = payment_elem.find('IsPaid').text.lower() == 'true'
+
+        return Payment(payment_id, amount, payment_method, payment_date, is_paid)
+
 
 # Главный класс для работы с сохранением/загрузкой
 class DataSerializer:
@@ -621,13 +1038,13 @@ class DataSerializer:
         JsonWriter().write(system, filename)  # Сохраняем в JSON
 
     @staticmethod
-    def load_from_json(filename: str) -> BookingSystem:
-        return JsonReader().read(filename)  # Загружаем из JSON
+    def load_from_json(filename: str, trusted: bool = False) -> BookingSystem:
+        return JsonReader(trusted).read(filename)  # Загружаем из JSON
 
     @staticmethod
     def save_to_xml(system: BookingSystem, filename: str) -> None:
         XMLWriter().write(system, filename)  # Сохраняем в XML
 
     @staticmethod
-    def load_from_xml(filename: str) -> BookingSystem:
-        return XMLReader().read(filename)  # Загружаем из XML
+    def load_from_xml(filename: str, trusted: bool = False) -> BookingSystem:
+        return XMLReader(trusted).read(filename)  # Загружаем из XML
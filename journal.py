@@ -0,0 +1,216 @@
+import json
+import os
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from general_system import BookingSystem
+from jobwf import JsonReader, JsonWriter, atomic_file
+from my_exceptions import MyException
+from trip import Trip
+
+
+# Журнал событий - каждое изменение системы дописывается в конец файла
+# одной компактной JSON-строкой. Полный снимок (JsonWriter) делается редко,
+# а после сбоя система восстанавливается как "снимок + хвост журнала".
+class EventJournal:
+    def __init__(self, filename: str, sync_every: int = 64, start_seq: int = 0):
+        self.__filename = filename
+        self.__sync_every = sync_every  # Сколько событий копим до fsync
+        self.__pending = 0              # Событий записано, но еще не сброшено на диск
+        last_seq, valid_end = self._scan(filename)
+        self.__seq = max(start_seq, last_seq)  # Номер последнего события
+        try:
+            # Оборванный при сбое хвост отрезаем: иначе следующее событие
+            # допишется прямо к нему, строка станет некорректной, и при
+            # восстановлении пропадет она и все события после нее
+            if os.path.exists(filename) and os.path.getsize(filename) > valid_end:
+                os.truncate(filename, valid_end)
+            self.__file = open(filename, 'a', encoding='utf-8')
+        except (IOError, OSError) as e:
+            raise MyException(f"Ошибка открытия журнала {filename}: {e}")
+
+    # геттеры
+    @property
+    def filename(self) -> str:
+        return self.__filename
+
+    @property
+    def seq(self) -> int:
+        return self.__seq
+
+    def record(self, operation: str, *objects) -> None:
+        # Превращаем действие системы в событие и дописываем его
+        self.append(operation, _encode_event(operation, *objects))
+
+    def append(self, operation: str, data: Dict[str, Any]) -> None:
+        self.__seq += 1
+        line = json.dumps({'seq': self.__seq, 'op': operation, 'data': data},
+                          ensure_ascii=False, separators=(',', ':'))
+        try:
+            self.__file.write(line + '\n')
+        except IOError as e:
+            raise MyException(f"Ошибка записи в журнал: {e}")
+
+        # fsync дорогой, поэтому делаем его пачками
+        self.__pending += 1
+        if self.__pending >= self.__sync_every:
+            self.sync()
+
+    def sync(self) -> None:
+        # Сбрасываем накопленные события на диск
+        if self.__pending == 0:
+            return
+        try:
+            self.__file.flush()
+            os.fsync(self.__file.fileno())
+        except IOError as e:
+            raise MyException(f"Ошибка синхронизации журнала: {e}")
+        self.__pending = 0
+
+    def truncate(self) -> None:
+        # Очищаем журнал после того, как его события попали в снимок
+        self.__file.close()
+        self.__file = open(self.__filename, 'w', encoding='utf-8')
+        self.__pending = 0
+
+    def close(self) -> None:
+        self.sync()
+        self.__file.close()
+
+    @staticmethod
+    def read_events(filename: str) -> Iterator[Dict[str, Any]]:
+        # Читаем события по порядку; оборванную при сбое последнюю строку пропускаем
+        if not os.path.exists(filename):
+            return
+        with open(filename, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.endswith('\n'):
+                    break
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    break
+
+    @staticmethod
+    def _scan(filename: str) -> Tuple[int, int]:
+        # Номер последнего события и длина целой части журнала в байтах
+        # (по тем же правилам, что и read_events)
+        last, valid_end = 0, 0
+        if not os.path.exists(filename):
+            return last, valid_end
+        with open(filename, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    last = json.loads(line)['seq']
+                except (ValueError, KeyError, TypeError):
+                    break
+                valid_end += len(line)
+        return last, valid_end
+
+
+# Преобразование действий системы в данные события
+def _encode_event(operation: str, *objects) -> Dict[str, Any]:
+    if operation == 'create_passenger':
+        return JsonWriter._serialize_passenger(objects[0])
+    if operation == 'create_transport':
+        return JsonWriter._serialize_transport(objects[0])
+    if operation == 'add_seat':
+        transport, seat = objects
+        return {'transport_id': transport.transport_id, 'seat': JsonWriter._serialize_seat(seat)}
+    if operation == 'create_route':
+        return JsonWriter._serialize_route(objects[0])
+    if operation == 'create_trip':
+        return JsonWriter._serialize_trip(objects[0])
+    if operation == 'create_booking':
+        booking, passenger = objects
+        return JsonWriter._serialize_booking(booking, passenger.passport)
+    if operation == 'confirm_booking':
+        booking = objects[0]
+        return {'booking_id': booking.booking_id,
+                'payment': JsonWriter._serialize_payment(booking.payment)}
+    if operation == 'cancel_booking':
+        return {'booking_id': objects[0].booking_id}
+    raise MyException(f"Неизвестная операция журнала: {operation}")
+
+
+def apply_event(system: BookingSystem, event: Dict[str, Any]) -> None:
+    # Повторяем одно событие журнала на системе (журнал при этом должен быть отключен)
+    reader = JsonReader()
+    operation, data = event['op'], event['data']
+
+    if operation == 'create_passenger':
+        system.add_passenger(reader._create_passenger_from_data(data))
+    elif operation == 'create_transport':
+        system.add_transport(reader._create_transport_from_data(data))
+    elif operation == 'add_seat':
+        transport = system.transports[data['transport_id']]
+        transport.add_seat(reader._create_seat_from_data(data['seat']))
+    elif operation == 'create_route':
+        system.add_route(reader._create_route_from_data(data))
+    elif operation == 'create_trip':
+        route = system.routes[data['route_id']]
+        transport = system.transports[data['transport_id']]
+        system.add_trip(Trip(data['trip_id'], route, transport))
+    elif operation == 'create_booking':
+        # Загрузчик снимков пропускает бронирования без поездки или места,
+        # а при повторе журнала это потеря события - сообщаем об ошибке
+        trip = system.trips.get(data['trip_id'])
+        if trip is None:
+            raise MyException(f"Событие {event['seq']}: поездка {data['trip_id']} не найдена")
+        if not any(seat.number == data['seat_number'] for seat in trip.transport.seats):
+            raise MyException(f"Событие {event['seq']}: места {data['seat_number']} "
+                              f"нет в транспорте {trip.transport.transport_id}")
+        reader._create_booking_from_data(system, data, system.trips, system.passengers)
+    elif operation == 'confirm_booking':
+        booking = system.find_booking_by_id(data['booking_id'])
+        system.confirm_booking(booking, reader._create_payment_from_data(data['payment']))
+    elif operation == 'cancel_booking':
+        system.cancel_booking(system.find_booking_by_id(data['booking_id']))
+    else:
+        raise MyException(f"Неизвестная операция журнала: {operation}")
+
+
+def recover(snapshot_filename: str, journal_filename: str,
+            sync_every: int = 64) -> BookingSystem:
+    # Восстановление после сбоя: последний снимок + события, которых в нем нет
+    snapshot_seq = 0
+    if os.path.exists(snapshot_filename):
+        try:
+            with open(snapshot_filename, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except json.JSONDecodeError as e:
+            raise MyException(f"Некорректный снимок {snapshot_filename}: {e}")
+        snapshot_seq = data.get('journal_seq', 0)
+        system = JsonReader()._restore_system_from_data(data)
+        system.mark_saved()
+    else:
+        system = BookingSystem()
+
+    for event in EventJournal.read_events(journal_filename):
+        if event['seq'] > snapshot_seq:
+            apply_event(system, event)
+
+    # Подключаем журнал: дальнейшие действия снова записываются
+    system.set_journal(EventJournal(journal_filename, sync_every, start_seq=snapshot_seq))
+    return system
+
+
+def compact(system: BookingSystem, snapshot_filename: str) -> None:
+    # Сворачиваем журнал в новый снимок и очищаем его
+    journal: Optional[EventJournal] = system.journal
+    if journal is None:
+        raise MyException("К системе не подключен журнал событий")
+    journal.sync()
+
+    data = JsonWriter()._prepare_data(system)
+    data['journal_seq'] = journal.seq  # Все события до этого номера уже в снимке
+
+    # Пишем во временный файл и атомарно подменяем старый снимок
+    try:
+        with atomic_file(snapshot_filename) as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+    except IOError as e:
+        raise MyException(f"Ошибка записи снимка: {e}")
+
+    journal.truncate()
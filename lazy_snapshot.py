@@ -0,0 +1,351 @@
+import json
+import os
+import sqlite3
+import sys
+from collections.abc import Mapping
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple
+
+from action import Booking
+from general_system import BookingSystem
+from jobwf import JsonReader
+from my_exceptions import BookingNotFoundException, MyException
+from person import Passenger
+from transports import Transport
+from trip import Route, Trip
+
+# Ленивый режим для JSON-снимка: при открытии строится индекс смещений записей
+# в файле, а объекты создаются только при обращении. Индекс живет в памяти;
+# сохранить его рядом со снимком для повторных запусков можно явно (index_filename).
+SECTIONS = {
+    'passengers': 'passport',
+    'transports': 'transport_id',
+    'routes': 'route_id',
+    'trips': 'trip_id',
+    'bookings': 'booking_id',
+}
+
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (size INTEGER, mtime_ns INTEGER);
+CREATE TABLE IF NOT EXISTS records (
+    section TEXT NOT NULL,
+    key TEXT NOT NULL,
+    start INTEGER NOT NULL,
+    end INTEGER NOT NULL,
+    PRIMARY KEY (section, key)
+);
+CREATE TABLE IF NOT EXISTS owners (passport TEXT NOT NULL, booking_id TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS owners_by_passport ON owners (passport);
+"""
+
+_WHITESPACE = ' \t\n\r'
+
+
+def _skip(text: str, position: int) -> int:
+    while position < len(text) and text[position] in _WHITESPACE:
+        position += 1
+    return position
+
+
+def scan_snapshot(data: bytes) -> Iterator[Tuple[str, str, int, int, dict]]:
+    # Проходит по снимку и выдает (секция, ключ, начало, конец, запись).
+    # Структуру ищем в представлении latin-1: один символ = один байт, поэтому
+    # позиции совпадают со смещениями в файле, а служебные символы JSON - ASCII
+    # и не пересекаются с байтами UTF-8. Сама запись (и ее ключ) с не-ASCII
+    # байтами заново декодируется из байтов как UTF-8.
+    text = data.decode('latin-1')
+    decoder = json.JSONDecoder()
+    position = _skip(text, 0)
+    if text[position:position + 1] != '{':
+        raise MyException("Снимок должен быть JSON-объектом")
+    position += 1
+
+    while True:
+        position = _skip(text, position)
+        if text[position] == '}':
+            return
+        if text[position] == ',':
+            position = _skip(text, position + 1)
+        section, position = decoder.raw_decode(text, position)
+        position = _skip(text, position)
+        position = _skip(text, position + 1)  # двоеточие
+
+        if section not in SECTIONS or text[position] != '[':
+            _, position = decoder.raw_decode(text, position)
+            continue
+
+        key_field = SECTIONS[section]
+        position += 1
+        while True:
+            position = _skip(text, position)
+            if text[position] == ']':
+                position += 1
+                break
+            if text[position] == ',':
+                position = _skip(text, position + 1)
+            record, end = decoder.raw_decode(text, position)
+            if not data[position:end].isascii():
+                record = json.loads(data[position:end])
+            yield section, record[key_field], position, end, record
+            position = end
+
+
+class SnapshotIndex:
+    # Индекс смещений в SQLite. По умолчанию строится в памяти при каждом открытии.
+    # С index_filename хранится в этом файле и пересобирается, только если снимок
+    # изменился; если файл не удается открыть или записать, индекс строится в памяти
+    def __init__(self, filename: str, index_filename: Optional[str] = None):
+        stat = os.stat(filename)
+        if index_filename is not None:
+            try:
+                self.__open(filename, stat, index_filename)
+                return
+            except sqlite3.Error:
+                pass
+        self.__open(filename, stat, ':memory:')
+
+    def __open(self, filename: str, stat: os.stat_result, database: str) -> None:
+        self.__connection = sqlite3.connect(database)
+        try:
+            self.__connection.executescript(INDEX_SCHEMA)
+            meta = self.__connection.execute("SELECT size, mtime_ns FROM meta").fetchone()
+            if meta != (stat.st_size, stat.st_mtime_ns):
+                self.__build(filename, stat)
+        except sqlite3.Error:
+            self.__connection.close()
+            raise
+
+    def __build(self, filename: str, stat: os.stat_result) -> None:
+        with open(filename, 'rb') as f:
+            data = f.read()
+
+        records, owners = [], []
+        for section, key, start, end, record in scan_snapshot(data):
+            records.append((section, key, start, end))
+            if section == 'bookings' and record.get('passport'):
+                owners.append((record['passport'], key))
+
+        with self.__connection:
+            for table in ('meta', 'records', 'owners'):
+                self.__connection.execute(f"DELETE FROM {table}")
+            self.__connection.executemany("INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?)",
+                                          records)
+            self.__connection.executemany("INSERT INTO owners VALUES (?, ?)", owners)
+            self.__connection.execute("INSERT INTO meta VALUES (?, ?)",
+                                      (stat.st_size, stat.st_mtime_ns))
+
+    def locate(self, section: str, key: str) -> Optional[Tuple[int, int]]:
+        return self.__connection.execute(
+            "SELECT start, end FROM records WHERE section = ? AND key = ?",
+            (section, key)).fetchone()
+
+    def keys(self, section: str) -> List[str]:
+        return [key for (key,) in self.__connection.execute(
+            "SELECT key FROM records WHERE section = ? ORDER BY start", (section,))]
+
+    def count(self, section: str) -> int:
+        return self.__connection.execute(
+            "SELECT COUNT(*) FROM records WHERE section = ?", (section,)).fetchone()[0]
+
+    def bookings_of(self, passport: str) -> List[str]:
+        return [booking_id for (booking_id,) in self.__connection.execute(
+            "SELECT booking_id FROM owners WHERE passport = ? ORDER BY rowid", (passport,))]
+
+    def close(self) -> None:
+        self.__connection.close()
+
+
+# Словарь "только для чтения", значения которого создаются при первом обращении
+class LazySection(Mapping):
+    def __init__(self, index: SnapshotIndex, section: str, loader: Callable):
+        self.__index = index
+        self.__section = section
+        self.__loader = loader
+
+    # __contains__ берется из Mapping и идет через __getitem__, поэтому запись,
+    # которая есть в индексе, но не загружается, не считается присутствующей
+    def __getitem__(self, key: str):
+        value = self.__loader(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.__index.keys(self.__section))
+
+    def __len__(self) -> int:
+        return self.__index.count(self.__section)
+
+
+# Ленивая система: те же словари passengers/trips/bookings, что и у BookingSystem,
+# но объекты создаются только для запрошенных записей (и того, от чего они зависят)
+class LazyBookingSystem:
+    def __init__(self, filename: str, index_filename: Optional[str] = None):
+        try:
+            self.__file = open(filename, 'rb')
+            self.__index = SnapshotIndex(filename, index_filename)
+        except (IOError, sqlite3.Error) as e:
+            raise MyException(f"Ошибка открытия снимка {filename}: {e}")
+        except (ValueError, IndexError) as e:
+            raise MyException(f"Некорректный JSON формат в файле {filename}: {e}")
+        self.__reader = JsonReader()
+        self.__cache = BookingSystem()  # Уже созданные объекты (карта идентичности)
+
+    def close(self) -> None:
+        self.__file.close()
+        self.__index.close()
+
+    @property
+    def passengers(self) -> Mapping:
+        return LazySection(self.__index, 'passengers', self.get_passenger)
+
+    @property
+    def transports(self) -> Mapping:
+        return LazySection(self.__index, 'transports', self.get_transport)
+
+    @property
+    def routes(self) -> Mapping:
+        return LazySection(self.__index, 'routes', self.get_route)
+
+    @property
+    def trips(self) -> Mapping:
+        return LazySection(self.__index, 'trips', self.get_trip)
+
+    @property
+    def bookings(self) -> Mapping:
+        return LazySection(self.__index, 'bookings', self.get_booking)
+
+    def find_booking_by_id(self, booking_id: str) -> Booking:
+        booking = self.get_booking(booking_id)
+        if booking is None:
+            raise BookingNotFoundException(f"Бронирование с ID {booking_id} не найдено")
+        return booking
+
+    def get_passenger_bookings(self, passport: str) -> Sequence[Booking]:
+        passenger = self.get_passenger(passport)
+        return passenger.bookings if passenger else ()
+
+    def __record(self, section: str, key: str) -> Optional[dict]:
+        location = self.__index.locate(section, key)
+        if location is None:
+            return None
+        start, end = location
+        self.__file.seek(start)
+        return json.loads(self.__file.read(end - start))
+
+    # Загрузка отдельных объектов: сначала смотрим в кеш, потом в файл
+    def get_passenger(self, passport: str) -> Optional[Passenger]:
+        passenger = self.__cache.get_passenger(passport)
+        if passenger is not None:
+            return passenger
+        data = self.__record('passengers', passport)
+        if data is None:
+            return None
+        # Снимок пишется из уже проверенных объектов
+        passenger = Passenger.restore(data['name'], data['email'], data['phone'],
+                                      data['passport'])
+        self.__cache.add_passenger(passenger)
+        for booking_id in self.__index.bookings_of(passport):
+            # Бронирования, созданные раньше пассажира, привязываем сами,
+            # новые привяжутся к нему при создании
+            booking = self.__cache.get_booking(booking_id)
+            if booking is not None:
+                passenger.add_booking(booking)
+            else:
+                self.get_booking(booking_id)
+        return passenger
+
+    def get_transport(self, transport_id: str) -> Optional[Transport]:
+        transport = self.__cache.get_transport(transport_id)
+        if transport is None:
+            data = self.__record('transports', transport_id)
+            if data is None:
+                return None
+            transport = self.__reader._create_transport_from_data(data)
+            self.__cache.add_transport(transport)
+        return transport
+
+    def get_route(self, route_id: str) -> Optional[Route]:
+        route = self.__cache.get_route(route_id)
+        if route is None:
+            data = self.__record('routes', route_id)
+            if data is None:
+                return None
+            route = self.__reader._create_route_from_data(data)
+            self.__cache.add_route(route)
+        return route
+
+    def get_trip(self, trip_id: str) -> Optional[Trip]:
+        trip = self.__cache.get_trip(trip_id)
+        if trip is None:
+            data = self.__record('trips', trip_id)
+            if data is None:
+                return None
+            route = self.get_route(data['route_id'])
+            transport = self.get_transport(data['transport_id'])
+            if not (route and transport):
+                return None
+            trip = Trip(trip_id, route, transport)
+            self.__cache.add_trip(trip)
+        return trip
+
+    def get_booking(self, booking_id: str) -> Optional[Booking]:
+        booking = self.__cache.get_booking(booking_id)
+        if booking is not None:
+            return booking
+        data = self.__record('bookings', booking_id)
+        if data is None:
+            return None
+        trip = self.get_trip(data['trip_id'])
+        if trip is None:
+            return None
+
+        # Владельца связываем здесь, только если он уже создан -
+        # иначе это сделает get_passenger вместе с остальными его бронированиями
+        passport = data.get('passport')
+        owner = self.__cache.get_passenger(passport) if passport else None
+        self.__reader._create_booking_from_data(
+            self.__cache, data, {trip.trip_id: trip}, {passport: owner} if owner else {})
+        booking = self.__cache.get_booking(booking_id)
+        if booking is not None and passport and owner is None:
+            self.get_passenger(passport)
+        return booking
+
+
+# Быстрый запрос из командной строки:
+#   python lazy_snapshot.py snapshot.json booking <ID>
+#   python lazy_snapshot.py snapshot.json passenger <паспорт>
+# С --index индекс сохраняется в snapshot.json.idx, и повторные запросы
+# к тому же снимку не сканируют файл
+def main(argv: List[str]) -> int:
+    index = '--index' in argv[4:]
+    if len(argv) != 4 + index or argv[2] not in ('booking', 'passenger'):
+        print("Использование: lazy_snapshot.py <снимок.json> booking|passenger <ключ> [--index]")
+        return 2
+
+    system = LazyBookingSystem(argv[1], argv[1] + '.idx' if index else None)
+    try:
+        if argv[2] == 'booking':
+            booking = system.find_booking_by_id(argv[3])
+            print(booking.get_info())
+            print(booking.trip.get_info())
+        else:
+            passenger = system.get_passenger(argv[3])
+            if passenger is None:
+                print(f"Пассажир с паспортом {argv[3]} не найден")
+                return 1
+            print(passenger.get_info())
+            for booking in passenger.bookings:
+                print(f"  {booking.get_info()}")
+    except MyException as e:
+        print(e)
+        return 1
+    except BookingNotFoundException as e:
+        print(e)
+        return 1
+    finally:
+        system.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
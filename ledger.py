@@ -0,0 +1,168 @@
+from array import array
+from datetime import date, datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from action import Booking
+
+# Денежный журнал: только дописываемые записи о списаниях (оплата
+# бронирования) и возвратах (отмена оплаченного бронирования). Записи лежат
+# в колонках array (строки - коды в общих таблицах), а итоги по поездкам,
+# пассажирам и дням ведутся на ходу, поэтому баланс - O(1), а сверка -
+# один проход по записям. Записи создает система (BookingSystem.set_ledger)
+# по уведомлениям Payment.process_payment и Payment.refund.
+
+CHARGE = 1
+REFUND = -1
+
+# Запись: (вид, сумма, время, ID поездки, паспорт, ID платежа)
+Entry = Tuple[int, float, datetime, str, str, str]
+
+
+class _Codes:
+    # Строка -> код (номер в списке значений)
+    def __init__(self):
+        self.__codes: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def code(self, value: str) -> int:
+        code = self.__codes.get(value)
+        if code is None:
+            code = self.__codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class Ledger:
+    def __init__(self):
+        self.__kinds = array('b')      # CHARGE или REFUND
+        self.__amounts = array('d')    # Сумма (всегда положительная)
+        self.__times = array('d')      # Время записи, секунды epoch
+        self.__days = array('i')       # День записи (date.toordinal)
+        self.__trips = array('i')      # Коды в self.__trip_codes
+        self.__passports = array('i')  # Коды в self.__passport_codes
+        self.__payments = array('i')   # Коды в self.__payment_codes
+        self.__trip_codes = _Codes()
+        self.__passport_codes = _Codes()
+        self.__payment_codes = _Codes()
+        # Что уже записано по платежу: CHARGE - списание, REFUND - и возврат
+        self.__posted: Dict[str, int] = {}
+        # Итоги на ходу (списания минус возвраты)
+        self.__total = 0.0
+        self.__by_trip: Dict[str, float] = {}
+        self.__by_passenger: Dict[str, float] = {}
+        self.__by_day: Dict[date, float] = {}
+
+    def __len__(self) -> int:
+        return len(self.__kinds)
+
+    def post(self, booking: Booking, passport: Optional[str]) -> None:
+        # Записывает то, что еще не записано по платежу бронирования: списание
+        # оплаченного и возврат возвращенного. Повторный вызов ничего не добавляет
+        payment = booking.payment
+        if payment is None or not payment.is_paid:
+            return
+        posted = self.__posted.get(payment.payment_id)
+        if posted is None:
+            # Списание - на момент оплаты; у загруженных из файла оплаченных
+            # платежей он неизвестен, берем дату платежа
+            self.__append(CHARGE, payment.amount, payment.paid_at or payment.payment_date,
+                          booking.trip.trip_id, passport or '', payment.payment_id)
+            posted = self.__posted[payment.payment_id] = CHARGE
+        if payment.is_refunded and posted == CHARGE:
+            self.__append(REFUND, payment.amount, payment.refunded_at, booking.trip.trip_id,
+                          passport or '', payment.payment_id)
+            self.__posted[payment.payment_id] = REFUND
+
+    def __append(self, kind: int, amount: float, moment: datetime, trip_id: str,
+                 passport: str, payment_id: str) -> None:
+        self.__kinds.append(kind)
+        self.__amounts.append(amount)
+        self.__times.append(moment.timestamp())
+        self.__days.append(moment.toordinal())
+        self.__trips.append(self.__trip_codes.code(trip_id))
+        self.__passports.append(self.__passport_codes.code(passport))
+        self.__payments.append(self.__payment_codes.code(payment_id))
+
+        signed = kind * amount
+        day = moment.date()
+        self.__total += signed
+        self.__by_trip[trip_id] = self.__by_trip.get(trip_id, 0.0) + signed
+        self.__by_passenger[passport] = self.__by_passenger.get(passport, 0.0) + signed
+        self.__by_day[day] = self.__by_day.get(day, 0.0) + signed
+
+    # Балансы (списания минус возвраты)
+    @property
+    def total(self) -> float:
+        return self.__total
+
+    def trip_balance(self, trip_id: str) -> float:
+        return self.__by_trip.get(trip_id, 0.0)
+
+    def passenger_balance(self, passport: str) -> float:
+        return self.__by_passenger.get(passport, 0.0)
+
+    def day_balance(self, day: date) -> float:
+        return self.__by_day.get(day, 0.0)
+
+    def entries(self) -> Iterator[Entry]:
+        trips = self.__trip_codes.values
+        passports = self.__passport_codes.values
+        payments = self.__payment_codes.values
+        for kind, amount, moment, trip, passport, payment in zip(
+                self.__kinds, self.__amounts, self.__times, self.__trips,
+                self.__passports, self.__payments):
+            yield (kind, amount, datetime.fromtimestamp(moment), trips[trip],
+                   passports[passport], payments[payment])
+
+    def reconcile(self, system=None) -> List[str]:
+        # Сверка за один проход по записям: итоги пересчитываются заново и
+        # сравниваются с накопленными. С system (BookingSystem) дополнительно
+        # проверяется, что по каждому платежу в журнале осталось ровно то,
+        # что оплачено в действующих бронированиях системы. Пустой список - все сходится
+        total = 0.0
+        by_trip = [0.0] * len(self.__trip_codes.values)
+        by_passenger = [0.0] * len(self.__passport_codes.values)
+        by_payment = [0.0] * len(self.__payment_codes.values)
+        by_day: Dict[int, float] = {}
+        for kind, amount, day, trip, passport, payment in zip(
+                self.__kinds, self.__amounts, self.__days, self.__trips,
+                self.__passports, self.__payments):
+            signed = kind * amount
+            total += signed
+            by_trip[trip] += signed
+            by_passenger[passport] += signed
+            by_payment[payment] += signed
+            by_day[day] = by_day.get(day, 0.0) + signed
+
+        problems = []
+        if not _close(total, self.__total):
+            problems.append(f"Общий итог {self.__total} вместо {total}")
+        for name, codes, values, totals in (
+                ('поездке', self.__trip_codes, by_trip, self.__by_trip),
+                ('пассажиру', self.__passport_codes, by_passenger, self.__by_passenger)):
+            for key, value in zip(codes.values, values):
+                if not _close(value, totals.get(key, 0.0)):
+                    problems.append(f"Итог по {name} {key}: {totals.get(key)} вместо {value}")
+        for ordinal, value in by_day.items():
+            day = date.fromordinal(ordinal)
+            if not _close(value, self.__by_day.get(day, 0.0)):
+                problems.append(f"Итог за {day}: {self.__by_day.get(day)} вместо {value}")
+
+        if system is not None:
+            expected: Dict[str, float] = {}
+            for booking in system.bookings.values():
+                payment = booking.payment
+                if payment is not None and payment.is_paid and not payment.is_refunded:
+                    expected[payment.payment_id] = payment.amount
+            for payment_id, value in zip(self.__payment_codes.values, by_payment):
+                amount = expected.pop(payment_id, 0.0)
+                if not _close(value, amount):
+                    problems.append(f"Платеж {payment_id}: в журнале {value}, в системе {amount}")
+            for payment_id, amount in expected.items():
+                problems.append(f"Платеж {payment_id} на {amount} не записан в журнал")
+        return problems
+
+
+def _close(first: float, second: float) -> bool:
+    # Суммы копятся во float - сравниваем с точностью до копейки
+    return abs(first - second) < 0.005
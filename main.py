@@ -364,6 +364,59 @@ def test_error_scenarios():
         print(f"❌ Неожиданная ошибка при тестировании сценариев: {e}")
 
 
+def test_delta_round_trip():
+    """Тестирование дельта-файлов: снимок + дельта дают то же состояние"""
+    print("\n" + "=" * 60)
+    print("ТЕСТИРОВАНИЕ ДЕЛЬТА-ФАЙЛОВ")
+    print("=" * 60)
+
+    for writer, reader, extension in ((JsonWriter(), JsonReader(), "json"),
+                                      (XMLWriter(), XMLReader(), "xml")):
+        base_filename = f"delta_base.{extension}"
+        delta_filename = f"delta_1.{extension}"
+        try:
+            system = BookingSystem()
+            first = system.create_passenger("Иван Иванов", "ivan@mail.ru",
+                                            "+79161234567", "1234567890")
+            second = system.create_passenger("Анна Петрова", "anna@yandex.ru",
+                                             "+79169876543", "0987654321")
+            bus = system.create_transport(TransportType.BUS, model="Test", capacity=2,
+                                          has_wifi=True, has_usb_charging=True)
+            system.add_seat(bus, Seat("01", ClassSeat.ECONOMY, 1000.0))
+            route = system.create_route("А", "Б", datetime.now(),
+                                        datetime.now() + timedelta(hours=1))
+            trip = system.create_trip(route, bus)
+
+            cancelled = system.create_booking(first, trip, "01")
+            system.pay_booking(cancelled, Payment("PAY_A", 1000.0, "карта"), 2000.0)
+            writer.write(system, base_filename)
+
+            # Место отменённого бронирования до сохранения дельты занимает другой пассажир
+            system.cancel_booking(cancelled)
+            booking = system.create_booking(second, trip, "01")
+            system.pay_booking(booking, Payment("PAY_B", 1000.0, "карта"), 2000.0)
+            writer.write_delta(system, delta_filename)
+
+            restored = reader.read_with_deltas(base_filename, [delta_filename])
+            restored_booking = restored.get_booking(booking.booking_id)
+            seat = restored.get_trip(trip.trip_id).transport.seats[0]
+            if (restored.get_booking(cancelled.booking_id) is None
+                    and restored_booking is not None
+                    and restored_booking.status == BookingStatus.CONFIRMED
+                    and not seat.is_available
+                    and restored.get_seat_booking(trip.trip_id, "01") is restored_booking):
+                print(f"{extension.upper()}: место 01 занято подтвержденным бронированием "
+                      f"{booking.booking_id}, отмененное {cancelled.booking_id} удалено")
+            else:
+                print(f"❌ {extension.upper()}: состояние после дельты не совпадает с исходным")
+        except Exception as e:
+            print(f"❌ Ошибка при тестировании дельта-файлов {extension.upper()}: {e}")
+        finally:
+            for filename in (base_filename, delta_filename):
+                if os.path.exists(filename):
+                    os.remove(filename)
+
+
 def cleanup_test_files():
     """Очистка тестовых файлов"""
     test_files = [
@@ -396,6 +449,9 @@ def main():
             # Тестирование сценариев ошибок
             test_error_scenarios()
 
+            # Тестирование дельта-файлов
+            test_delta_round_trip()
+
             print("\n" + "=" * 60)
             print("ВСЕ ТЕСТЫ УСПЕШНО ЗАВЕРШЕНЫ!")
             print("=" * 60)
@@ -0,0 +1,187 @@
+import sys
+import tracemalloc
+from enum import Enum
+from itertools import chain, islice
+from typing import Iterable, List, Optional
+
+from action import Booking, Payment
+from my_exceptions import MyException
+from person import Passenger
+from seat import Seat
+from transports import Transport
+from trip import Route, Trip
+
+# Отчет о памяти по типам объектов: сколько объектов каждого типа и сколько
+# байт они удерживают. Размер считается не по всем объектам, а по равномерной
+# выборке и умножается на количество, поэтому отчет можно снимать с живого
+# процесса. Для поиска утечек между двумя моментами времени - снимки tracemalloc
+# (start_tracing, take_snapshot, compare_snapshots).
+#
+# Удерживаемый размер объекта - он сам и то, что принадлежит только ему
+# (строки, даты, списки). Другие объекты предметной области не учитываются:
+# они посчитаны в своих типах. Общие значения (интернированные строки, цены,
+# см. interning.py) делятся поровну между всеми, кто на них ссылается.
+
+ENTITY_TYPES = (Seat, Booking, Payment, Passenger, Route, Trip, Transport)
+
+DEFAULT_SAMPLE_SIZE = 100
+
+# Ссылки на значение, которые делает сам подсчет: переменная вызывающего,
+# параметр _owned_size и аргумент sys.getrefcount
+_COUNTING_REFS = 3
+
+_CONTAINERS = (list, tuple, set, frozenset)
+
+
+class EntityMemory:
+    def __init__(self, name: str, count: int, sampled: int, bytes_per_object: float):
+        self.__name = name
+        self.__count = count                        # Объектов этого типа в системе
+        self.__sampled = sampled                    # Сколько из них измерено
+        self.__bytes_per_object = bytes_per_object  # Средний удерживаемый размер
+
+    @property
+    def name(self) -> str:
+        return self.__name
+
+    @property
+    def count(self) -> int:
+        return self.__count
+
+    @property
+    def sampled(self) -> int:
+        return self.__sampled
+
+    @property
+    def bytes_per_object(self) -> float:
+        return self.__bytes_per_object
+
+    @property
+    def total_bytes(self) -> int:
+        return round(self.__bytes_per_object * self.__count)
+
+    def __repr__(self) -> str:
+        return (f"{self.__name}: {self.__count} шт., ~{self.__bytes_per_object:.0f} Б/шт., "
+                f"~{self.total_bytes / 1024 / 1024:.1f} МБ")
+
+
+class MemoryReport:
+    def __init__(self, entries: List[EntityMemory]):
+        self.__entries = entries
+
+    @property
+    def entries(self) -> List[EntityMemory]:
+        return self.__entries.copy()
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(entry.total_bytes for entry in self.__entries)
+
+    def get(self, name: str) -> Optional[EntityMemory]:
+        for entry in self.__entries:
+            if entry.name == name:
+                return entry
+        return None
+
+    def get_info(self) -> str:
+        # Типы по убыванию занятой памяти
+        lines = [repr(entry) for entry in
+                 sorted(self.__entries, key=lambda entry: entry.total_bytes, reverse=True)]
+        lines.append(f"Всего: ~{self.total_bytes / 1024 / 1024:.1f} МБ")
+        return '\n'.join(lines)
+
+
+def build_memory_report(system, sample_size: int = DEFAULT_SAMPLE_SIZE) -> MemoryReport:
+    # system - BookingSystem. Проход по объектам без копирования коллекций
+    transports = system.transports.values()
+    bookings = system.bookings.values()
+    populations = (
+        ('Seat', sum(len(transport.seats) for transport in transports),
+         lambda: chain.from_iterable(transport.seats for transport in transports)),
+        ('Booking', len(bookings), lambda: iter(bookings)),
+        ('Payment', sum(1 for booking in bookings if booking.payment is not None),
+         lambda: (booking.payment for booking in bookings if booking.payment is not None)),
+        ('Passenger', len(system.passengers), lambda: iter(system.passengers.values())),
+        ('Route', len(system.routes), lambda: iter(system.routes.values())),
+        ('Trip', len(system.trips), lambda: iter(system.trips.values())),
+        ('Transport', len(transports), lambda: iter(transports)),
+    )
+    entries = []
+    for name, count, objects in populations:
+        sample = list(_sample(objects(), count, sample_size))
+        average = sum(map(object_size, sample)) / len(sample) if sample else 0.0
+        entries.append(EntityMemory(name, count, len(sample), average))
+    return MemoryReport(entries)
+
+
+def _sample(objects: Iterable, count: int, sample_size: int) -> Iterable:
+    # Равномерная выборка: каждый step-й объект (не больше sample_size)
+    step = max(1, count // max(1, sample_size))
+    return islice(objects, 0, step * sample_size, step)
+
+
+def object_size(obj) -> float:
+    # Удерживаемый размер одного объекта предметной области (приблизительно)
+    size = sys.getsizeof(obj)
+    for cls in type(obj).__mro__:
+        slots = cls.__dict__.get('__slots__', ())
+        for slot in (slots,) if isinstance(slots, str) else slots:
+            try:
+                value = getattr(obj, _mangle(cls, slot))
+            except AttributeError:
+                continue  # Слот не заполнен
+            size += _owned_size(value)
+    # Без __slots__ (Transport) атрибуты лежат в словаре экземпляра
+    attributes = getattr(obj, '__dict__', None)
+    if attributes is not None:
+        size += sys.getsizeof(attributes)
+        for value in attributes.values():
+            size += _owned_size(value)
+    return size
+
+
+def _mangle(cls: type, name: str) -> str:
+    if name.startswith('__') and not name.endswith('__'):
+        return f"_{cls.__name__.lstrip('_')}{name}"
+    return name
+
+
+def _owned_size(value) -> float:
+    if value is None or isinstance(value, (bool, Enum, ENTITY_TYPES)):
+        return 0  # Синглтоны и объекты, учтенные в своих типах
+    owners = max(1, sys.getrefcount(value) - _COUNTING_REFS)
+    size = sys.getsizeof(value)
+    if isinstance(value, _CONTAINERS):
+        for item in value:
+            size += _owned_size(item)
+    elif isinstance(value, dict):
+        for key in value:
+            size += _owned_size(key)
+        for item in value.values():
+            size += _owned_size(item)
+    return size / owners
+
+
+# Снимки tracemalloc. Трассировка замедляет выделение памяти в разы,
+# поэтому включается явно и только на время расследования
+def start_tracing(frames: int = 1) -> None:
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+
+
+def stop_tracing() -> None:
+    tracemalloc.stop()
+
+
+def take_snapshot() -> tracemalloc.Snapshot:
+    if not tracemalloc.is_tracing():
+        raise MyException("Трассировка памяти не запущена (start_tracing)")
+    # Память самого tracemalloc в отчет не входит
+    return tracemalloc.take_snapshot().filter_traces(
+        (tracemalloc.Filter(False, tracemalloc.__file__),))
+
+
+def compare_snapshots(before: tracemalloc.Snapshot, after: tracemalloc.Snapshot,
+                      limit: int = 10, group_by: str = 'lineno') -> List[tracemalloc.StatisticDiff]:
+    # Места в коде, где память выросла (или уменьшилась) сильнее всего
+    return after.compare_to(before, group_by)[:limit]
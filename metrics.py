@@ -0,0 +1,206 @@
+import bisect
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from jobwf import atomic_file
+
+# Метрики работы системы: счетчики, показатели (gauge) и гистограммы
+# задержек с фиксированными корзинами. Реестр подключается к системе через
+# BookingSystem.set_metrics; без реестра измеряемые методы вызываются
+# напрямую, и метрики почти ничего не стоят.
+# Выгрузка - в текстовый формат Prometheus (файл для node_exporter
+# textfile collector) или в произвольную функцию.
+
+# Границы корзин гистограмм, секунды: от 50 мкс до 10 с
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+OPERATION_DURATION = 'booking_operation_duration_seconds'
+OPERATION_ERRORS = 'booking_operation_errors_total'
+
+Labels = Tuple[Tuple[str, str], ...]
+Sample = Tuple[str, Dict[str, str], float]  # Имя, метки, значение
+
+
+class Counter:
+    __slots__ = ('__value', '__lock')
+
+    def __init__(self):
+        self.__value = 0.0
+        self.__lock = threading.Lock()
+
+    @property
+    def value(self) -> float:
+        return self.__value
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self.__lock:
+            self.__value += amount
+
+
+class Gauge:
+    __slots__ = ('__value', '__function')
+
+    def __init__(self):
+        self.__value = 0.0
+        self.__function: Optional[Callable[[], float]] = None
+
+    @property
+    def value(self) -> float:
+        # Показатель с функцией считается в момент выгрузки, а не на каждом изменении
+        return self.__function() if self.__function is not None else self.__value
+
+    def set(self, value: float) -> None:
+        self.__value = value
+
+    def set_function(self, function: Optional[Callable[[], float]]) -> None:
+        self.__function = function
+
+
+class Histogram:
+    __slots__ = ('__bounds', '__counts', '__sum', '__lock')
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.__bounds = tuple(sorted(buckets))
+        self.__counts = [0] * (len(self.__bounds) + 1)  # Последняя корзина - +Inf
+        self.__sum = 0.0
+        self.__lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.__bounds, value)  # Граница le включительно
+        with self.__lock:
+            self.__counts[index] += 1
+            self.__sum += value
+
+    @property
+    def count(self) -> int:
+        return sum(self.__counts)
+
+    @property
+    def sum(self) -> float:
+        return self.__sum
+
+    def buckets(self) -> List[Tuple[float, int]]:
+        # Накопленные счетчики по границам, как в Prometheus (последняя - inf)
+        with self.__lock:
+            counts = self.__counts.copy()
+        total = 0
+        result = []
+        for bound, count in zip(self.__bounds + (math.inf,), counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class MetricsRegistry:
+    def __init__(self):
+        # Имя -> (тип, описание, {метки -> метрика})
+        self.__families: Dict[str, Tuple[str, str, Dict[Labels, Any]]] = {}
+        self.__lock = threading.Lock()
+        self.__durations: Dict[str, Histogram] = {}  # Операция -> гистограмма (для call)
+
+    def counter(self, name: str, description: str = '', **labels: str) -> Counter:
+        return self.__get('counter', name, description, labels, Counter)
+
+    def gauge(self, name: str, description: str = '', **labels: str) -> Gauge:
+        return self.__get('gauge', name, description, labels, Gauge)
+
+    def histogram(self, name: str, description: str = '',
+                  buckets: Sequence[float] = DEFAULT_BUCKETS, **labels: str) -> Histogram:
+        return self.__get('histogram', name, description, labels, lambda: Histogram(buckets))
+
+    def __get(self, kind: str, name: str, description: str, labels: Dict[str, str],
+              factory: Callable[[], Any]) -> Any:
+        key = tuple(sorted(labels.items()))
+        with self.__lock:
+            family = self.__families.get(name)
+            if family is None:
+                family = self.__families[name] = (kind, description, {})
+            elif family[0] != kind:
+                raise ValueError(f"Метрика {name} уже зарегистрирована как {family[0]}")
+            metric = family[2].get(key)
+            if metric is None:
+                metric = family[2][key] = factory()
+            return metric
+
+    def call(self, operation: str, function: Callable, *args, **kwargs) -> Any:
+        # Вызывает function, записывая длительность в гистограмму операции;
+        # исключения считаются по типу и пробрасываются дальше
+        histogram = self.__durations.get(operation)
+        if histogram is None:
+            histogram = self.__durations[operation] = self.histogram(
+                OPERATION_DURATION, "Длительность операций системы", operation=operation)
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        except Exception as e:
+            self.counter(OPERATION_ERRORS, "Исключения в операциях системы",
+                         operation=operation, exception=type(e).__name__).inc()
+            raise
+        finally:
+            histogram.observe(time.perf_counter() - start)
+
+    def collect(self) -> List[Sample]:
+        # Все значения в виде отдельных отсчетов (у гистограмм - _bucket, _sum, _count)
+        samples = []
+        for name, kind, _, metrics in self.__snapshot():
+            samples.extend(_family_samples(name, kind, metrics))
+        return samples
+
+    def __snapshot(self) -> List[Tuple[str, str, str, List[Tuple[Labels, Any]]]]:
+        with self.__lock:
+            return [(name, kind, description, list(metrics.items()))
+                    for name, (kind, description, metrics) in sorted(self.__families.items())]
+
+    def to_prometheus(self) -> str:
+        lines = []
+        for name, kind, description, metrics in self.__snapshot():
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+            for sample_name, labels, value in _family_samples(name, kind, metrics):
+                lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, filename: str) -> None:
+        # Файл заменяется атомарно: сборщик никогда не увидит его наполовину записанным
+        with atomic_file(filename) as f:
+            f.write(self.to_prometheus())
+
+    def export(self, callback: Callable[[List[Sample]], Any]) -> None:
+        callback(self.collect())
+
+
+def _family_samples(name: str, kind: str, metrics: List[Tuple[Labels, Any]]) -> List[Sample]:
+    samples = []
+    for key, metric in metrics:
+        labels = dict(key)
+        if kind != 'histogram':
+            samples.append((name, labels, metric.value))
+            continue
+        buckets = metric.buckets()
+        for bound, count in buckets:
+            samples.append((f"{name}_bucket", {**labels, 'le': _format_value(bound)}, count))
+        samples.append((f"{name}_sum", labels, metric.sum))
+        samples.append((f"{name}_count", labels, buckets[-1][1]))  # Согласовано с корзинами
+    return samples
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    escaped = (f'{key}="{_escape(value)}"' for key, value in labels.items())
+    return '{' + ','.join(escaped) + '}'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
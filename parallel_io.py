@@ -0,0 +1,174 @@
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from general_system import BookingSystem
+from person import Passenger
+from jobwf import DataReader, DataWriter, JsonReader, JsonWriter, atomic_file, count_records
+from my_exceptions import MyException
+from trip import Trip
+from tracing import span
+
+# Снимок, разбитый на независимые части: каталог с manifest.json и файлами
+# вида passengers_000003_0000.json (раздел, поколение, номер части).
+# Каждая запись пишет части нового поколения, затем атомарно заменяет манифест
+# и только после этого удаляет части прежних поколений: сбой на любом шаге
+# оставляет манифест, все части которого на месте.
+#
+# Части разбираются независимо (по желанию - в процессах). Процессы возвращают
+# только проверенные простые данные - pickle словарей и кортежей намного дешевле,
+# чем объектов, - а объекты создаются и связываются в родителе без повторной
+# проверки. Это последовательная часть, поэтому процессы по умолчанию не
+# используются (замер - python -m benchmarks.bench_parallel).
+MANIFEST = 'manifest.json'
+SECTIONS = ['passengers', 'transports', 'routes', 'trips', 'bookings']
+CHUNK_RE = re.compile(rf"(?:{'|'.join(SECTIONS)})_\d+_\d+\.json")
+
+
+class ChunkedJsonWriter(DataWriter):
+    def __init__(self, chunk_size: int = 10000):
+        self.__chunk_size = chunk_size  # Записей в одном файле
+
+    def write(self, system: BookingSystem, filename: str) -> None:
+        with span('chunked_json_write', file=filename) as trace:
+            if trace:
+                trace.set(records=count_records(system))
+            self.__write(system, filename)
+
+    def __write(self, system: BookingSystem, filename: str) -> None:
+        # filename - каталог снимка
+        with span('prepare_data'):
+            data = JsonWriter()._prepare_data(system)
+        generation = _read_manifest(filename).get('generation', 0) + 1 if os.path.exists(
+            os.path.join(filename, MANIFEST)) else 1
+
+        manifest = {'version': 1, 'generation': generation, 'sections': {}}
+        try:
+            os.makedirs(filename, exist_ok=True)
+            for section in SECTIONS:
+                records = data[section]
+                files = []
+                for number, start in enumerate(range(0, len(records), self.__chunk_size)):
+                    chunk_name = f"{section}_{generation:06d}_{number:04d}.json"
+                    chunk = records[start:start + self.__chunk_size]
+                    with span('write_chunk', file=chunk_name, records=len(chunk)) as trace, \
+                            atomic_file(os.path.join(filename, chunk_name)) as f:
+                        json.dump(chunk, f, ensure_ascii=False, separators=(',', ':'))
+                        if trace:
+                            trace.set(bytes=f.tell())
+                    files.append(chunk_name)
+                manifest['sections'][section] = files
+
+            # Манифест пишем последним: до его замены действует старый со своими частями
+            with atomic_file(os.path.join(filename, MANIFEST)) as f:
+                json.dump(manifest, f, indent=2)
+            # Удаляем части прежних поколений, в том числе оставшиеся после сбоев
+            current = set(_all_files(manifest))
+            for stale in os.listdir(filename):
+                if CHUNK_RE.fullmatch(stale) and stale not in current:
+                    os.remove(os.path.join(filename, stale))
+        except IOError as e:
+            raise MyException(f"Ошибка записи снимка {filename}: {e}")
+        system.mark_saved()  # Полный снимок - новая база для дельт
+
+
+class ParallelJsonReader(DataReader):
+    def __init__(self, workers: Optional[int] = 1, trusted: bool = False):
+        # workers > 1 - части разбираются в пуле процессов, None - по числу ядер
+        # (см. выше, почему не по умолчанию)
+        self.__workers = workers or os.cpu_count() or 1
+        self.__trusted = trusted  # Пассажиры без повторной валидации (см. JsonReader)
+
+    def read(self, filename: str) -> BookingSystem:
+        with span('parallel_json_read', file=filename, workers=self.__workers) as trace:
+            system = self.__read(filename)
+            if trace:
+                trace.set(records=count_records(system))
+        return system
+
+    def __read(self, filename: str) -> BookingSystem:
+        manifest = _read_manifest(filename)
+        sections = manifest['sections']
+        jobs = [(section, os.path.join(filename, chunk), self.__trusted)
+                for section in SECTIONS for chunk in sections.get(section, [])]
+
+        # Разбор и проверка частей - в процессах; результаты приходят в порядке jobs.
+        # Интервалы из процессов-исполнителей остаются в них и в трассу не попадают
+        with span('load_chunks', files=len(jobs)):
+            if self.__workers > 1 and len(jobs) > 1:
+                with ProcessPoolExecutor(max_workers=self.__workers) as executor:
+                    results = list(executor.map(_load_chunk, *zip(*jobs)))
+            else:
+                results = [_load_chunk(*job) for job in jobs]
+
+        loaded: Dict[str, List[Any]] = {section: [] for section in SECTIONS}
+        for (section, _, _), objects in zip(jobs, results):
+            loaded[section].extend(objects)
+        with span('link'):
+            return self._link(loaded)
+
+    @staticmethod
+    def _link(loaded: Dict[str, List[Any]]) -> BookingSystem:
+        # Создаем объекты из проверенных данных и связываем их между собой
+        system = BookingSystem()
+        reader = JsonReader()
+
+        transport_map = {}
+        for transport_data in loaded['transports']:
+            transport_map[transport_data['transport_id']] = \
+                reader._create_transport_from_data(transport_data)
+        route_map = {}
+        for route_data in loaded['routes']:
+            route_map[route_data['route_id']] = reader._create_route_from_data(route_data)
+        passenger_map = {}
+        for fields in loaded['passengers']:
+            passenger = Passenger.restore(*fields)  # Проверены в _load_chunk
+            passenger_map[passenger.passport] = passenger
+        system.set_transports(transport_map)
+        system.set_routes(route_map)
+
+        trip_map = {}
+        for trip_data in loaded['trips']:
+            route = route_map.get(trip_data['route_id'])
+            transport = transport_map.get(trip_data['transport_id'])
+            if route and transport:
+                trip_map[trip_data['trip_id']] = Trip(trip_data['trip_id'], route, transport)
+        system.set_trips(trip_map)
+        system.set_passengers(passenger_map)
+
+        for booking_data in loaded['bookings']:
+            reader._create_booking_from_data(system, booking_data, trip_map, passenger_map)
+
+        system.mark_saved()
+        return system
+
+
+def _read_manifest(dirname: str) -> Dict[str, Any]:
+    try:
+        with open(os.path.join(dirname, MANIFEST), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        raise MyException(f"Манифест снимка не найден в каталоге: {dirname}")
+    except json.JSONDecodeError as e:
+        raise MyException(f"Некорректный манифест снимка {dirname}: {e}")
+
+
+def _all_files(manifest: Dict[str, Any]) -> List[str]:
+    return [chunk for chunks in manifest['sections'].values() for chunk in chunks]
+
+
+def _load_chunk(section: str, path: str, trusted: bool = False) -> List[Any]:
+    # Выполняется в дочернем процессе: разбор JSON и проверка пассажиров, если
+    # файл не доверенный. Возвращает только простые данные: пассажиров - кортежами
+    # уже нормализованных полей для Passenger.restore, остальное - словарями
+    records = JsonReader._load(path)
+    if section != 'passengers':
+        return records
+    fields = [(data['name'], data['email'], data['phone'], data['passport']) for data in records]
+    if trusted:
+        return fields
+    # Конструктор проверяет поля и нормализует телефон и паспорт
+    passengers = [Passenger(*passenger_fields) for passenger_fields in fields]
+    return [(p.name, p.email, p.phone, p.passport) for p in passengers]
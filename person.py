@@ -1,23 +1,57 @@
 from abc import ABC, abstractmethod
 from action import Booking
-from typing import List
+from typing import List, Sequence
+from tracking import Trackable
+from views import ListView
 import re
 
 
 # Абстрактный класс Person - основа для всех людей в системе
-class Person(ABC):
+class Person(ABC, Trackable):
+    __slots__ = ('_name', '_email', '_phone')
+
     # Шаблоны для проверки данных (регулярные выражения)
     EMAIL_PATTERN = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
     PHONE_PATTERN = r'^[+]?[7-8][ (-]?\d{3}[) -]?\d{3}[ -]?\d{2}[ -]?\d{2}$'
     PASSPORT_PATTERN = r'^[0-9]{4}[\s]?[0-9]{6}$'
     NAME_PATTERN = r'^[A-Za-zА-Яа-яЁё\s\-]+$'
 
+    # Скомпилированные шаблоны: проверка идет на каждом создании пассажира
+    EMAIL_RE = re.compile(EMAIL_PATTERN)
+    PHONE_RE = re.compile(PHONE_PATTERN)
+    PASSPORT_RE = re.compile(PASSPORT_PATTERN)
+    NAME_RE = re.compile(NAME_PATTERN)
+    PHONE_SEPARATORS_RE = re.compile(r'[\s\-()]')
+    WHITESPACE_RE = re.compile(r'\s')
+
     def __init__(self, name: str, email: str, phone: str):
+        super().__init__()
         self._name = name
         self._email = email
         self._phone = phone
         self._validate_contact_info()
 
+    # Ключи для поиска: одинаковые контакты, записанные по-разному, дают один ключ
+    @staticmethod
+    def email_key(email: str) -> str:
+        return email.strip().lower()
+
+    @classmethod
+    def phone_key(cls, phone: str) -> str:
+        # Как в _validate_phone, но 8 и 7 в начале всегда приводятся к +7
+        digits = cls.PHONE_SEPARATORS_RE.sub('', phone)
+        if len(digits) == 11 and digits[0] in '78':
+            return '+7' + digits[1:]
+        return digits
+
+    @staticmethod
+    def name_key(name: str) -> str:
+        return ' '.join(name.lower().replace('ё', 'е').split())
+
+    def validate(self) -> None:
+        # Полная проверка данных (для объектов, созданных без валидации)
+        self._validate_contact_info()
+
     def _validate_contact_info(self) -> None:
         # Проверяем все контактные данные
         self._validate_name()
@@ -25,7 +59,7 @@ class Person(ABC):
         self._validate_phone()
 
     def _validate_name(self) -> None:
-        if (not re.match(self.NAME_PATTERN, self._name) or
+        if (not self.NAME_RE.match(self._name) or
                 not self._name.replace(' ', '').replace('-', '')):
             raise ValueError(
                 f"Некорректное имя: '{self._name}'. "
@@ -33,16 +67,16 @@ class Person(ABC):
             )
 
     def _validate_email(self) -> None:
-        if not re.match(self.EMAIL_PATTERN, self._email):
+        if not self.EMAIL_RE.match(self._email):
             raise ValueError(
                 f"Некорректный email адрес: '{self._email}'. "
                 f"Пример правильного формата: user@example.com"
             )
 
     def _validate_phone(self) -> None:
-        normalized_phone = re.sub(r'[\s\-()]', '', self._phone)
+        normalized_phone = self.PHONE_SEPARATORS_RE.sub('', self._phone)
 
-        if not re.match(self.PHONE_PATTERN, self._phone):
+        if not self.PHONE_RE.match(self._phone):
             raise ValueError(
                 f"Некорректный номер телефона: '{self._phone}'. "
             )
@@ -57,9 +91,10 @@ class Person(ABC):
 
     @name.setter
     def name(self, value: str) -> None:
-        if not re.match(self.NAME_PATTERN, value):
+        if not self.NAME_RE.match(value):
             raise ValueError(f"Некорректное имя: '{value}'")
         self._name = value
+        self._notify_changed()
 
     @property
     def email(self) -> str:
@@ -67,9 +102,10 @@ class Person(ABC):
 
     @email.setter
     def email(self, value: str) -> None:
-        if not re.match(self.EMAIL_PATTERN, value):
+        if not self.EMAIL_RE.match(value):
             raise ValueError(f"Некорректный email: '{value}'")
         self._email = value
+        self._notify_changed()
 
     @property
     def phone(self) -> str:
@@ -77,13 +113,14 @@ class Person(ABC):
 
     @phone.setter
     def phone(self, value: str) -> None:
-        if not re.match(self.PHONE_PATTERN, value):
+        if not self.PHONE_RE.match(value):
             raise ValueError(f"Некорректный номер телефона: '{value}'")
-        normalized_phone = re.sub(r'[\s\-()]', '', value)
+        normalized_phone = self.PHONE_SEPARATORS_RE.sub('', value)
         if normalized_phone.startswith('8') and len(normalized_phone) == 11:
             self._phone = '+7' + normalized_phone[1:]
         else:
             self._phone = value
+        self._notify_changed()
 
     @abstractmethod
     def get_info(self) -> str:
@@ -92,16 +129,35 @@ class Person(ABC):
 
 # Класс Passenger - пассажир, наследуется от Person
 class Passenger(Person):
+    __slots__ = ('__passport', '__bookings')
+
     def __init__(self, name: str, email: str, phone: str, passport: str):
         super().__init__(name, email, phone)
         self.__passport = passport
         self.__bookings: List[Booking] = []
         self._validate_passport()
 
+    @classmethod
+    def restore(cls, name: str, email: str, phone: str, passport: str) -> 'Passenger':
+        # Восстановление пассажира из собственного снимка: данные уже проверялись
+        # при создании, поэтому повторную валидацию пропускаем
+        passenger = cls.__new__(cls)
+        Trackable.__init__(passenger)
+        passenger._name = name
+        passenger._email = email
+        passenger._phone = phone
+        passenger.__passport = passport
+        passenger.__bookings = []
+        return passenger
+
+    def validate(self) -> None:
+        super().validate()
+        self._validate_passport()
+
     def _validate_passport(self) -> None:
         # проверка корректности серии и номера паспорта
-        passport = re.sub(r'\s', '', self.__passport)
-        if not re.match(self.PASSPORT_PATTERN, self.__passport):
+        passport = self.WHITESPACE_RE.sub('', self.__passport)
+        if not self.PASSPORT_RE.match(self.__passport):
             raise ValueError(
                 f"Некорректный номер паспорта: '{self.__passport}'. "
                 f"Паспорт должен содержать ровно 10 цифр"
@@ -114,12 +170,13 @@ class Passenger(Person):
         return self.__passport
 
     @property
-    def bookings(self) -> List[Booking]:
-        return self.__bookings.copy()
+    def bookings(self) -> Sequence[Booking]:
+        return ListView(self.__bookings)
 
     # Добавляем бронирование в список пассажира
     def add_booking(self, booking: Booking) -> None:
         self.__bookings.append(booking)
+        self._notify_changed()
 
     def get_info(self) -> str:
         # Показываем информацию о пассажире
@@ -1,4 +1,6 @@
 from my_exceptions import SeatNotAvailableException
+from tracking import Trackable
+from interning import shared_number, shared_str
 from enum import Enum
 
 
@@ -9,12 +11,17 @@ class ClassSeat(Enum):
 
 
 # Класс Seat - представляет одно место в транспорте
-class Seat:
-    def __init__(self, number: str, seat_class: ClassSeat, price: float):
-        self.__number = number          # Номер места
-        self.__seat_class = seat_class  # Класс места
-        self.__price = price            # Цена места
-        self.__is_available = True      # Свободно ли место (изначально да)
+# (__slots__ вместо __dict__: мест в системе миллионы)
+class Seat(Trackable):
+    __slots__ = ('__number', '__seat_class', '__price', '__is_available')
+
+    def __init__(self, number: str, seat_class: ClassSeat, price: float,
+                 is_available: bool = True):
+        super().__init__()
+        self.__number = shared_str(number)  # Номер места ("01" есть в каждом транспорте)
+        self.__seat_class = seat_class      # Класс места
+        self.__price = shared_number(price)  # Цена места
+        self.__is_available = is_available  # Свободно ли место (новое - да)
 
     # Свойства только для чтения - данные места нельзя менять напрямую
     @property
@@ -39,10 +46,19 @@ class Seat:
             # Если место уже занято - бросаем исключение
             raise SeatNotAvailableException(f"Место {self.number} уже занято")
         self.__is_available = False   # Помечаем как занятое
+        self._notify_changed()
 
     def release(self) -> None:
-        # Освободить место (при отмене бронирования)
+        # Освободить место (при отмене бронирования). Свободное место не
+        # меняется, и наблюдатели не получают ложного уведомления
+        if self.__is_available:
+            return
         self.__is_available = True    # Помечаем как свободное
+        self._notify_changed()
+
+    def _restore_availability(self, is_available: bool) -> None:
+        # Для загрузчиков: состояние из файла, а не изменение - без уведомления
+        self.__is_available = is_available
 
     def get_info(self) -> str:
         # Получить информацию о месте в читаемом виде
@@ -0,0 +1,115 @@
+import os
+import pickle
+import threading
+import time
+from typing import Optional
+
+from general_system import BookingSystem
+from jobwf import DataWriter
+from my_exceptions import MyException
+
+# Снимки без остановки работы: состояние системы фиксируется мгновенно,
+# а сериализация и запись на диск идут в фоне. Файл подменяется атомарно
+# (см. atomic_file), поэтому при сбое на диске остается предыдущий снимок.
+#
+# На POSIX используется fork: дочерний процесс получает копию памяти
+# (copy-on-write) и пишет снимок сам. fork выполняется в потоке, вызвавшем
+# snapshot() или poll(), - это должен быть поток, который работает с системой,
+# иначе дочерний процесс может получить замок, захваченный другим потоком.
+# Поэтому периодический режим сам ничего не запускает: poll() из главного
+# цикла проверяет, наступил ли срок.
+#
+# Где fork нет, вся система копируется через pickle в вызывающем потоке, и
+# на это время он останавливается (пропорционально размеру системы); в фоне
+# идет только запись.
+
+
+class SnapshotService:
+    def __init__(self, system: BookingSystem, writer: DataWriter, filename: str,
+                 use_fork: Optional[bool] = None):
+        self.__system = system
+        self.__writer = writer
+        self.__filename = filename
+        self.__use_fork = hasattr(os, 'fork') if use_fork is None else use_fork
+        self.__worker: Optional[threading.Thread] = None
+        self.__last_error: Optional[str] = None
+        self.__interval: Optional[float] = None
+        self.__next_at = 0.0  # Срок следующего периодического снимка (time.monotonic)
+
+    @property
+    def in_progress(self) -> bool:
+        return self.__worker is not None and self.__worker.is_alive()
+
+    @property
+    def last_error(self) -> Optional[str]:
+        # Текст ошибки последнего снимка (None, если он записан успешно)
+        return self.__last_error
+
+    def snapshot(self) -> bool:
+        # Запускает снимок в фоне; False - предыдущий снимок еще не записан.
+        # Изменения в живой системе не сбрасываются: снимок пишется с копии
+        if self.in_progress:
+            return False
+        self.__last_error = None
+        if self.__use_fork:
+            pid = os.fork()
+            if pid == 0:
+                self.__write_in_child()
+            self.__worker = threading.Thread(target=self.__wait_child, args=(pid,), daemon=True)
+        else:
+            state = pickle.dumps(self.__system, protocol=pickle.HIGHEST_PROTOCOL)
+            self.__worker = threading.Thread(target=self.__write_copy, args=(state,), daemon=True)
+        self.__worker.start()
+        return True
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        # Ждет окончания текущего снимка; True - снимок записан без ошибок
+        if self.__worker is not None:
+            self.__worker.join(timeout)
+            if self.__worker.is_alive():
+                return False
+        return self.__last_error is None
+
+    def start_periodic(self, interval: float) -> None:
+        # Снимок каждые interval секунд; запускает его poll() из главного цикла
+        if self.__interval is not None:
+            raise MyException("Периодические снимки уже запущены")
+        if interval <= 0:
+            raise MyException(f"Интервал снимков должен быть положительным: {interval}")
+        self.__interval = interval
+        self.__next_at = time.monotonic() + interval
+
+    def poll(self) -> bool:
+        # Вызывается из главного цикла; True - запущен очередной снимок.
+        # Если прошлый еще пишется, снимок откладывается до следующего вызова
+        if self.__interval is None or time.monotonic() < self.__next_at:
+            return False
+        if not self.snapshot():
+            return False
+        self.__next_at = time.monotonic() + self.__interval
+        return True
+
+    def stop(self) -> None:
+        self.__interval = None
+        self.wait()
+
+    def __write_in_child(self) -> None:
+        # Дочерний процесс: пишем снимок и выходим, минуя обработчики родителя
+        code = 0
+        try:
+            self.__writer.write(self.__system, self.__filename)
+        except BaseException:
+            code = 1
+        finally:
+            os._exit(code)
+
+    def __wait_child(self, pid: int) -> None:
+        _, status = os.waitpid(pid, 0)
+        if os.waitstatus_to_exitcode(status) != 0:
+            self.__last_error = f"Ошибка записи снимка {self.__filename}"
+
+    def __write_copy(self, state: bytes) -> None:
+        try:
+            self.__writer.write(pickle.loads(state), self.__filename)
+        except (MyException, pickle.PickleError, IOError) as e:
+            self.__last_error = str(e)
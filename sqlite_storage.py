@@ -0,0 +1,411 @@
+import sqlite3
+from datetime import datetime
+from typing import List, Optional, Sequence
+
+from action import Booking, BookingStatus, Payment
+from general_system import BookingSystem
+from jobwf import DataReader, DataWriter, collect_changes, count_records
+from my_exceptions import MyException
+from person import Passenger
+from seat import ClassSeat, Seat
+from transports import Bus, Train, Transport
+from trip import Route, Trip
+from tracing import span
+
+# Хранилище в SQLite: данные лежат в таблицах с индексами, поэтому систему
+# не нужно целиком поднимать в память - объекты загружаются по требованию.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS passengers (
+    passport TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    email TEXT NOT NULL,
+    phone TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS transports (
+    transport_id TEXT PRIMARY KEY,
+    type TEXT NOT NULL,
+    model TEXT NOT NULL,
+    capacity INTEGER NOT NULL,
+    has_wifi INTEGER,
+    has_usb_charging INTEGER,
+    car_count INTEGER
+);
+CREATE TABLE IF NOT EXISTS seats (
+    transport_id TEXT NOT NULL,
+    number TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    seat_class TEXT NOT NULL,
+    price REAL NOT NULL,
+    is_available INTEGER NOT NULL,
+    PRIMARY KEY (transport_id, number)
+);
+CREATE TABLE IF NOT EXISTS routes (
+    route_id TEXT PRIMARY KEY,
+    departure TEXT NOT NULL,
+    destination TEXT NOT NULL,
+    departure_time TEXT NOT NULL,
+    arrival_time TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS trips (
+    trip_id TEXT PRIMARY KEY,
+    route_id TEXT NOT NULL,
+    transport_id TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS bookings (
+    booking_id TEXT PRIMARY KEY,
+    trip_id TEXT NOT NULL,
+    seat_number TEXT NOT NULL,
+    booking_date TEXT NOT NULL,
+    status TEXT NOT NULL,
+    passport TEXT,
+    payment_id TEXT,
+    amount REAL,
+    payment_method TEXT,
+    payment_date TEXT,
+    is_paid INTEGER
+);
+CREATE INDEX IF NOT EXISTS routes_by_cities ON routes (departure, destination, departure_time);
+CREATE INDEX IF NOT EXISTS routes_by_time ON routes (departure_time);
+CREATE INDEX IF NOT EXISTS trips_by_route ON trips (route_id);
+CREATE INDEX IF NOT EXISTS bookings_by_passport ON bookings (passport);
+CREATE INDEX IF NOT EXISTS bookings_by_trip ON bookings (trip_id, seat_number);
+"""
+
+
+def _connect(filename: str) -> sqlite3.Connection:
+    try:
+        connection = sqlite3.connect(filename)
+        connection.executescript(SCHEMA)
+    except sqlite3.Error as e:
+        raise MyException(f"Ошибка открытия базы SQLite {filename}: {e}")
+    return connection
+
+
+# Преобразование объектов в строки таблиц
+def _passenger_row(passenger: Passenger) -> tuple:
+    return passenger.passport, passenger.name, passenger.email, passenger.phone
+
+
+def _transport_row(transport: Transport) -> tuple:
+    is_bus = isinstance(transport, Bus)
+    return (transport.transport_id, type(transport).__name__, transport.model, transport.capacity,
+            transport.has_wifi if is_bus else None,
+            transport.has_usb_charging if is_bus else None,
+            transport.car_count if isinstance(transport, Train) else None)
+
+
+def _seat_row(transport_id: str, position: int, seat: Seat) -> tuple:
+    return (transport_id, seat.number, position, seat.seat_class.value, seat.price,
+            seat.is_available)
+
+
+def _route_row(route: Route) -> tuple:
+    return (route.route_id, route.departure, route.destination,
+            route.departure_time.isoformat(), route.arrival_time.isoformat())
+
+
+def _trip_row(trip: Trip) -> tuple:
+    return trip.trip_id, trip.route.route_id, trip.transport.transport_id
+
+
+def _booking_row(booking: Booking, passport: Optional[str]) -> tuple:
+    payment = booking.payment
+    return (booking.booking_id, booking.trip.trip_id, booking.seat.number,
+            booking.booking_date.isoformat(), booking.status.value, passport,
+            payment.payment_id if payment else None,
+            payment.amount if payment else None,
+            payment.payment_method if payment else None,
+            payment.payment_date.isoformat() if payment else None,
+            payment.is_paid if payment else None)
+
+
+_UPSERT = {
+    'passengers': "INSERT OR REPLACE INTO passengers VALUES (?, ?, ?, ?)",
+    'transports': "INSERT OR REPLACE INTO transports VALUES (?, ?, ?, ?, ?, ?, ?)",
+    'seats': "INSERT OR REPLACE INTO seats VALUES (?, ?, ?, ?, ?, ?)",
+    'routes': "INSERT OR REPLACE INTO routes VALUES (?, ?, ?, ?, ?)",
+    'trips': "INSERT OR REPLACE INTO trips VALUES (?, ?, ?)",
+    'bookings': "INSERT OR REPLACE INTO bookings VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+}
+
+
+def _seat_rows(transport: Transport, numbers=None) -> List[tuple]:
+    return [_seat_row(transport.transport_id, position, seat)
+            for position, seat in enumerate(transport.seats)
+            if numbers is None or seat.number in numbers]
+
+
+def _save_changes(connection: sqlite3.Connection, system: BookingSystem) -> None:
+    # Записываем только измененные объекты одной транзакцией
+    changed = collect_changes(system)
+    seat_rows = [row for transport in changed['transports'] for row in _seat_rows(transport)]
+    for transport_id in {transport_id for transport_id, _ in changed['seats']}:
+        numbers = system.changes.seats[transport_id]
+        seat_rows.extend(_seat_rows(system.get_transport(transport_id), numbers))
+
+    with connection:
+        connection.executemany(_UPSERT['passengers'], map(_passenger_row, changed['passengers']))
+        connection.executemany(_UPSERT['transports'], map(_transport_row, changed['transports']))
+        connection.executemany(_UPSERT['seats'], seat_rows)
+        connection.executemany(_UPSERT['routes'], map(_route_row, changed['routes']))
+        connection.executemany(_UPSERT['trips'], map(_trip_row, changed['trips']))
+        connection.executemany(_UPSERT['bookings'], [
+            _booking_row(booking, system.get_booking_owner(booking.booking_id))
+            for booking in changed['bookings']])
+        connection.executemany("DELETE FROM bookings WHERE booking_id = ?",
+                               [(booking_id,) for booking_id in changed['removed_bookings']])
+    system.mark_saved()
+
+
+# Класс для записи системы в базу SQLite
+class SQLiteWriter(DataWriter):
+    def write(self, system: BookingSystem, filename: str) -> None:
+        # Полная запись: база заполняется заново одной транзакцией
+        connection = _connect(filename)
+        try:
+            with span('sqlite_write', file=filename) as trace, connection:
+                if trace:
+                    trace.set(records=count_records(system))
+                for table in ('passengers', 'transports', 'seats', 'routes', 'trips', 'bookings'):
+                    connection.execute(f"DELETE FROM {table}")
+                transports = system.transports.values()
+                connection.executemany(_UPSERT['passengers'],
+                                       map(_passenger_row, system.passengers.values()))
+                connection.executemany(_UPSERT['transports'], map(_transport_row, transports))
+                connection.executemany(_UPSERT['seats'], [row for transport in transports
+                                                          for row in _seat_rows(transport)])
+                connection.executemany(_UPSERT['routes'], map(_route_row, system.routes.values()))
+                connection.executemany(_UPSERT['trips'], map(_trip_row, system.trips.values()))
+                connection.executemany(_UPSERT['bookings'], [
+                    _booking_row(booking, system.get_booking_owner(booking.booking_id))
+                    for booking in system.bookings.values()])
+        except sqlite3.Error as e:
+            raise MyException(f"Ошибка записи SQLite: {e}")
+        finally:
+            connection.close()
+        system.mark_saved()  # Полный снимок - новая база для дельт
+
+    def write_delta(self, system: BookingSystem, filename: str) -> None:
+        # Дописываем в существующую базу только изменения
+        connection = _connect(filename)
+        try:
+            with span('sqlite_write_delta', file=filename):
+                _save_changes(connection, system)
+        except sqlite3.Error as e:
+            raise MyException(f"Ошибка записи SQLite: {e}")
+        finally:
+            connection.close()
+
+
+# Класс для чтения всей системы из SQLite
+class SQLiteReader(DataReader):
+    def read(self, filename: str) -> BookingSystem:
+        with span('sqlite_read', file=filename) as trace:
+            repository = SQLiteRepository(filename)
+            try:
+                repository.load_all()
+            finally:
+                repository.close()
+            if trace:
+                trace.set(records=count_records(repository.system))
+        return repository.system
+
+
+# Репозиторий: объекты читаются из базы по требованию и кешируются
+# (карта идентичности - один объект на одну запись), а новые и измененные
+# объекты системы записываются обратно пачкой в save()
+class SQLiteRepository:
+    def __init__(self, filename: str):
+        self.__connection = _connect(filename)
+        self.__system = BookingSystem()
+        self.__loaded_bookings_of = set()  # Паспорта, чьи бронирования уже загружены
+
+    @property
+    def system(self) -> BookingSystem:
+        # Система содержит только уже загруженные (и созданные) объекты
+        return self.__system
+
+    def close(self) -> None:
+        self.__connection.close()
+
+    def save(self) -> None:
+        try:
+            _save_changes(self.__connection, self.__system)
+        except sqlite3.Error as e:
+            raise MyException(f"Ошибка записи SQLite: {e}")
+
+    def __query(self, sql: str, parameters: tuple = ()) -> List[tuple]:
+        try:
+            return self.__connection.execute(sql, parameters).fetchall()
+        except sqlite3.Error as e:
+            raise MyException(f"Ошибка чтения SQLite: {e}")
+
+    # Загрузка по ключу
+    def get_passenger(self, passport: str) -> Optional[Passenger]:
+        passenger = self.__system.get_passenger(passport)
+        if passenger is None:
+            rows = self.__query("SELECT name, email, phone, passport FROM passengers "
+                                "WHERE passport = ?", (passport,))
+            if not rows:
+                return None
+            passenger = self.__materialize_passenger(rows[0])
+        return passenger
+
+    def get_transport(self, transport_id: str) -> Optional[Transport]:
+        transport = self.__system.get_transport(transport_id)
+        if transport is None:
+            rows = self.__query("SELECT * FROM transports WHERE transport_id = ?",
+                                (transport_id,))
+            if not rows:
+                return None
+            transport = self.__materialize_transport(rows[0])
+        return transport
+
+    def get_route(self, route_id: str) -> Optional[Route]:
+        route = self.__system.get_route(route_id)
+        if route is None:
+            rows = self.__query("SELECT * FROM routes WHERE route_id = ?", (route_id,))
+            if not rows:
+                return None
+            route = self.__materialize_route(rows[0])
+        return route
+
+    def get_trip(self, trip_id: str) -> Optional[Trip]:
+        trip = self.__system.get_trip(trip_id)
+        if trip is None:
+            rows = self.__query("SELECT * FROM trips WHERE trip_id = ?", (trip_id,))
+            if not rows:
+                return None
+            trip = self.__materialize_trip(rows[0])
+        return trip
+
+    def get_booking(self, booking_id: str) -> Optional[Booking]:
+        booking = self.__system.get_booking(booking_id)
+        if booking is None:
+            rows = self.__query("SELECT * FROM bookings WHERE booking_id = ?", (booking_id,))
+            if not rows:
+                return None
+            booking = self.__materialize_booking(rows[0])
+        return booking
+
+    # Запросы по индексам
+    def get_passenger_bookings(self, passport: str) -> Sequence[Booking]:
+        passenger = self.get_passenger(passport)
+        if passenger is None:
+            return ()
+        if passport not in self.__loaded_bookings_of:
+            for row in self.__query("SELECT * FROM bookings WHERE passport = ?", (passport,)):
+                if self.__system.get_booking(row[0]) is None:
+                    self.__materialize_booking(row)
+            self.__loaded_bookings_of.add(passport)
+        return passenger.bookings
+
+    def find_trips(self, departure: str, destination: str,
+                   date_from: Optional[datetime] = None,
+                   date_to: Optional[datetime] = None) -> List[Trip]:
+        sql = ("SELECT trips.trip_id FROM trips JOIN routes ON routes.route_id = trips.route_id "
+               "WHERE routes.departure = ? AND routes.destination = ?")
+        parameters = [departure, destination]
+        if date_from is not None:
+            sql += " AND routes.departure_time >= ?"
+            parameters.append(date_from.isoformat())
+        if date_to is not None:
+            sql += " AND routes.departure_time < ?"
+            parameters.append(date_to.isoformat())
+        sql += " ORDER BY routes.departure_time"
+        return [self.get_trip(trip_id) for (trip_id,) in self.__query(sql, tuple(parameters))]
+
+    def load_all(self) -> None:
+        # Загрузить базу целиком (для SQLiteReader)
+        for (passport,) in self.__query("SELECT passport FROM passengers ORDER BY rowid"):
+            self.get_passenger(passport)
+        for (transport_id,) in self.__query("SELECT transport_id FROM transports ORDER BY rowid"):
+            self.get_transport(transport_id)
+        for (route_id,) in self.__query("SELECT route_id FROM routes ORDER BY rowid"):
+            self.get_route(route_id)
+        for (trip_id,) in self.__query("SELECT trip_id FROM trips ORDER BY rowid"):
+            self.get_trip(trip_id)
+        for row in self.__query("SELECT * FROM bookings ORDER BY rowid"):
+            if self.__system.get_booking(row[0]) is None:
+                self.__materialize_booking(row)
+        self.__loaded_bookings_of.update(self.__system.passengers)
+
+    # Создание объектов из строк. Загруженное не считается изменением системы
+    def __materialize_passenger(self, row: tuple) -> Passenger:
+        passenger = Passenger.restore(*row)  # В базу попадают только проверенные данные
+        self.__system.add_passenger(passenger)
+        self.__system.changes.passengers.discard(passenger.passport)
+        passenger.mark_saved()
+        return passenger
+
+    def __materialize_transport(self, row: tuple) -> Transport:
+        transport_id, transport_type, model, capacity, has_wifi, has_usb_charging, car_count = row
+        if transport_type == 'Bus':
+            transport = Bus(transport_id, model, capacity, bool(has_wifi), bool(has_usb_charging))
+        elif transport_type == 'Train':
+            transport = Train(transport_id, model, capacity, car_count)
+        else:
+            transport = Transport(transport_id, model, capacity)
+
+        for number, seat_class, price, is_available in self.__query(
+                "SELECT number, seat_class, price, is_available FROM seats "
+                "WHERE transport_id = ? ORDER BY position", (transport_id,)):
+            seat = Seat(number, ClassSeat(seat_class), price, bool(is_available))
+            seat.mark_saved()
+            transport.add_seat(seat)
+
+        self.__system.add_transport(transport)
+        self.__system.changes.transports.discard(transport_id)
+        self.__system.changes.seats.pop(transport_id, None)
+        return transport
+
+    def __materialize_route(self, row: tuple) -> Route:
+        route_id, departure, destination, departure_time, arrival_time = row
+        route = Route(route_id, departure, destination, datetime.fromisoformat(departure_time),
+                      datetime.fromisoformat(arrival_time))
+        self.__system.add_route(route)
+        self.__system.changes.routes.discard(route_id)
+        return route
+
+    def __materialize_trip(self, row: tuple) -> Optional[Trip]:
+        trip_id, route_id, transport_id = row
+        route, transport = self.get_route(route_id), self.get_transport(transport_id)
+        if not (route and transport):
+            return None
+        trip = Trip(trip_id, route, transport)
+        self.__system.add_trip(trip)
+        self.__system.changes.trips.discard(trip_id)
+        return trip
+
+    def __materialize_booking(self, row: tuple) -> Optional[Booking]:
+        (booking_id, trip_id, seat_number, booking_date, status, passport,
+         payment_id, amount, payment_method, payment_date, is_paid) = row
+        trip = self.get_trip(trip_id)
+        if not trip:
+            return None
+        seat = next((s for s in trip.transport.seats if s.number == seat_number), None)
+        if not seat:
+            return None
+
+        booking = Booking(booking_id, trip, seat, datetime.fromisoformat(booking_date),
+                          BookingStatus(status))
+        if payment_id is not None:
+            payment = Payment(payment_id, amount, payment_method,
+                              datetime.fromisoformat(payment_date), bool(is_paid))
+            payment.mark_saved()
+            booking.add_payment(payment)
+        booking.mark_saved()
+
+        changes = self.__system.changes
+        self.__system.add_booking(booking)
+        changes.bookings.discard(booking_id)
+
+        passenger = self.get_passenger(passport) if passport else None
+        if passenger:
+            # Привязка загруженного бронирования не делает пассажира измененным
+            was_changed = passport in changes.passengers
+            passenger.add_booking(booking)
+            if not was_changed:
+                changes.passengers.discard(passport)
+                passenger.mark_saved()
+        return booking
@@ -0,0 +1,463 @@
+import gzip
+import io
+import json
+import lzma
+import os
+import sys
+import xml.etree.ElementTree as ET
+from typing import Any, Callable, Dict, Iterator, List, Optional, TextIO, Tuple
+
+from jobwf import atomic_file
+from my_exceptions import MyException
+
+# Потоковая конвертация архивов JSON <-> XML без создания BookingSystem:
+# записи по одной читаются разборщиком одного формата и сразу пишутся
+# в другой, поэтому память не зависит от размера файла. Сжатие выбирается
+# по расширению (.gz, .xz, .lzma) отдельно для входа и выхода.
+#
+#   python stream_convert.py archive.json.gz archive.xml.xz
+#
+# Результат совпадает с тем, что пишут JsonWriter и XMLWriter
+# (поле journal_seq из компактированных снимков в XML не переносится).
+
+COMPRESSORS = {
+    '.gz': gzip.open,
+    '.xz': lzma.open,
+    '.lzma': lzma.open,
+}
+
+CHUNK_SIZE = 1 << 16
+
+
+def _parse_bool(text: str) -> bool:
+    return text.lower() == 'true'
+
+
+# Описание полей записи: (ключ JSON, тег XML, преобразование текста XML).
+# Порядок полей - как у JsonWriter; вложенные записи задаются через _Nested
+class _Nested:
+    def __init__(self, tag: str, fields: List[Tuple], many: bool):
+        self.tag = tag        # Тег вложенной записи (для списка - тег элемента)
+        self.fields = fields
+        self.many = many      # Список записей или одна запись
+
+
+SEAT_FIELDS = [
+    ('number', 'Number', str),
+    ('seat_class', 'Class', str),
+    ('price', 'Price', float),
+    ('is_available', 'IsAvailable', _parse_bool),
+]
+
+PAYMENT_FIELDS = [
+    ('payment_id', 'PaymentID', str),
+    ('amount', 'Amount', float),
+    ('payment_method', 'PaymentMethod', str),
+    ('payment_date', 'PaymentDate', str),
+    ('is_paid', 'IsPaid', _parse_bool),
+]
+
+PASSENGER_FIELDS = [
+    ('name', 'Name', str),
+    ('email', 'Email', str),
+    ('phone', 'Phone', str),
+    ('passport', 'Passport', str),
+]
+
+TRANSPORT_FIELDS = [
+    ('transport_id', 'TransportID', str),
+    ('model', 'Model', str),
+    ('capacity', 'Capacity', int),
+    ('type', 'Type', str),
+    ('seats', 'Seats', _Nested('Seat', SEAT_FIELDS, many=True)),
+    ('has_wifi', 'HasWifi', _parse_bool),
+    ('has_usb_charging', 'HasUSBCharging', _parse_bool),
+    ('car_count', 'CarCount', int),
+]
+
+ROUTE_FIELDS = [
+    ('route_id', 'RouteID', str),
+    ('departure', 'Departure', str),
+    ('destination', 'Destination', str),
+    ('departure_time', 'DepartureTime', str),
+    ('arrival_time', 'ArrivalTime', str),
+]
+
+TRIP_FIELDS = [
+    ('trip_id', 'TripID', str),
+    ('route_id', 'RouteID', str),
+    ('transport_id', 'TransportID', str),
+    ('revenue', 'Revenue', float),
+]
+
+BOOKING_FIELDS = [
+    ('booking_id', 'BookingID', str),
+    ('trip_id', 'TripID', str),
+    ('seat_number', 'SeatNumber', str),
+    ('booking_date', 'BookingDate', str),
+    ('status', 'Status', str),
+    ('passport', 'Passport', str),
+    ('payment', 'Payment', _Nested('Payment', PAYMENT_FIELDS, many=False)),
+]
+
+# Секции файла: ключ JSON -> (контейнер XML, тег записи, поля).
+# Поля None - запись является строкой (ID удаленного бронирования в дельте)
+SECTIONS: Dict[str, Tuple[str, str, Optional[List[Tuple]]]] = {
+    'passengers': ('Passengers', 'Passenger', PASSENGER_FIELDS),
+    'transports': ('Transports', 'Transport', TRANSPORT_FIELDS),
+    'seats': ('Seats', 'Seat', SEAT_FIELDS + [('transport_id', 'TransportID', str)]),
+    'routes': ('Routes', 'Route', ROUTE_FIELDS),
+    'trips': ('Trips', 'Trip', TRIP_FIELDS),
+    'bookings': ('Bookings', 'Booking', BOOKING_FIELDS),
+    'removed_bookings': ('RemovedBookings', 'BookingID', None),
+}
+
+SECTIONS_BY_TAG = {container: section for section, (container, _, _) in SECTIONS.items()}
+
+ROOT_TAG = 'BookingSystem'
+DELTA_ROOT_TAG = 'BookingSystemDelta'
+
+# События потока, общие для обоих форматов:
+#   ('meta', ключ, значение)  - скалярное поле верхнего уровня (delta, journal_seq)
+#   ('begin', секция)         - начало секции
+#   ('record', запись)        - одна запись секции (словарь или строка)
+#   ('end', секция)           - конец секции
+Event = Tuple[Any, ...]
+
+
+def detect_format(filename: str) -> Tuple[str, Optional[Callable]]:
+    # Формат и функция открытия сжатого файла по расширениям: snap.json.gz
+    name = filename.lower()
+    opener = None
+    for suffix, compressor in COMPRESSORS.items():
+        if name.endswith(suffix):
+            opener = compressor
+            name = name[:-len(suffix)]
+            break
+    for file_format in ('json', 'xml'):
+        if name.endswith('.' + file_format):
+            return file_format, opener
+    raise MyException(f"Не удалось определить формат файла: {filename}")
+
+
+# ---------- Чтение JSON ----------
+
+class _JsonStream:
+    # Разбор JSON по частям: в буфере держится только текущая запись
+    def __init__(self, f: TextIO):
+        self.__file = f
+        self.__buffer = ''
+        self.__position = 0
+        self.__eof = False
+        self.__decoder = json.JSONDecoder()
+
+    def __fill(self) -> bool:
+        if self.__eof:
+            return False
+        # Прочитанное отбрасываем, чтобы буфер не рос
+        self.__buffer = self.__buffer[self.__position:]
+        self.__position = 0
+        chunk = self.__file.read(max(CHUNK_SIZE, len(self.__buffer)))
+        if not chunk:
+            self.__eof = True
+            return False
+        self.__buffer += chunk
+        return True
+
+    def peek(self) -> str:
+        while True:
+            while (self.__position < len(self.__buffer)
+                   and self.__buffer[self.__position] in ' \t\n\r'):
+                self.__position += 1
+            if self.__position < len(self.__buffer):
+                return self.__buffer[self.__position]
+            if not self.__fill():
+                raise MyException("Неожиданный конец JSON файла")
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise MyException(f"Некорректный JSON: ожидался символ '{char}'")
+        self.__position += 1
+
+    def skip(self, char: str) -> bool:
+        if self.peek() == char:
+            self.__position += 1
+            return True
+        return False
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = self.__decoder.raw_decode(self.__buffer, self.__position)
+                # Число на границе буфера может быть обрезано - дочитываем
+                if end < len(self.__buffer) or self.__eof:
+                    self.__position = end
+                    return value
+            except json.JSONDecodeError as e:
+                if self.__eof:
+                    raise MyException(f"Некорректный JSON формат: {e}")
+            self.__fill()
+
+
+def read_json_events(f: TextIO) -> Iterator[Event]:
+    stream = _JsonStream(f)
+    stream.expect('{')
+    if stream.skip('}'):
+        return
+    while True:
+        key = stream.value()
+        stream.expect(':')
+        if stream.peek() != '[':
+            yield 'meta', key, stream.value()
+        else:
+            if key not in SECTIONS:
+                raise MyException(f"Неизвестная секция JSON: {key}")
+            stream.expect('[')
+            yield 'begin', key
+            if not stream.skip(']'):
+                while True:
+                    yield 'record', stream.value()
+                    if stream.skip(']'):
+                        break
+                    stream.expect(',')
+            yield 'end', key
+        if stream.skip('}'):
+            return
+        stream.expect(',')
+
+
+# ---------- Чтение XML ----------
+
+def _record_from_xml(elem: ET.Element, fields: Optional[List[Tuple]]) -> Any:
+    if fields is None:
+        return elem.text or ''
+    record = {}
+    for key, tag, kind in fields:
+        child = elem.find(tag)
+        if child is None:
+            continue
+        if isinstance(kind, _Nested):
+            if kind.many:
+                record[key] = [_record_from_xml(item, kind.fields)
+                               for item in child.findall(kind.tag)]
+            else:
+                record[key] = _record_from_xml(child, kind.fields)
+        else:
+            record[key] = kind(child.text or '')
+    return record
+
+
+def read_xml_events(f) -> Iterator[Event]:
+    # iterparse строит дерево постепенно; готовые записи удаляем из него сразу
+    root = section_elem = None
+    section = None
+    depth = 0
+    try:
+        for event, elem in ET.iterparse(f, events=('start', 'end')):
+            if event == 'start':
+                depth += 1
+                if depth == 1:
+                    if elem.tag not in (ROOT_TAG, DELTA_ROOT_TAG):
+                        raise MyException(f"Неизвестный корневой элемент XML: {elem.tag}")
+                    root = elem
+                    if elem.tag == DELTA_ROOT_TAG:
+                        yield 'meta', 'delta', True
+                elif depth == 2:
+                    section = SECTIONS_BY_TAG.get(elem.tag)
+                    if section is None:
+                        raise MyException(f"Неизвестная секция XML: {elem.tag}")
+                    section_elem = elem
+                    yield 'begin', section
+                continue
+
+            depth -= 1
+            if depth == 2:
+                yield 'record', _record_from_xml(elem, SECTIONS[section][2])
+                section_elem.remove(elem)
+            elif depth == 1:
+                yield 'end', section
+                root.remove(elem)
+    except ET.ParseError as e:
+        raise MyException(f"Некорректный XML формат: {e}")
+
+
+# ---------- Запись JSON ----------
+
+def write_json_events(events: Iterator[Event], f: TextIO) -> int:
+    # Тот же вид, что у JsonWriter (indent=2), но по одной записи
+    count = 0
+    first_key = True
+    first_record = True
+    f.write('{')
+    for event in events:
+        kind = event[0]
+        if kind in ('meta', 'begin'):
+            f.write('\n' if first_key else ',\n')
+            first_key = False
+        if kind == 'meta':
+            f.write(f'  {json.dumps(event[1], ensure_ascii=False)}: '
+                    f'{json.dumps(event[2], ensure_ascii=False)}')
+        elif kind == 'begin':
+            f.write(f'  {json.dumps(event[1], ensure_ascii=False)}: [')
+            first_record = True
+        elif kind == 'record':
+            text = json.dumps(event[1], indent=2, ensure_ascii=False)
+            f.write('\n    ' if first_record else ',\n    ')
+            f.write(text.replace('\n', '\n    '))
+            first_record = False
+            count += 1
+        elif kind == 'end':
+            f.write(']' if first_record else '\n  ]')
+    f.write('\n}' if not first_key else '}')
+    return count
+
+
+# ---------- Запись XML ----------
+
+def _escape(text: str) -> str:
+    # Как minidom при выводе текста (XMLWriter пишет через него)
+    return (text.replace('&', '&amp;').replace('<', '&lt;')
+            .replace('"', '&quot;').replace('>', '&gt;'))
+
+
+def _xml_text(value: Any) -> str:
+    return _escape(value if isinstance(value, str) else str(value))
+
+
+def _write_xml_record(f: TextIO, tag: str, record: Any,
+                      fields: Optional[List[Tuple]], indent: str) -> None:
+    if fields is None:
+        text = _xml_text(record)
+        f.write(f'{indent}<{tag}>{text}</{tag}>\n' if text else f'{indent}<{tag}/>\n')
+        return
+
+    # Простые поля идут раньше вложенных - так их располагает XMLWriter
+    scalars = [(tag_, record[key]) for key, tag_, kind in fields
+               if key in record and record[key] is not None and not isinstance(kind, _Nested)]
+    nested = [(tag_, record[key], kind) for key, tag_, kind in fields
+              if key in record and record[key] is not None and isinstance(kind, _Nested)]
+    if not scalars and not nested:
+        f.write(f'{indent}<{tag}/>\n')
+        return
+
+    f.write(f'{indent}<{tag}>\n')
+    inner = indent + '  '
+    for child_tag, value in scalars:
+        _write_xml_record(f, child_tag, value, None, inner)
+    for child_tag, value, kind in nested:
+        if not kind.many:
+            _write_xml_record(f, child_tag, value, kind.fields, inner)
+        elif not value:
+            f.write(f'{inner}<{child_tag}/>\n')
+        else:
+            f.write(f'{inner}<{child_tag}>\n')
+            for item in value:
+                _write_xml_record(f, kind.tag, item, kind.fields, inner + '  ')
+            f.write(f'{inner}</{child_tag}>\n')
+    f.write(f'{indent}</{tag}>\n')
+
+
+def write_xml_events(events: Iterator[Event], f: TextIO) -> int:
+    # Тот же вид, что у XMLWriter (minidom, отступ в два пробела).
+    # Корень открывается при первой секции: к этому времени уже известно,
+    # дельта это или полный снимок
+    count = 0
+    root_tag = None
+    delta = False
+    section = None
+    container = None  # Открытая секция, в которой еще не было записей
+    f.write('<?xml version="1.0" ?>\n')
+    for event in events:
+        kind = event[0]
+        if kind == 'meta':
+            if event[1] == 'delta' and event[2]:
+                delta = True
+            continue
+        if root_tag is None:
+            root_tag = DELTA_ROOT_TAG if delta else ROOT_TAG
+            f.write(f'<{root_tag}>\n')
+        if kind == 'begin':
+            section = event[1]
+            container = SECTIONS[section][0]
+            f.write(f'  <{container}')
+        elif kind == 'record':
+            if container is not None:
+                f.write('>\n')
+                container = None
+            _, tag, fields = SECTIONS[section]
+            _write_xml_record(f, tag, event[1], fields, '    ')
+            count += 1
+        elif kind == 'end':
+            if container is not None:
+                f.write('/>\n')
+                container = None
+            else:
+                f.write(f'  </{SECTIONS[event[1]][0]}>\n')
+    if root_tag is None:
+        f.write(f'<{DELTA_ROOT_TAG if delta else ROOT_TAG}/>\n')
+    else:
+        f.write(f'</{root_tag}>\n')
+    return count
+
+
+# ---------- Конвертация ----------
+
+def _open_input(filename: str, file_format: str, opener: Optional[Callable]):
+    if file_format == 'xml':
+        # XML разбирается из байтов: кодировку указывает сам документ
+        return opener(filename, 'rb') if opener else open(filename, 'rb')
+    if opener:
+        return opener(filename, 'rt', encoding='utf-8')
+    return open(filename, 'r', encoding='utf-8')
+
+
+def _open_compressed(raw, target: str, opener: Optional[Callable]):
+    if opener is None:
+        return None
+    if opener is gzip.open:
+        # В заголовок gzip попадает имя файла - берем целевое, а не временное
+        name = os.path.basename(target)[:-len('.gz')]
+        return gzip.GzipFile(filename=name, mode='wb', fileobj=raw)
+    return opener(raw, 'wb')
+
+
+def convert(source: str, target: str) -> int:
+    # Конвертирует архив source в target, возвращает число записей
+    source_format, source_opener = detect_format(source)
+    target_format, target_opener = detect_format(target)
+    reader = read_json_events if source_format == 'json' else read_xml_events
+    writer = write_json_events if target_format == 'json' else write_xml_events
+
+    try:
+        with _open_input(source, source_format, source_opener) as src, \
+                atomic_file(target, 'wb') as raw:
+            # Сжатие (если нужно) - поверх временного файла atomic_file
+            compressed = _open_compressed(raw, target, target_opener)
+            out = io.TextIOWrapper(compressed or raw, encoding='utf-8', newline='')
+            try:
+                count = writer(reader(src), out)
+            finally:
+                out.detach()  # Сбрасывает буфер, но не закрывает файл под ним
+            if compressed is not None:
+                compressed.close()
+    except (IOError, EOFError, lzma.LZMAError) as e:
+        raise MyException(f"Ошибка конвертации {source} -> {target}: {e}")
+    return count
+
+
+def main(argv: List[str]) -> int:
+    if len(argv) != 3:
+        print("Использование: stream_convert.py <вход.json|xml[.gz|.xz]> <выход.json|xml[.gz|.xz]>")
+        return 2
+    try:
+        count = convert(argv[1], argv[2])
+    except MyException as e:
+        print(e)
+        return 1
+    print(f"Записей сконвертировано: {count}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
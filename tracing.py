@@ -0,0 +1,139 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# Трассировка этапов загрузки и сохранения: каждый читатель и писатель
+# размечает свои этапы вложенными интервалами (span) с длительностью,
+# числом записей и байтами. Пока трассировщик не установлен (set_tracer),
+# span() возвращает пустой интервал и почти ничего не стоит.
+#
+#   tracer = Tracer()
+#   exporter = ChromeTraceExporter()
+#   tracer.add_hook(exporter)
+#   set_tracer(tracer)
+#   DataSerializer.save_to_xml(system, 'data.xml')
+#   exporter.write('trace.json')  # открыть в chrome://tracing или ui.perfetto.dev
+
+
+class Span:
+    __slots__ = ('name', 'attributes', 'depth', 'thread_id', 'start', 'duration')
+
+    def __init__(self, name: str, attributes: Dict[str, Any], depth: int):
+        self.name = name
+        self.attributes = attributes  # records, bytes, file и т.п.
+        self.depth = depth            # 0 - верхний уровень
+        self.thread_id = threading.get_ident()
+        self.start = time.perf_counter()
+        self.duration = 0.0
+
+    def __bool__(self) -> bool:
+        # Пустой интервал ложен: дорогие атрибуты считаем только под "if span:"
+        return True
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __bool__(self) -> bool:
+        return False
+
+    def __enter__(self) -> '_NullSpan':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        return None
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    def __init__(self):
+        self.__hooks: List[Callable[[Span], None]] = []
+        self.__local = threading.local()  # Стек открытых интервалов своего потока
+
+    def add_hook(self, hook: Callable[[Span], None]) -> None:
+        # hook(span) вызывается при закрытии каждого интервала
+        self.__hooks.append(hook)
+
+    def remove_hook(self, hook: Callable[[Span], None]) -> None:
+        self.__hooks.remove(hook)
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span]:
+        stack = getattr(self.__local, 'stack', None)
+        if stack is None:
+            stack = self.__local.stack = []
+        span = Span(name, attributes, len(stack))
+        stack.append(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set(error=type(e).__name__)
+            raise
+        finally:
+            span.duration = time.perf_counter() - span.start
+            stack.pop()
+            for hook in self.__hooks:
+                hook(span)
+
+
+_tracer: Optional[Tracer] = None
+
+
+def set_tracer(tracer: Optional[Tracer]) -> Optional[Tracer]:
+    # Устанавливает трассировщик для всех читателей и писателей, возвращает прежний
+    global _tracer
+    previous, _tracer = _tracer, tracer
+    return previous
+
+
+def get_tracer() -> Optional[Tracer]:
+    return _tracer
+
+
+def span(name: str, **attributes: Any):
+    # with span('parse', bytes=...) as phase: ... ; phase.set(records=...)
+    tracer = _tracer
+    if tracer is None:
+        return NULL_SPAN
+    return tracer.span(name, **attributes)
+
+
+# Собирает интервалы в формате Chrome Trace Event ("X" - полные события):
+# файл открывается в chrome://tracing, Perfetto UI и speedscope
+class ChromeTraceExporter:
+    def __init__(self):
+        self.__events: List[Dict[str, Any]] = []
+        self.__lock = threading.Lock()
+        self.__pid = os.getpid()
+
+    def __call__(self, span: Span) -> None:
+        event = {'name': span.name, 'cat': 'io', 'ph': 'X', 'pid': self.__pid,
+                 'tid': span.thread_id, 'ts': span.start * 1e6, 'dur': span.duration * 1e6,
+                 'args': span.attributes}
+        with self.__lock:
+            self.__events.append(event)
+
+    @property
+    def events(self) -> List[Dict[str, Any]]:
+        with self.__lock:
+            return self.__events.copy()
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__events.clear()
+
+    def write(self, filename: str) -> None:
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': self.events, 'displayTimeUnit': 'ms'}, f,
+                      ensure_ascii=False, default=str)
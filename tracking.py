@@ -0,0 +1,60 @@
+from typing import Callable, Dict, Optional, Set
+
+
+# Примесь для объектов, изменения которых нужно отслеживать
+# (чтобы сохранять только то, что поменялось с прошлого сохранения)
+class Trackable:
+    __slots__ = ('__observer', '__changed')
+
+    def __init__(self):
+        self.__observer: Optional[Callable] = None  # Кого уведомлять об изменениях
+        self.__changed = True                       # Новый объект еще не сохранен
+
+    @property
+    def is_changed(self) -> bool:
+        return self.__changed
+
+    def set_observer(self, observer: Optional[Callable]) -> None:
+        self.__observer = observer
+
+    def mark_saved(self) -> None:
+        # Объект записан на диск - изменений больше нет
+        self.__changed = False
+
+    def _notify_changed(self) -> None:
+        # Вызывается самим объектом после каждого изменения
+        self.__changed = True
+        if self.__observer is not None:
+            self.__observer(self)
+
+
+# Набор изменений системы с момента последнего сохранения (только ключи объектов)
+class ChangeSet:
+    def __init__(self):
+        self.passengers: Set[str] = set()        # Паспорта измененных пассажиров
+        self.transports: Set[str] = set()        # Новый транспорт (пишется целиком)
+        self.seats: Dict[str, Set[str]] = {}     # ID транспорта -> номера измененных мест
+        self.routes: Set[str] = set()
+        self.trips: Set[str] = set()
+        self.bookings: Set[str] = set()          # Новые и измененные бронирования
+        self.removed_bookings: Set[str] = set()  # Удаленные из системы бронирования
+
+    def add_seat(self, transport_id: str, seat_number: str) -> None:
+        self.seats.setdefault(transport_id, set()).add(seat_number)
+
+    def add_booking(self, booking_id: str) -> None:
+        self.bookings.add(booking_id)
+        self.removed_bookings.discard(booking_id)
+
+    def remove_booking(self, booking_id: str) -> None:
+        self.bookings.discard(booking_id)
+        self.removed_bookings.add(booking_id)
+
+    def is_empty(self) -> bool:
+        return not (self.passengers or self.transports or self.seats or self.routes
+                    or self.trips or self.bookings or self.removed_bookings)
+
+    def __len__(self) -> int:
+        return (len(self.passengers) + len(self.transports) + len(self.routes)
+                + len(self.trips) + len(self.bookings) + len(self.removed_bookings)
+                + sum(len(numbers) for numbers in self.seats.values()))
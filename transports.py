@@ -1,6 +1,8 @@
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Callable, List, Optional, Sequence
 from seat import Seat
+from views import ListView
+from interning import shared_str
 from enum import Enum
 
 
@@ -16,9 +18,10 @@ class TransportType(Enum):
 class Transport(ABC):
     def __init__(self, transport_id: str, model: str, capacity: int):
         self.__transport_id = transport_id  # Уникальный ID транспорта
-        self.__model = model                # Модель
+        self.__model = shared_str(model)    # Модель
         self.__capacity = capacity          # Вместимость (количество мест)
         self.__seats: List[Seat] = []       # Список всех мест в транспорте
+        self.__seat_observer: Optional[Callable] = None  # Кого уведомлять об изменении мест
 
     # геттеры
     @property
@@ -34,8 +37,8 @@ class Transport(ABC):
         return self.__capacity
 
     @property
-    def seats(self) -> List[Seat]:
-        return self.__seats.copy()  # Возвращаем копию списка мест
+    def seats(self) -> Sequence[Seat]:
+        return ListView(self.__seats)  # Список мест только для чтения, без копирования
 
     @abstractmethod
     def get_transport_info(self) -> str:
@@ -44,6 +47,16 @@ class Transport(ABC):
     def add_seat(self, seat: Seat) -> None:
         # Добавляем место в транспорт
         self.__seats.append(seat)
+        seat.set_observer(self._on_seat_changed)
+        self._on_seat_changed(seat)
+
+    def set_seat_observer(self, observer: Optional[Callable]) -> None:
+        # observer(transport, seat) вызывается при любом изменении места
+        self.__seat_observer = observer
+
+    def _on_seat_changed(self, seat: Seat) -> None:
+        if self.__seat_observer is not None:
+            self.__seat_observer(self, seat)
 
 
 # Класс Bus - автобус, наследуется от Transport
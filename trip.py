@@ -2,15 +2,19 @@ from seat import Seat
 from datetime import datetime
 from typing import List, Optional
 from transports import Transport
+from interning import shared_str
 
 
 # Класс Route - маршрут поездки
 class Route:
+    __slots__ = ('__route_id', '__departure', '__destination', '__departure_time',
+                 '__arrival_time')
+
     def __init__(self, route_id: str, departure: str, destination: str,
                  departure_time: datetime, arrival_time: datetime):
         self.__route_id = route_id          # ID маршрута
-        self.__departure = departure        # Город отправления
-        self.__destination = destination    # Город назначения
+        self.__departure = shared_str(departure)      # Город отправления
+        self.__destination = shared_str(destination)  # Город назначения
         self.__departure_time = departure_time  # Время отправления
         self.__arrival_time = arrival_time      # Время прибытия
 
@@ -51,12 +55,13 @@ class Route:
 
 # Класс Trip - конкретная поездка (маршрут + транспорт)
 class Trip:
+    __slots__ = ('__trip_id', '__route', '__transport')
+
     def __init__(self, trip_id: str, route: Route, transport: Transport):
         self.__trip_id = trip_id            # ID поездки
         self.__route = route                # Маршрут
         self.__transport = transport        # Транспорт
-        # Список свободных мест (вычисляется автоматически)
-        self.__available_seats = [seat for seat in transport.seats if seat.is_available]
+        # Свободные места не храним: они меняются, get_available_seats считает их заново
 
     # геттеры
     @property
@@ -0,0 +1,30 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterable, List, Tuple
+
+from general_system import BookingSystem
+from person import Passenger
+
+# Отложенная проверка пассажиров, загруженных в доверенном режиме
+# (JsonReader(trusted=True) и т.п.): система доступна сразу,
+# а валидация выполняется одним проходом потом - или в фоне.
+
+
+def validate_passengers(passengers: Iterable[Passenger]) -> List[Tuple[str, str]]:
+    # Возвращает список (паспорт, текст ошибки) для некорректных пассажиров
+    errors = []
+    for passenger in passengers:
+        try:
+            passenger.validate()
+        except ValueError as e:
+            errors.append((passenger.passport, str(e)))
+    return errors
+
+
+def validate_in_background(system: BookingSystem) -> 'Future[List[Tuple[str, str]]]':
+    # Список пассажиров фиксируется сразу, в вызывающем потоке,
+    # поэтому добавление новых пассажиров проверке не мешает
+    passengers = list(system.passengers.values())
+    executor = ThreadPoolExecutor(max_workers=1)
+    future = executor.submit(validate_passengers, passengers)
+    executor.shutdown(wait=False)
+    return future
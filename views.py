@@ -0,0 +1,37 @@
+from collections.abc import Sequence
+from typing import Any, Iterator, List
+
+
+# Список "только для чтения": без копирования показывает текущее
+# содержимое исходного списка, но не дает его изменить.
+# Для словарей то же самое делает types.MappingProxyType.
+class ListView(Sequence):
+    __slots__ = ('__items',)
+
+    def __init__(self, items: List[Any]):
+        self.__items = items
+
+    def __getitem__(self, index):
+        return self.__items[index]  # Срез возвращает новый список
+
+    def __len__(self) -> int:
+        return len(self.__items)
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self.__items)
+
+    def __contains__(self, item: Any) -> bool:
+        return item in self.__items
+
+    def __reversed__(self) -> Iterator[Any]:
+        return reversed(self.__items)
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, ListView):
+            return self.__items == other.__items
+        if isinstance(other, (list, tuple)):
+            return self.__items == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"ListView({self.__items!r})"
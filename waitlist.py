@@ -0,0 +1,174 @@
+import heapq
+import itertools
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from action import Booking
+from person import Passenger
+from seat import ClassSeat
+from trip import Trip
+
+# Лист ожидания на распроданные поездки. У каждой поездки - очереди с
+# приоритетом (heapq): сначала меньший уровень tier (0 - самый приоритетный),
+# при равном уровне - кто раньше встал в очередь. Когда место поездки
+# освобождается (BookingSystem.cancel_booking) или появляется новое
+# (BookingSystem.add_seat), система (BookingSystem.set_waitlist) сразу создает
+# первому подходящему из очереди бронирование, ожидающее оплаты, - без опроса
+# и без просмотра всего листа. Отмена поездки (cancel_trip) убирает из листа
+# всех ее ожидающих.
+#
+# Ожидающий может хотеть только определенный класс места: для каждого класса
+# своя очередь, плюс очередь тех, кому класс не важен. Освободившееся место
+# сравнивает только головы двух очередей, поэтому выбор - O(log n).
+
+# Вызывается после перевода ожидающего в бронирование
+PromotionHook = Callable[['WaitlistEntry', Booking], None]
+
+
+class WaitlistEntry:
+    __slots__ = ('__entry_id', '__passenger', '__trip', '__tier', '__seat_class',
+                 '__requested_at', '__active')
+
+    def __init__(self, entry_id: int, passenger: Passenger, trip: Trip, tier: int,
+                 seat_class: Optional[ClassSeat], requested_at: datetime):
+        self.__entry_id = entry_id            # Порядковый номер (порядок при равном времени)
+        self.__passenger = passenger
+        self.__trip = trip
+        self.__tier = tier                    # Уровень приоритета, 0 - самый высокий
+        self.__seat_class = seat_class        # None - подходит любой класс
+        self.__requested_at = requested_at    # Когда встал в очередь
+        self.__active = True                  # False - вышел из очереди или получил место
+
+    @property
+    def entry_id(self) -> int:
+        return self.__entry_id
+
+    @property
+    def passenger(self) -> Passenger:
+        return self.__passenger
+
+    @property
+    def trip(self) -> Trip:
+        return self.__trip
+
+    @property
+    def tier(self) -> int:
+        return self.__tier
+
+    @property
+    def seat_class(self) -> Optional[ClassSeat]:
+        return self.__seat_class
+
+    @property
+    def requested_at(self) -> datetime:
+        return self.__requested_at
+
+    @property
+    def is_active(self) -> bool:
+        return self.__active
+
+    def _deactivate(self) -> None:
+        self.__active = False
+
+    def sort_key(self) -> Tuple[int, datetime, int]:
+        return self.__tier, self.__requested_at, self.__entry_id
+
+    def __lt__(self, other: 'WaitlistEntry') -> bool:
+        return self.sort_key() < other.sort_key()
+
+    def __repr__(self) -> str:
+        seat_class = self.__seat_class.value if self.__seat_class else "любой класс"
+        return (f"Ожидание #{self.__entry_id}: {self.__passenger.name} на {self.__trip.trip_id} "
+                f"(уровень {self.__tier}, {seat_class})")
+
+
+class Waitlist:
+    def __init__(self, on_promote: Optional[PromotionHook] = None):
+        # (ID поездки, класс места или None) -> куча ожидающих.
+        # Вышедшие из очереди удаляются лениво - когда оказываются в голове кучи
+        self.__queues: Dict[Tuple[str, Optional[ClassSeat]], List[WaitlistEntry]] = {}
+        # ID транспорта -> ID поездок с ожидающими (место освобождается у транспорта)
+        self.__transport_trips: Dict[str, Set[str]] = {}
+        self.__waiting: Dict[str, int] = {}  # ID поездки -> активных ожидающих
+        self.__ids = itertools.count(1)
+        self.__on_promote = on_promote
+
+    def __len__(self) -> int:
+        return sum(self.__waiting.values())
+
+    def add(self, passenger: Passenger, trip: Trip, tier: int = 0,
+            seat_class: Optional[ClassSeat] = None,
+            requested_at: Optional[datetime] = None) -> WaitlistEntry:
+        entry = WaitlistEntry(next(self.__ids), passenger, trip, tier, seat_class,
+                              requested_at or datetime.now())
+        heapq.heappush(self.__queues.setdefault((trip.trip_id, seat_class), []), entry)
+        self.__transport_trips.setdefault(trip.transport.transport_id, set()).add(trip.trip_id)
+        self.__waiting[trip.trip_id] = self.__waiting.get(trip.trip_id, 0) + 1
+        return entry
+
+    def remove(self, entry: WaitlistEntry) -> None:
+        # Пассажир передумал ждать
+        if entry.is_active:
+            entry._deactivate()
+            self.__forget(entry.trip)
+
+    def remove_trip(self, trip_id: str) -> List[WaitlistEntry]:
+        # Поездка отменена: все ее ожидающие выходят из очереди
+        entries = self.waiting(trip_id)
+        for entry in entries:
+            self.remove(entry)
+        return entries
+
+    def clear(self) -> None:
+        # Все ожидающие выходят из очереди (очистка системы)
+        for queue in self.__queues.values():
+            for entry in queue:
+                if entry.is_active:
+                    entry._deactivate()
+        self.__queues.clear()
+        self.__transport_trips.clear()
+        self.__waiting.clear()
+
+    def __forget(self, trip: Trip) -> None:
+        trip_id = trip.trip_id
+        self.__waiting[trip_id] -= 1
+        if not self.__waiting[trip_id]:
+            del self.__waiting[trip_id]
+            trip_ids = self.__transport_trips[trip.transport.transport_id]
+            trip_ids.discard(trip_id)
+            if not trip_ids:
+                del self.__transport_trips[trip.transport.transport_id]
+            for seat_class in (None, *ClassSeat):
+                self.__queues.pop((trip_id, seat_class), None)
+
+    def waiting(self, trip_id: str) -> List[WaitlistEntry]:
+        # Активные ожидающие поездки в порядке очереди
+        entries = [entry for seat_class in (None, *ClassSeat)
+                   for entry in self.__queues.get((trip_id, seat_class), ()) if entry.is_active]
+        return sorted(entries)
+
+    def __head(self, trip_id: str, seat_class: Optional[ClassSeat]) -> Optional[WaitlistEntry]:
+        queue = self.__queues.get((trip_id, seat_class))
+        while queue and not queue[0].is_active:
+            heapq.heappop(queue)
+        return queue[0] if queue else None
+
+    def peek(self, trip_id: str, seat_class: ClassSeat) -> Optional[WaitlistEntry]:
+        # Кто получит освободившееся место этого класса
+        heads = [entry for entry in (self.__head(trip_id, seat_class), self.__head(trip_id, None))
+                 if entry is not None]
+        return min(heads) if heads else None
+
+    def peek_transport(self, transport_id: str,
+                       seat_class: ClassSeat) -> Optional[WaitlistEntry]:
+        # То же для места транспорта, на котором ездят несколько поездок
+        heads = [entry for trip_id in self.__transport_trips.get(transport_id, ())
+                 for entry in (self.peek(trip_id, seat_class),) if entry is not None]
+        return min(heads) if heads else None
+
+    def _promote(self, entry: WaitlistEntry, booking: Booking) -> None:
+        # Ожидающий получил бронирование: уходит из очереди (из кучи - лениво)
+        entry._deactivate()
+        self.__forget(entry.trip)
+        if self.__on_promote is not None:
+            self.__on_promote(entry, booking)